@@ -0,0 +1,66 @@
+"""
+Compares approximate nearest-neighbour backends with exact top-k search on near-duplicate queries: recall@1 and
+recall@k against the exact results, the average number of candidates scored per query, and query time.
+
+    python -m benchmarks.bench_ann --documents 50000 --queries 200 --top-k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_documents, generate_near_duplicates
+from text_matcher.ann import RandomProjectionConfig, MinHashConfig, build_ann_index
+from text_matcher.similarity import row_norms
+from text_matcher.vectorizer import train_vectorizer, pick_top_k_documents
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+CONFIGS = [
+    RandomProjectionConfig(),
+    RandomProjectionConfig(n_bits=16),
+    RandomProjectionConfig(n_tables=32, n_bits=20),
+    MinHashConfig(),
+    MinHashConfig(n_bands=32, band_size=2),
+]
+
+
+def recall(approximate: np.ndarray, exact: np.ndarray) -> float:
+    return float(np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate.tolist(), exact.tolist())]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, seed=1)
+    queries = generate_near_duplicates(documents, args.queries, seed=2)
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), documents)
+    test_vecs = vectorizer.transform(documents)
+    query_vecs = vectorizer.transform(queries)
+    norms = row_norms(test_vecs)
+
+    start = time.perf_counter()
+    exact, _ = pick_top_k_documents(query_vecs, test_vecs, 'cosine', args.top_k, norms)
+    exact_seconds = time.perf_counter() - start
+    print(f"{args.queries} queries x {args.documents} documents, top {args.top_k} (cosine)")
+    print(f"{'exact':<60} {'':>9} {'':>9} {args.documents:>11} {exact_seconds:>8.3f} s")
+
+    for config in CONFIGS:
+        start = time.perf_counter()
+        index = build_ann_index(config, test_vecs)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        approximate, _ = index.search(query_vecs, test_vecs, 'cosine', args.top_k, norms)
+        search_seconds = time.perf_counter() - start
+        candidates = np.mean([len(c) for c in index.candidates(query_vecs)])
+        name = f"{index.ann_type} {config.model_dump()}"
+        print(f"{name:<60} R@1 {recall(approximate[:, :1], exact[:, :1]):>5.2f} "
+              f"R@{args.top_k} {recall(approximate, exact):>5.2f} {candidates:>11.0f} {search_seconds:>8.3f} s "
+              f"(build {build_seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
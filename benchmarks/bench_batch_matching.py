@@ -0,0 +1,48 @@
+"""
+Compares the per-query matching loop with the batch path of `transform_and_pick_best_documents`.
+
+The per-query loop re-vectorizes the whole corpus for every query, so it is timed on a sample of queries and
+extrapolated to the full query set.
+
+    python -m benchmarks.bench_batch_matching --queries 1000 --documents 10000
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import generate_documents
+from text_matcher.vectorizer import train_vectorizer, transform_and_pick_best_document, \
+    transform_and_pick_best_documents
+from text_matcher.vectorizer_config import CountVectorizerConfig
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--sample-queries", type=int, default=5)
+    parser.add_argument("--distance-metric", default="cosine")
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, seed=1)
+    queries = generate_documents(args.queries, words_per_document=50, seed=2)
+    vectorizer = train_vectorizer(CountVectorizerConfig(), documents)
+
+    start = time.perf_counter()
+    batch_idxs = transform_and_pick_best_documents(vectorizer, documents, queries, args.distance_metric)
+    batch_seconds = time.perf_counter() - start
+
+    sample = queries[:args.sample_queries]
+    start = time.perf_counter()
+    sample_idxs = [transform_and_pick_best_document(vectorizer, documents, query, args.distance_metric)
+                   for query in sample]
+    per_query_seconds = (time.perf_counter() - start) / len(sample) * len(queries)
+
+    assert sample_idxs == batch_idxs[:len(sample)], "batch results differ from per-query results"
+    print(f"{args.queries} queries x {args.documents} documents ({args.distance_metric})")
+    print(f"per-query loop (extrapolated): {per_query_seconds:.2f} s")
+    print(f"batch path:                    {batch_seconds:.2f} s")
+    print(f"speedup:                       {per_query_seconds / batch_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
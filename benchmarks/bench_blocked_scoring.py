@@ -0,0 +1,57 @@
+"""
+Compares scoring a whole query batch at once with the blocked top-k engine: peak memory allocated while scoring
+(traced with `tracemalloc`, which sees numpy and scipy buffers) and time with 1..N scoring threads.
+
+    python -m benchmarks.bench_blocked_scoring --queries 2000 --documents 50000 --threads 1 2 4 8
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import generate_documents, generate_near_duplicates
+from text_matcher.parallel import parallel_transform
+from text_matcher.similarity import cosine_similarity, row_norms, top_k, blocked_top_k
+from text_matcher.vectorizer import train_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+
+def measure(score):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = score()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, words_per_document=100, seed=1)
+    queries = generate_near_duplicates(documents, args.queries, seed=2)
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), documents)
+    test_vecs = parallel_transform(vectorizer, documents)
+    query_vecs = parallel_transform(vectorizer, queries)
+    norms = row_norms(test_vecs)
+    print(f"{args.queries} queries x {args.documents} documents, top {args.top_k} (cosine)")
+
+    (expected, _), seconds, peak = measure(
+        lambda: top_k(cosine_similarity(query_vecs, test_vecs, norms), args.top_k, largest=True))
+    print(f"{'whole score matrix':<22} {peak / 2 ** 20:>9.1f} MB {seconds:>8.2f} s")
+    for n_threads in args.threads:
+        (best, _), seconds, peak = measure(
+            lambda: blocked_top_k(cosine_similarity, query_vecs, test_vecs, args.top_k, True, norms, n_threads))
+        assert np.array_equal(best[:, 0], expected[:, 0]), "blocked results differ from the whole score matrix"
+        print(f"{f'blocked, {n_threads} threads':<22} {peak / 2 ** 20:>9.1f} MB {seconds:>8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
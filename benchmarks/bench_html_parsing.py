@@ -0,0 +1,72 @@
+"""
+Compares the HTML parser backends of the scraper on saved pages: throughput of every backend, whether its output
+equals the BeautifulSoup `html.parser` reference, and parsing in a process pool.
+
+Without --fixtures the pages are generated and can be kept with --save-fixtures. Real pages can be saved with
+e.g. `curl -o fixtures/AIML.html https://pl.wikipedia.org/wiki/AIML`.
+
+    python -m benchmarks.bench_html_parsing --pages 100 --processes 4
+    python -m benchmarks.bench_html_parsing --fixtures fixtures/
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import generate_wikipedia_html
+from text_matcher.wikipedia_scraper import _parse_html_content, PARSERS
+
+
+def load_fixtures(args) -> list:
+    if args.fixtures:
+        paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+        pages = []
+        for path in paths:
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+    pages = [generate_wikipedia_html(args.sections, seed=seed).encode("utf-8") for seed in range(args.pages)]
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for number, page in enumerate(pages):
+            with open(os.path.join(args.save_fixtures, f"page_{number}.html"), "wb") as f:
+                f.write(page)
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="Directory of saved *.html pages")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--sections", type=int, default=30)
+    parser.add_argument("--save-fixtures", help="Directory to save the generated pages to")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    pages = load_fixtures(args)
+    megabytes = sum(len(page) for page in pages) / 2 ** 20
+    print(f"{len(pages)} pages, {megabytes:.1f} MiB")
+
+    reference = None
+    for backend in reversed(PARSERS):
+        start = time.perf_counter()
+        texts = [_parse_html_content(page, backend) for page in pages]
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = texts
+        equal = sum(text == expected for text, expected in zip(texts, reference))
+        print(f"{backend:<12} {seconds:7.3f} s  {megabytes / seconds:6.1f} MiB/s  identical output: "
+              f"{equal}/{len(pages)}")
+
+    for backend in PARSERS:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            texts = list(pool.map(_parse_html_content, pages, [backend] * len(pages), chunksize=4))
+        seconds = time.perf_counter() - start
+        assert texts == [_parse_html_content(page, backend) for page in pages]
+        print(f"{backend:<12} {seconds:7.3f} s  {megabytes / seconds:6.1f} MiB/s  in {args.processes} processes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the size and load time of vectorizer models saved in the compact format and pickled.
+
+    python -m benchmarks.bench_model_load --documents 20000 --ngram-max 2 --min-df 2
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.synthetic import generate_documents
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer, load_vectorizer, vectorizer_fingerprint
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+
+def load_pickle(model_path: str):
+    with open(model_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def best_load_seconds(load: Callable[[str], object], model_path: str, repeats: int) -> float:
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load(model_path)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--words-per-document", type=int, default=200)
+    parser.add_argument("--ngram-max", type=int, default=2)
+    parser.add_argument("--min-df", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, args.words_per_document)
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(ngram_range=(1, args.ngram_max), min_df=args.min_df),
+                                  documents)
+    print(f"{args.documents} documents, {len(vectorizer.vocabulary_)} terms, "
+          f"{len(getattr(vectorizer, 'stop_words_', None) or ())} pruned terms")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, "model.pkl")
+        compact_path = os.path.join(tmp_dir, "model.npz")
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(vectorizer, f)
+        save_vectorizer(vectorizer, compact_path)
+        assert vectorizer_fingerprint(load_vectorizer(compact_path)) == vectorizer_fingerprint(vectorizer), \
+            "compact model differs"
+
+        for name, load, path in [("pickle", load_pickle, pickle_path), ("compact", load_vectorizer, compact_path)]:
+            size_mib = os.path.getsize(path) / 2 ** 20
+            print(f"{name:8} {size_mib:8.1f} MiB, load {best_load_seconds(load, path, args.repeats):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
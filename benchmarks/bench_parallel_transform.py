@@ -0,0 +1,43 @@
+"""
+Measures how transforming a corpus scales with the number of worker processes of `parallel_transform`.
+
+    python -m benchmarks.bench_parallel_transform --documents 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from benchmarks.synthetic import generate_documents
+from text_matcher.parallel import parallel_transform
+from text_matcher.vectorizer import train_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig, HashingVectorizerConfig
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--words-per-document", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, args.words_per_document)
+    vectorizers = {
+        "tfidf": train_vectorizer(TfidfVectorizerConfig(ngram_range=(1, 2)), documents[:5000]),
+        "hashing": train_vectorizer(HashingVectorizerConfig(), []),
+    }
+    print(f"{args.documents} documents, {os.cpu_count()} CPUs")
+    for name, vectorizer in vectorizers.items():
+        serial_seconds = None
+        expected = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            vectors = parallel_transform(vectorizer, documents, workers)
+            seconds = time.perf_counter() - start
+            if expected is None:
+                expected, serial_seconds = vectors, seconds
+            assert (vectors != expected).nnz == 0, "parallel vectors differ"
+            print(f"{name:8} {workers:2} workers: {seconds:.2f} s, speedup {serial_seconds / seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
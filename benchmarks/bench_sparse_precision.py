@@ -0,0 +1,61 @@
+"""
+Reports the memory/accuracy trade-off of float32 vectors and of pruning every document vector to its largest
+weights: the size of the document vectors (values, indices and row pointers), the size of the dense score matrix
+of one query batch, agreement of the top-1 and top-k matches with the float64 vectors, and query time.
+
+    python -m benchmarks.bench_sparse_precision --documents 20000 --queries 500 --top-k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import recall
+from benchmarks.synthetic import generate_documents, generate_near_duplicates
+from text_matcher.parallel import parallel_transform
+from text_matcher.similarity import row_norms
+from text_matcher.vectorizer import train_vectorizer, pick_top_k_documents
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+CONFIGS = [
+    TfidfVectorizerConfig(),
+    TfidfVectorizerConfig(dtype='float32'),
+    TfidfVectorizerConfig(dtype='float32', max_terms_per_document=100),
+    TfidfVectorizerConfig(dtype='float32', max_terms_per_document=50),
+    TfidfVectorizerConfig(dtype='float32', max_terms_per_document=25),
+    TfidfVectorizerConfig(dtype='float32', max_terms_per_document=10),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    documents = generate_documents(args.documents, seed=1)
+    queries = generate_near_duplicates(documents, args.queries, seed=2)
+    print(f"{args.queries} queries x {args.documents} documents, top {args.top_k} (cosine)")
+    print(f"{'config':<45} {'vectors':>10} {'scores':>10} {'R@1':>5} {f'R@{args.top_k}':>5} {'query':>9}")
+
+    baseline = None
+    for config in CONFIGS:
+        vectorizer = train_vectorizer(config, documents)
+        test_vecs = parallel_transform(vectorizer, documents)
+        query_vecs = parallel_transform(vectorizer, queries)
+        norms = row_norms(test_vecs)
+        start = time.perf_counter()
+        best, scores = pick_top_k_documents(query_vecs, test_vecs, 'cosine', args.top_k, norms)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = best
+        vector_bytes = test_vecs.data.nbytes + test_vecs.indices.nbytes + test_vecs.indptr.nbytes
+        score_bytes = args.queries * args.documents * np.dtype(test_vecs.dtype).itemsize
+        name = f"{config.dtype or 'float64'} max_terms_per_document={config.max_terms_per_document}"
+        print(f"{name:<45} {vector_bytes / 2 ** 20:>7.1f} MB {score_bytes / 2 ** 20:>7.1f} MB "
+              f"{recall(best[:, :1], baseline[:, :1]):>5.2f} {recall(best, baseline):>5.2f} {seconds:>7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
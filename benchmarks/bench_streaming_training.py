@@ -0,0 +1,74 @@
+"""
+Compares the peak memory and time of training a vectorizer on a list of all documents with streaming training from
+a generator, with and without a bound on the number of counted terms.
+
+    python -m benchmarks.bench_streaming_training --documents 20000 --max-terms 200000
+"""
+import argparse
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Iterator
+
+from benchmarks.synthetic import generate_vocabulary
+from text_matcher.streaming_training import train_vectorizer_streaming
+from text_matcher.vectorizer import train_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+
+def iter_documents(count: int, words_per_document: int, vocabulary_size: int, seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(vocabulary_size, seed)
+    cum_weights = list(accumulate(1 / rank for rank in range(1, vocabulary_size + 1)))
+    for _ in range(count):
+        yield " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_document))
+
+
+def train(mode: str, args: argparse.Namespace) -> tuple:
+    config = TfidfVectorizerConfig(ngram_range=(1, 2), min_df=2)
+    documents = iter_documents(args.documents, args.words_per_document, args.vocabulary_size)
+    start = time.perf_counter()
+    match mode:
+        case "list":
+            vectorizer = train_vectorizer(config, list(documents))
+        case "streaming":
+            vectorizer = train_vectorizer_streaming(config, documents)
+        case _:
+            vectorizer = train_vectorizer_streaming(config, documents, max_terms=args.max_terms)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    return vectorizer.vocabulary_, seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def measure(mode: str, args: argparse.Namespace) -> tuple:
+    # a fresh process per mode, so the peak resident memory of one does not hide the other
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(train, mode, args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--words-per-document", type=int, default=200)
+    parser.add_argument("--vocabulary-size", type=int, default=50000)
+    parser.add_argument("--max-terms", type=int, default=200000)
+    args = parser.parse_args()
+
+    in_memory, in_memory_seconds, in_memory_peak = measure("list", args)
+    streaming, streaming_seconds, streaming_peak = measure("streaming", args)
+    bounded, bounded_seconds, bounded_peak = measure("bounded", args)
+
+    assert streaming == in_memory, "streaming vocabulary differs from fit"
+    print(f"{args.documents} documents, bigrams, min_df=2")
+    print(f"fit on a list:                      {in_memory_seconds:.2f} s, peak RSS {in_memory_peak:.0f} MiB, "
+          f"{len(in_memory)} terms")
+    print(f"streaming:                          {streaming_seconds:.2f} s, peak RSS {streaming_peak:.0f} MiB, "
+          f"{len(streaming)} terms")
+    print(f"streaming, at most {args.max_terms} terms: {bounded_seconds:.2f} s, peak RSS {bounded_peak:.0f} MiB, "
+          f"{len(bounded)} terms")
+
+
+if __name__ == "__main__":
+    main()
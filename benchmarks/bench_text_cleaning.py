@@ -0,0 +1,51 @@
+"""
+Compares the single-pass section cleaner with the previous implementation, which compiled one pattern per header
+on every call, made a pass per header plus two more, and ran twice per article.
+
+    python -m benchmarks.bench_text_cleaning --articles 200 --sections 40
+"""
+import argparse
+import re
+import time
+
+from benchmarks.synthetic import generate_extract
+from text_matcher.wikipedia_connector import remove_sections_and_clean_text, FILTER
+
+
+def legacy_remove_sections_and_clean_text(text: str, headers: list) -> str:
+    for header in headers:
+        pattern = re.compile(rf"{re.escape(header)}.*?(?=^==\s|\Z)", re.DOTALL | re.MULTILINE)
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'^==.*?==\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--words-per-section", type=int, default=500)
+    args = parser.parse_args()
+
+    extracts = [generate_extract(args.sections, args.words_per_section, seed) for seed in range(args.articles)]
+
+    start = time.perf_counter()
+    legacy = [legacy_remove_sections_and_clean_text(legacy_remove_sections_and_clean_text(text, FILTER), FILTER)
+              for text in extracts]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cleaned = [remove_sections_and_clean_text(text, FILTER) for text in extracts]
+    single_pass_seconds = time.perf_counter() - start
+
+    assert cleaned == legacy, "single-pass output differs from the previous cleaner"
+    megabytes = sum(len(text.encode("utf-8")) for text in extracts) / 2 ** 20
+    print(f"{args.articles} extracts, {megabytes:.1f} MiB")
+    print(f"previous cleaner (two passes per article): {legacy_seconds:.3f} s")
+    print(f"single-pass cleaner:                       {single_pass_seconds:.3f} s")
+    print(f"speedup:                                   {legacy_seconds / single_pass_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
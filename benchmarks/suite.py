@@ -0,0 +1,206 @@
+"""
+Benchmark suite of the vectorize-and-match hot path on synthetic Polish-like corpora. Every case is timed `--repeats`
+times and the results are written as JSON, together with the corpus parameters and the environment, so runs of
+different commits can be compared offline:
+
+    python -m benchmarks.suite --size small --output base.json
+    python -m benchmarks.suite --size small --output new.json --compare base.json
+
+With `--compare`, cases whose median time grew by more than `--threshold` are reported as regressions and the suite
+exits with status 1.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy
+import scipy
+import sklearn
+
+from benchmarks.synthetic import generate_documents, generate_extract, generate_near_duplicates
+from text_matcher.parallel import parallel_transform
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import train_vectorizer, transform_and_pick_best_document, \
+    transform_and_pick_best_documents, pick_best_document, pick_best_documents, pick_top_k_documents
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+from text_matcher.wikipedia_connector import remove_sections_and_clean_text
+
+SUITE_VERSION = 1
+DISTANCE_METRICS = ("cosine", "euclidean", "manhattan")
+
+
+class CorpusSize(NamedTuple):
+    documents: int
+    queries: int
+    words_per_document: int
+    vocabulary_size: int
+    articles: int
+    sections: int
+
+
+SIZES = {
+    "small": CorpusSize(documents=1000, queries=100, words_per_document=200, vocabulary_size=20000, articles=20,
+                        sections=20),
+    "medium": CorpusSize(documents=10000, queries=1000, words_per_document=200, vocabulary_size=50000, articles=100,
+                         sections=40),
+    "large": CorpusSize(documents=50000, queries=5000, words_per_document=200, vocabulary_size=100000, articles=500,
+                        sections=40),
+}
+
+
+class Corpus(NamedTuple):
+    documents: List[str]
+    queries: List[str]
+    extracts: List[str]
+
+
+def build_corpus(size: CorpusSize, seed: int) -> Corpus:
+    documents = generate_documents(size.documents, size.words_per_document, size.vocabulary_size, seed)
+    return Corpus(documents, generate_near_duplicates(documents, size.queries, seed=seed + 1),
+                  [generate_extract(size.sections, seed=seed + article) for article in range(size.articles)])
+
+
+def benchmark_cases(corpus: Corpus) -> Dict[str, Callable[[], object]]:
+    """
+    Returns the cases of the suite by name. Vectorizers and vectors the cases only read are prepared here, so only
+    the named operation is timed.
+    """
+    documents, queries = corpus.documents, corpus.queries
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), documents)
+    document_vecs = vectorizer.transform(documents)
+    query_vecs = vectorizer.transform(queries)
+    cache_dir = tempfile.mkdtemp(prefix="text_matcher_bench_")
+    atexit.register(shutil.rmtree, cache_dir, True)
+    vector_cache = VectorCache(cache_dir)
+    parallel_transform(vectorizer, documents, vector_cache=vector_cache)
+
+    cases = {
+        "clean/remove_sections_and_clean_text": lambda: [remove_sections_and_clean_text(text)
+                                                         for text in corpus.extracts],
+        "train/count": lambda: train_vectorizer(CountVectorizerConfig(), documents),
+        "train/tfidf": lambda: train_vectorizer(TfidfVectorizerConfig(), documents),
+        "train/hashing": lambda: train_vectorizer(HashingVectorizerConfig(), documents),
+        "transform/tfidf": lambda: parallel_transform(vectorizer, documents),
+        "transform/tfidf/vector_cache_hits": lambda: parallel_transform(vectorizer, documents,
+                                                                        vector_cache=vector_cache),
+        "match/transform_and_pick_best_document": lambda: transform_and_pick_best_document(
+            vectorizer, documents, queries[0], "cosine"),
+        "batch/transform_and_pick_best_documents": lambda: transform_and_pick_best_documents(
+            vectorizer, documents, queries, "cosine"),
+        "batch/pick_top_k_documents/cosine": lambda: pick_top_k_documents(query_vecs, document_vecs, "cosine", 10),
+    }
+    for metric in DISTANCE_METRICS:
+        cases[f"score/pick_best_document/{metric}"] = \
+            lambda metric=metric: pick_best_document(query_vecs[0], document_vecs, metric)
+        cases[f"batch/pick_best_documents/{metric}"] = \
+            lambda metric=metric: pick_best_documents(query_vecs, document_vecs, metric)
+    return cases
+
+
+def time_case(func: Callable[[], object], repeats: int) -> dict:
+    seconds = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return {"min_seconds": min(seconds), "median_seconds": statistics.median(seconds),
+            "mean_seconds": statistics.mean(seconds), "repeats": repeats}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "scikit-learn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Compares the median times of the cases present in both runs, returning the names of the regressed cases.
+    """
+    if results["parameters"] != baseline["parameters"]:
+        print("warning: the baseline was run on a different corpus, times are not comparable")
+    regressions = []
+    print(f"{'case':<48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before, after = baseline["results"][name]["median_seconds"], result["median_seconds"]
+        ratio = after / before if before else float("inf")
+        regressed = ratio > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<48} {before:>9.4f}s {after:>9.4f}s {ratio:>6.2f}x" + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--documents", type=int, help="Override the number of documents of --size")
+    parser.add_argument("--queries", type=int, help="Override the number of queries of --size")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", help="Run only the cases whose name matches this regular expression")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Median time ratio above which a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    size = SIZES[args.size]._replace(**{name: value for name, value in
+                                        [("documents", args.documents), ("queries", args.queries)]
+                                        if value is not None})
+    corpus = build_corpus(size, args.seed)
+    cases = {name: case for name, case in benchmark_cases(corpus).items()
+             if args.filter is None or re.search(args.filter, name)}
+
+    results = {
+        "suite_version": SUITE_VERSION,
+        "size": args.size,
+        "parameters": {**size._asdict(), "seed": args.seed},
+        "environment": environment(),
+        "results": {},
+    }
+    for name, case in cases.items():
+        results["results"][name] = time_case(case, args.repeats)
+        result = results["results"][name]
+        print(f"{name:<48} median {result['median_seconds']:.4f} s, min {result['min_seconds']:.4f} s")
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
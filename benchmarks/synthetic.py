@@ -0,0 +1,112 @@
+import random
+from typing import List
+
+SYLLABLES = ["ka", "rz", "szcz", "prze", "wie", "ło", "ść", "ni", "dę", "mo", "ja", "ży", "cie", "sta", "po", "gra",
+             "ów", "nia", "ki", "dzie", "wa", "zy", "ro", "ły", "ną", "tę", "li", "śmy", "cho", "go"]
+
+
+def generate_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """
+    Generates `size` distinct Polish-like words built from common syllables.
+    """
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def generate_documents(count: int, words_per_document: int = 200, vocabulary_size: int = 20000,
+                       seed: int = 0) -> List[str]:
+    """
+    Generates `count` documents with a Zipf-like word distribution, so a few words are shared by most documents
+    and the long tail makes every document distinguishable.
+    """
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(vocabulary_size, seed)
+    weights = [1 / rank for rank in range(1, vocabulary_size + 1)]
+    return [" ".join(rng.choices(vocabulary, weights=weights, k=words_per_document)) for _ in range(count)]
+
+
+def generate_near_duplicates(documents: List[str], count: int, keep: float = 0.7, seed: int = 0) -> List[str]:
+    """
+    Generates `count` queries, each a random document with only a `keep` fraction of its words, so every query has a
+    known nearest neighbour.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(documents).split()
+        queries.append(" ".join(word for word in words if rng.random() < keep))
+    return queries
+
+
+def generate_extract(sections: int = 40, words_per_section: int = 500, seed: int = 0) -> str:
+    """
+    Generates a plain-text Wikipedia extract: an introduction and `sections` content sections with subsections,
+    followed by the Polish reference, bibliography and link sections the cleaner removes.
+    """
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(2000, seed)
+
+    def paragraph() -> str:
+        return " ".join(rng.choices(vocabulary, k=words_per_section // 2)) + "."
+
+    parts = [paragraph()]
+    for number in range(sections):
+        parts.append(f"\n\n\n== Sekcja {number} ==\n{paragraph()}\n\n=== Podsekcja {number} ===\n{paragraph()}")
+    for header in ["Zobacz też", "Przypisy", "Bibliografia", "Linki zewnętrzne"]:
+        parts.append(f"\n\n\n== {header} ==\n{paragraph()}")
+    return "".join(parts)
+
+
+def generate_wikipedia_html(sections: int = 30, words_per_paragraph: int = 120, seed: int = 0) -> str:
+    """
+    Generates an HTML page laid out like a Wikipedia article: head with scripts and styles, navigation, a
+    `mw-content-text` div with an infobox, a table of contents, sections with edit links, references and a
+    navigation box, then category links and a footer.
+    """
+    rng = random.Random(seed)
+    vocabulary = generate_vocabulary(2000, seed)
+
+    def words(count: int) -> str:
+        return " ".join(rng.choices(vocabulary, k=count))
+
+    def paragraph() -> str:
+        sentence = words(words_per_paragraph // 3)
+        return (f'<p>{sentence} <a href="/wiki/{rng.choice(vocabulary)}" title="x">{words(3)}</a>, '
+                f'<b>{words(2)}</b> &amp; {words(words_per_paragraph // 3)}<sup id="cite_ref-{rng.randint(1, 99)}" '
+                f'class="reference"><a href="#cite_note-1">[{rng.randint(1, 99)}]</a></sup> '
+                f'{words(words_per_paragraph // 3)}.</p>\n')
+
+    toc = "".join(f'<li class="toclevel-1"><a href="#s{number}"><span class="tocnumber">{number}</span> '
+                  f'<span class="toctext">{words(2)}</span></a></li>' for number in range(sections))
+    body = [
+        '<!DOCTYPE html>\n<html lang="pl" dir="ltr"><head><meta charset="UTF-8"><title>Artykuł</title>',
+        '<script>var wgPageName = "Artykuł"; if (a < b && c > d) { run(); }</script>',
+        '<style>.mw-body { margin: 0 }</style></head>\n<body class="mediawiki skin-vector">',
+        f'<header class="vector-header"><nav><ul><li>{words(5)}</li></ul></nav></header>',
+        '<div id="content" class="mw-body"><h1 id="firstHeading">Artykuł</h1>',
+        '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content"><div class="mw-parser-output">',
+        f'<table class="infobox"><tr><th>{words(2)}</th><td>{words(4)}</td></tr></table>',
+        paragraph(),
+        f'<div id="toc" class="toc" role="navigation"><div class="toctitle"><h2>Spis treści</h2></div><ul>{toc}</ul>'
+        '</div>\n',
+    ]
+    for number in range(sections):
+        body.append(f'<h2><span class="mw-headline" id="s{number}">{words(2)}</span><span class="mw-editsection">'
+                    f'<span class="mw-editsection-bracket">[</span><a href="#">edytuj</a>'
+                    f'<span class="mw-editsection-bracket">]</span></span></h2>\n')
+        body.extend(paragraph() for _ in range(rng.randint(2, 5)))
+        body.append(f'<ul><li>{words(8)}</li><li>{words(8)}</li></ul><br><img src="x.png" alt="">\n')
+    body.extend([
+        f'<h2><span class="mw-headline" id="Przypisy">Przypisy</span></h2><div class="reflist"><ol '
+        f'class="references"><li>{words(10)}</li></ol></div>',
+        f'<div class="navbox"><table><tr><td>{words(30)}</td></tr></table></div>',
+        f'<div class="metadata">{words(5)}</div><!-- NewPP limit report -->',
+        '</div></div>',
+        f'<div id="catlinks"><div class="mw-normal-catlinks">Kategorie: {words(4)}</div></div>',
+        f'</div></div><aside>{words(10)}</aside><footer><ul><li>{words(10)}</li></ul></footer>',
+        '<script>(RLQ=window.RLQ||[]).push(function(){});</script></body></html>',
+    ])
+    return "".join(body)
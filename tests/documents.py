@@ -0,0 +1,16 @@
+import random
+from typing import List, Optional
+
+
+def random_documents(count: int, vocabulary_size: int, max_words: int, min_words: Optional[int] = None,
+                     zipf: bool = False, seed: int = 0) -> List[str]:
+    """
+    Generates `count` documents of `max_words` words each (or a random number from `min_words` to `max_words`) drawn
+    from the words `słowo0`, `słowo1`, ..., uniformly or, with `zipf`, with a Zipf-like distribution.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"słowo{i}" for i in range(vocabulary_size)]
+    weights = [1 / (i + 1) for i in range(vocabulary_size)] if zipf else None
+    return [" ".join(rng.choices(vocabulary, weights=weights,
+                                 k=max_words if min_words is None else rng.randint(min_words, max_words)))
+            for _ in range(count)]
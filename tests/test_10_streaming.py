@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from text_matcher.document_index import build_document_index, save_document_index
+from text_matcher.match_output import format_match_lines
+from text_matcher.sources import checkpoint_path
+from text_matcher.streaming import stream_matches
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+DOCUMENTS = {f"https://pl.wikipedia.org/wiki/Doc{i}": f"dokument numer {i} słowo{i} temat{i % 3}" for i in range(6)}
+
+
+def _fetch_queries(urls, **kwargs):
+    return {url: f"zapytanie słowo{url.rsplit('Q', 1)[1]}" for url in urls}
+
+
+@pytest.mark.unittest
+def test_best_only_lines_report_queries_without_matches():
+    matches = {"Q0": [("Doc0", 0.9), ("Doc1", 0.2)], "Q1": []}
+
+    assert format_match_lines(matches, "text", best_only=True) == ["Best match for Q0 is: Doc0", "No match for Q1"]
+    assert format_match_lines(matches, "csv") == ["Q0,1,Doc0,0.9", "Q0,2,Doc1,0.2"]
+
+
+class TestStreamMatches(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values()))
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        save_vectorizer(vectorizer, self.model_path)
+        save_document_index(build_document_index(vectorizer, DOCUMENTS), self.index_dir)
+        self.query_file = os.path.join(self.tmp_dir.name, "queries.csv")
+        with open(self.query_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"https://pl.wikipedia.org/wiki/Q{i % 6}" for i in range(10)))
+        self.output_path = os.path.join(self.tmp_dir.name, "matches.csv")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _stream(self, **kwargs):
+        return stream_matches("cosine", self.query_file, "unused.csv", self.model_path, chunk_size=3,
+                              output_path=self.output_path, index_dir=self.index_dir, **kwargs)
+
+    def _read_output(self):
+        with open(self.output_path, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    @pytest.mark.unittest
+    @patch('text_matcher.streaming.get_wikipedia_core_texts_contents', side_effect=_fetch_queries)
+    def test_processes_queries_in_bounded_chunks(self, mock_fetch):
+        completed = self._stream()
+
+        self.assertEqual(completed, 10)
+        self.assertEqual([len(call.args[0]) for call in mock_fetch.call_args_list], [3, 3, 3, 1])
+        lines = self._read_output()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(lines[4], "Best match for https://pl.wikipedia.org/wiki/Q4 is: "
+                                   "https://pl.wikipedia.org/wiki/Doc4")
+
+    @pytest.mark.unittest
+    def test_resumes_after_last_completed_chunk(self):
+        with patch('text_matcher.streaming.get_wikipedia_core_texts_contents', side_effect=_fetch_queries):
+            self._stream(k=2, output_format="csv")
+        expected = self._read_output()
+        os.remove(checkpoint_path(self.output_path))
+
+        calls = []
+
+        def interrupted_fetch(urls, **kwargs):
+            calls.append(urls)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return _fetch_queries(urls)
+
+        with patch('text_matcher.streaming.get_wikipedia_core_texts_contents', side_effect=interrupted_fetch):
+            with self.assertRaises(KeyboardInterrupt):
+                self._stream(k=2, output_format="csv")
+        with open(self.output_path, "a", encoding="utf-8") as f:
+            f.write("partially written line")
+        with patch('text_matcher.streaming.get_wikipedia_core_texts_contents',
+                   side_effect=_fetch_queries) as mock_fetch:
+            completed = self._stream(k=2, output_format="csv", resume=True)
+
+        self.assertEqual(completed, 10)
+        self.assertEqual(mock_fetch.call_args_list[0].args[0][0], "https://pl.wikipedia.org/wiki/Q0")
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(self._read_output(), expected)
+        self.assertEqual(expected[0], "query,rank,url,score")
+        self.assertEqual(len(expected), 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
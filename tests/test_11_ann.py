@@ -0,0 +1,173 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from typer.testing import CliRunner
+
+from text_matcher.ann import build_ann_config, build_ann_index, load_ann_index, RandomProjectionConfig, \
+    MinHashConfig, AnnIndex, RandomProjectionIndex, MinHashIndex
+from text_matcher.cli import cli_app
+from text_matcher.document_index import build_document_index, save_document_index, load_document_index
+from text_matcher.vectorizer import train_vectorizer, pick_top_k_documents, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig, CountVectorizerConfig
+from tests.documents import random_documents
+
+
+def _documents(count: int) -> list:
+    return random_documents(count, vocabulary_size=2000, max_words=60)
+
+
+def _near_duplicates(documents: list, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [" ".join(word for word in document.split() if rng.random() < 0.8) for document in documents]
+
+
+class TestAnnIndex(unittest.TestCase):
+    def setUp(self):
+        self.documents = _documents(300)
+        self.queries = _near_duplicates(self.documents[:40])
+
+    @pytest.mark.unittest
+    def test_random_projection_finds_near_duplicates(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+        test_vecs = vectorizer.transform(self.documents)
+
+        index = build_ann_index(RandomProjectionConfig(), test_vecs)
+        indices, _ = index.search(vectorizer.transform(self.queries), test_vecs, 'cosine', 1)
+
+        np.testing.assert_array_equal(indices[:, 0], np.arange(40))
+
+    @pytest.mark.unittest
+    def test_minhash_finds_near_duplicates(self):
+        vectorizer = train_vectorizer(CountVectorizerConfig(binary=True, max_df=1.0), self.documents)
+        test_vecs = vectorizer.transform(self.documents)
+
+        index = build_ann_index(MinHashConfig(n_bands=32, band_size=2), test_vecs)
+        indices, _ = index.search(vectorizer.transform(self.queries), test_vecs, 'cosine', 1)
+
+        np.testing.assert_array_equal(indices[:, 0], np.arange(40))
+
+    @pytest.mark.unittest
+    def test_search_scores_candidates_exactly(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+        test_vecs = vectorizer.transform(self.documents)
+        query_vecs = vectorizer.transform(self.queries)
+        index = build_ann_index(RandomProjectionConfig(n_tables=4, n_bits=6), test_vecs)
+
+        indices, scores = index.search(query_vecs, test_vecs, 'euclidean', 5)
+
+        for row, candidates in enumerate(index.candidates(query_vecs)):
+            expected, expected_scores = pick_top_k_documents(query_vecs[row], test_vecs[candidates], 'euclidean', 5)
+            found = indices[row] >= 0
+            np.testing.assert_array_equal(indices[row, found], candidates[expected[0]])
+            np.testing.assert_allclose(scores[row, found], expected_scores[0])
+            self.assertTrue(np.isnan(scores[row, ~found]).all())
+
+    @pytest.mark.unittest
+    def test_pads_results_when_fewer_candidates_than_k(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+        test_vecs = vectorizer.transform(self.documents)
+        index = build_ann_index(RandomProjectionConfig(n_tables=1, n_bits=64, probe_radius=0), test_vecs)
+
+        indices, scores = index.search(test_vecs[:1], test_vecs, 'cosine', 3)
+
+        self.assertEqual(indices[0].tolist(), [0, -1, -1])
+        self.assertTrue(np.isnan(scores[0, 1:]).all())
+
+    @pytest.mark.unittest
+    def test_round_trips_through_directory(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+        test_vecs = vectorizer.transform(self.documents)
+        query_vecs = vectorizer.transform(self.queries)
+        index = build_ann_index(MinHashConfig(seed=7), test_vecs)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index.save(tmp_dir)
+            loaded = load_ann_index(tmp_dir)
+
+            self.assertIsInstance(loaded, MinHashIndex)
+            self.assertEqual(loaded.config, index.config)
+            self.assertFalse(loaded.sorted_keys.flags.writeable)
+            for found, expected in zip(loaded.candidates(query_vecs), index.candidates(query_vecs)):
+                np.testing.assert_array_equal(found, expected)
+
+    @pytest.mark.unittest
+    def test_document_index_keeps_ann_backend(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+        documents = {f"https://pl.wikipedia.org/wiki/{i}": text for i, text in enumerate(self.documents)}
+        query_vecs = vectorizer.transform(self.queries)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_document_index(build_document_index(vectorizer, documents, RandomProjectionConfig()), tmp_dir)
+            index = load_document_index(tmp_dir, vectorizer)
+            approximate, _ = index.search(query_vecs, 'cosine', 1)
+            exact, _ = index.search(query_vecs, 'cosine', 1, exact=True)
+
+        self.assertIsInstance(index.ann, RandomProjectionIndex)
+        np.testing.assert_array_equal(approximate, exact)
+
+
+@pytest.mark.unittest
+def test_backend_without_hash_keys_cannot_be_constructed():
+    class IncompleteIndex(AnnIndex):
+        ann_type = 'incomplete'
+
+    with pytest.raises(TypeError):
+        IncompleteIndex(RandomProjectionConfig())
+
+
+@pytest.mark.unittest
+def test_build_ann_config():
+    assert build_ann_config('random-projection', '{"n_bits": 8}') == RandomProjectionConfig(n_bits=8)
+    assert build_ann_config('minhash', '{}') == MinHashConfig()
+    with pytest.raises(ValidationError):
+        build_ann_config('minhash', '{"n_bits": 8}')
+    with pytest.raises(ValidationError):
+        build_ann_config('random-projection', '{"n_bits": 65}')
+    with pytest.raises(ValueError):
+        build_ann_config('kd-tree', '{}')
+
+
+@pytest.mark.unittest
+def test_cli_index_with_ann_and_exact_pick_best():
+    runner = CliRunner()
+    texts = _documents(50)
+    documents = {f"https://pl.wikipedia.org/wiki/{i}": text for i, text in enumerate(texts)}
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), texts)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_file = os.path.join(tmp_dir, "documents.csv")
+        with open(documents_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(documents.keys()))
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        index_dir = os.path.join(tmp_dir, "index")
+        save_vectorizer(vectorizer, model_path)
+        query_url = "https://pl.wikipedia.org/wiki/7"
+
+        with patch('text_matcher.core.get_wikipedia_revisions', return_value=dict.fromkeys(documents, "1")), \
+                patch('text_matcher.core.get_wikipedia_core_texts_contents', return_value=documents):
+            invalid = runner.invoke(cli_app, ["index", "--documents-path", documents_file, "--vectorizer-path",
+                                              model_path, "--index-dir", index_dir, "--ann", "minhash",
+                                              "--ann-params", '{"n_bits": 8}'])
+            indexed = runner.invoke(cli_app, ["index", "--documents-path", documents_file, "--vectorizer-path",
+                                              model_path, "--index-dir", index_dir, "--ann", "random-projection"])
+        with patch('text_matcher.core.get_wikipedia_core_text_content', return_value=documents[query_url]):
+            approximate = runner.invoke(cli_app, ["pick-best", query_url, "--vectorizer-path", model_path,
+                                                  "--index", index_dir])
+            exact = runner.invoke(cli_app, ["pick-best", query_url, "--vectorizer-path", model_path, "--index",
+                                            index_dir, "--exact"])
+
+        assert invalid.exit_code == 1
+        assert "Invalid ANN parameters" in invalid.output
+        assert indexed.exit_code == 0
+        assert os.path.isdir(os.path.join(index_dir, "ann"))
+        assert approximate.output.strip() == f"Best match: {query_url}"
+        assert exact.output.strip() == f"Best match: {query_url}"
+
+
+if __name__ == '__main__':
+    unittest.main()
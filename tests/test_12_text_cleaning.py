@@ -0,0 +1,76 @@
+import random
+import re
+
+import pytest
+
+from text_matcher.wikipedia_connector import remove_sections_and_clean_text, compile_section_patterns, \
+    section_headers, SECTION_HEADERS, FILTER
+
+
+def _legacy_remove_sections_and_clean_text(text: str, headers: list) -> str:
+    # the multi-pass implementation the single-pass cleaner must reproduce byte for byte
+    for header in headers:
+        pattern = re.compile(rf"{re.escape(header)}.*?(?=^==\s|\Z)", re.DOTALL | re.MULTILINE)
+        text = re.sub(pattern, '', text)
+    text = re.sub(r'^==.*?==\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def _random_extract(rng: random.Random, headers: tuple) -> str:
+    words = ["pies", "kot", "zażółć", "gęślą", "jaźń", "=", "==", "Przypisy", "1999", "(ur.", "—", "x y"]
+    separators = [" ", " ", " ", "\n", "\n\n", "\t", "\r\n", " "]
+
+    def paragraph() -> str:
+        return "".join(rng.choice(words) + rng.choice(separators) for _ in range(rng.randint(0, 30)))
+
+    parts = [paragraph()]
+    for _ in range(rng.randint(0, 8)):
+        header = rng.choice(list(headers) + ["== Historia ==", "=== Podsekcja ===", "==== Głębiej ====",
+                                             "== Opis ==", "==Bez spacji=="])
+        parts.append(f"\n{header}{rng.choice(['', ' ', chr(10), chr(10) * 3])}{paragraph()}")
+    return "".join(parts)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("language", sorted(SECTION_HEADERS))
+def test_matches_legacy_cleaner_on_random_extracts(language):
+    rng = random.Random(language)
+    headers = list(section_headers(language))
+
+    for _ in range(500):
+        text = _random_extract(rng, SECTION_HEADERS[language])
+        assert remove_sections_and_clean_text(text, headers) == _legacy_remove_sections_and_clean_text(text, headers)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "   \n\t ",
+        "Wstęp.\n\n== Historia ==\nTreść.\n\n== Przypisy ==\n[1] Źródło.\n\n== Linki zewnętrzne ==\nhttp://x",
+        "Wstęp.\n== Przypisy ==\n=== Uwagi ===\nuwaga\n== Opis ==\nOpis zostaje.",
+        "Wstęp.\n== Zobacz też ==",
+        "== Przypisy ==\nna samym początku\n== Dalej ==\ntreść",
+        "Tekst z == Bibliografia == w środku linii\n== Opis ==\nkoniec",
+        "Wstęp\r\n== Historia ==\r\nTreść\r\n== Przypisy ==\r\nx",
+        "==Nagłówek bez spacji==\nTreść\n==\n== ==",
+        "Wstęp\n=== Przypisy ===\npodsekcja\n== Opis ==\nkoniec",
+        "Wstęp\n== Bibliografia == Przypisy ==\nx\n== Opis ==\nkoniec",
+    ]
+)
+def test_matches_legacy_cleaner_on_edge_cases(text):
+    assert remove_sections_and_clean_text(text, FILTER) == _legacy_remove_sections_and_clean_text(text, FILTER)
+    assert remove_sections_and_clean_text(text, []) == _legacy_remove_sections_and_clean_text(text, [])
+
+
+@pytest.mark.unittest
+def test_compiles_pattern_once_per_header_set():
+    assert compile_section_patterns(tuple(FILTER)) is compile_section_patterns(SECTION_HEADERS["pl"])
+
+
+@pytest.mark.unittest
+def test_rejects_unknown_language():
+    with pytest.raises(ValueError):
+        section_headers("xx")
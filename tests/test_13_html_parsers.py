@@ -0,0 +1,103 @@
+import random
+import unittest
+from unittest.mock import patch, Mock
+
+import pytest
+
+from text_matcher.wikipedia_scraper import _parse_html_content, scrape_wikipedia_core_texts_contents, PARSERS
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>Tytuł</title><script>var a = 1 < 2;</script></head>
+<body><header><nav>Menu główne</nav></header>
+<div id="content"><h1>Pies</h1>
+<div id="mw-content-text" class="mw-body-content">
+<p>Pies <b>domowy</b>&nbsp;&amp; wilk<sup class="reference">[1]</sup>.</p>
+<div id="toc" class="toc"><ul><li>1 Historia</li></ul></div>
+<h2><span class="mw-headline">Historia</span><span class="mw-editsection">[edytuj]</span></h2>
+<p>Udomowiony <ruby>犬<rt>inu</rt></ruby> dawno<br>temu.<!-- komentarz --></p>
+<div class="navbox wide"><table><tr><td>Ssaki</td></tr></table></div>
+<div class="metadata">Metadane</div><aside>Ramka</aside><style>.x {}</style>
+</div>
+<div id="catlinks"><div class="mw-normal-catlinks">Kategorie: Psy</div></div>
+</div><footer>Stopka</footer></body></html>"""
+
+MALFORMED = [
+    "",
+    "<p>bez body</p>",
+    "<html><body>Test</body></html>",
+    "<body>a<nav>x</nav>b<div class='toc'>c</div>d</body>",
+    "<body><div id='mw-content-text'>a<div>b</p>c</div>d</div>e</body>",
+    "<body><div id='mw-content-text'><nav>a<div id='mw-content-text'>b</div></nav>c</div></body>",
+    "<body><div id='mw-content-text'>x<3y &amp &bogus; &#150; &#x41;<br>z</br>w<br/>v</div></body>",
+    "<body><template><p>t</p><![CDATA[cd]]></template><?pi x?>u<rp>(</rp></body>",
+    "<body><div class>a</div><div class='a toc'>b</div><div class='toc' class='ok'>c</div></body>",
+    "<body><img><img/><div>after</div></img></body>",
+]
+
+
+def _random_markup(rng: random.Random) -> str:
+    tags = ["div", "p", "span", "nav", "aside", "script", "template", "rt", "br", "img", "body", "footer"]
+    texts = ["Ala", " ", "\n", "&amp;", "&#150;", "x<3y", "<!-- c -->", "<![CDATA[cd]]>", "zażółć"]
+    attributes = ["", "", " class='toc'", " class='navbox x'", " id='mw-content-text'"]
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        tag = rng.choice(tags)
+        parts.append(rng.choice([f"<{tag}{rng.choice(attributes)}>", f"</{tag}>", f"<{tag}/>", rng.choice(texts),
+                                 rng.choice(texts)]))
+    return f"<html><body>{''.join(parts)}</body></html>"
+
+
+class TestHtmlParsers(unittest.TestCase):
+    @pytest.mark.unittest
+    def test_extracts_main_content_without_unwanted_elements(self):
+        for parser in PARSERS:
+            with self.subTest(parser=parser):
+                text = _parse_html_content(PAGE.encode("utf-8"), parser)
+
+                self.assertEqual(text, "Pies domowy & wilk [1] . Historia [edytuj] Udomowiony 犬 dawno temu.")
+
+    @pytest.mark.unittest
+    def test_streaming_matches_beautifulsoup_on_malformed_markup(self):
+        for markup in MALFORMED:
+            with self.subTest(markup=markup):
+                self.assertEqual(_parse_html_content(markup.encode("utf-8"), "streaming"),
+                                 _parse_html_content(markup.encode("utf-8"), "html.parser"))
+
+    @pytest.mark.unittest
+    def test_streaming_matches_beautifulsoup_on_random_markup(self):
+        rng = random.Random(0)
+
+        for _ in range(300):
+            markup = _random_markup(rng).encode("utf-8")
+            self.assertEqual(_parse_html_content(markup, "streaming"), _parse_html_content(markup, "html.parser"))
+
+    @pytest.mark.unittest
+    def test_streaming_decodes_declared_encoding(self):
+        markup = '<html><head><meta charset="iso-8859-2"></head><body>Łódź &#150;</body></html>'.encode("iso-8859-2")
+
+        self.assertEqual(_parse_html_content(markup, "streaming"), "Łódź –")
+        self.assertEqual(_parse_html_content(markup, "html.parser"), "Łódź –")
+
+    @pytest.mark.unittest
+    def test_rejects_unknown_parser(self):
+        with self.assertRaises(ValueError):
+            scrape_wikipedia_core_texts_contents(["https://pl.wikipedia.org/wiki/Pies"], parser="regex")
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_parses_pages_in_process_pool_in_order(self, mock_get):
+        def page(url):
+            response = Mock()
+            response.content = f"<html><body><p>{url[-1]}</p></body></html>".encode("utf-8")
+            return response
+
+        mock_get.side_effect = page
+        urls = [f"https://pl.wikipedia.org/wiki/{letter}" for letter in "abcde"]
+
+        result = scrape_wikipedia_core_texts_contents(urls, processes=2)
+
+        self.assertEqual(result, {url: url[-1] for url in urls})
+
+
+if __name__ == '__main__':
+    unittest.main()
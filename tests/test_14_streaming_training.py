@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.sources import checkpoint_path
+from text_matcher.streaming_training import train_vectorizer_streaming, stream_train_and_save_vectorizer, \
+    VocabularyCounts
+from text_matcher.vectorizer import train_vectorizer, load_vectorizer, build_vectorizer
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+from tests.documents import random_documents
+
+URLS = [f"https://pl.wikipedia.org/wiki/T{i}" for i in range(10)]
+
+
+def _documents(count: int) -> list:
+    return random_documents(count, vocabulary_size=300, max_words=60, min_words=5, zipf=True)
+
+
+DOCUMENTS = dict(zip(URLS, _documents(len(URLS))))
+
+
+def _fetch_documents(urls, **kwargs):
+    return {url: DOCUMENTS[url] for url in urls}
+
+
+class TestTrainVectorizerStreaming(unittest.TestCase):
+    def setUp(self):
+        self.documents = _documents(200)
+
+    def _assert_same_vectors(self, vectorizer_config):
+        expected = train_vectorizer(vectorizer_config, self.documents)
+        vectorizer = train_vectorizer_streaming(vectorizer_config, iter(self.documents))
+
+        self.assertEqual(vectorizer.vocabulary_, expected.vocabulary_)
+        np.testing.assert_array_equal(vectorizer.transform(self.documents).toarray(),
+                                      expected.transform(self.documents).toarray())
+
+    @pytest.mark.unittest
+    def test_count_vocabulary_equals_fit(self):
+        self._assert_same_vectors(CountVectorizerConfig())
+        self._assert_same_vectors(CountVectorizerConfig(max_df=0.5, min_df=2, ngram_range=(1, 2)))
+        self._assert_same_vectors(CountVectorizerConfig(max_df=1.0, binary=True, max_features=40))
+
+    @pytest.mark.unittest
+    def test_tfidf_weights_equal_fit(self):
+        self._assert_same_vectors(TfidfVectorizerConfig())
+        self._assert_same_vectors(TfidfVectorizerConfig(smooth_idf=False, min_df=3))
+        self._assert_same_vectors(TfidfVectorizerConfig(use_idf=False, sublinear_tf=True))
+
+    @pytest.mark.unittest
+    def test_max_features_keeps_most_frequent_terms(self):
+        documents = ["alfa alfa alfa beta", "alfa beta gamma", "beta delta"]
+
+        vectorizer = train_vectorizer_streaming(CountVectorizerConfig(max_df=1.0, max_features=2), iter(documents))
+
+        self.assertEqual(vectorizer.vocabulary_, {"alfa": 0, "beta": 1})
+
+    @pytest.mark.unittest
+    def test_bounded_vocabulary_keeps_frequent_terms(self):
+        counts = VocabularyCounts(max_terms=20)
+        analyzer = build_vectorizer(CountVectorizerConfig()).build_analyzer()
+
+        counts.update(analyzer, self.documents)
+
+        self.assertLessEqual(len(counts.document_frequencies), 20)
+        self.assertEqual(counts.n_documents, 200)
+        self.assertIn("słowo0", counts.document_frequencies)
+
+    @pytest.mark.unittest
+    def test_hashing_does_not_read_documents(self):
+        def documents():
+            raise AssertionError("documents read")
+            yield
+
+        vectorizer = train_vectorizer_streaming(HashingVectorizerConfig(n_features=64), documents())
+
+        self.assertEqual(vectorizer.transform(["słowo"]).shape, (1, 64))
+
+    @pytest.mark.unittest
+    def test_empty_vocabulary(self):
+        with self.assertRaises(ValueError):
+            train_vectorizer_streaming(CountVectorizerConfig(), iter(["a", ""]))
+
+
+class TestStreamTrainAndSaveVectorizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.train_file = os.path.join(self.tmp_dir.name, "train.csv")
+        with open(self.train_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(URLS))
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @pytest.mark.unittest
+    @patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents', side_effect=_fetch_documents)
+    def test_trains_in_bounded_chunks(self, mock_fetch):
+        trained = stream_train_and_save_vectorizer(self.model_path, self.train_file, TfidfVectorizerConfig(), 4)
+
+        self.assertEqual(trained, 10)
+        self.assertEqual([len(call.args[0]) for call in mock_fetch.call_args_list], [4, 4, 2])
+        expected = train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values()))
+        vectorizer = load_vectorizer(self.model_path)
+        self.assertEqual(vectorizer.vocabulary_, expected.vocabulary_)
+        np.testing.assert_array_equal(vectorizer.idf_, expected.idf_)
+        self.assertFalse(os.path.exists(checkpoint_path(self.model_path)))
+
+    @pytest.mark.unittest
+    def test_resumes_after_last_counted_chunk(self):
+        calls = []
+
+        def interrupted(urls, **kwargs):
+            calls.append(urls)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return _fetch_documents(urls)
+
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents', side_effect=interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                stream_train_and_save_vectorizer(self.model_path, self.train_file, CountVectorizerConfig(), 4)
+        with np.load(checkpoint_path(self.model_path), allow_pickle=False) as arrays:
+            self.assertEqual(json.loads(arrays["checkpoint"].tobytes())["completed_urls"], 4)
+
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents',
+                   side_effect=_fetch_documents) as mock_fetch:
+            trained = stream_train_and_save_vectorizer(self.model_path, self.train_file, CountVectorizerConfig(), 4,
+                                                       resume=True)
+            self.assertEqual(mock_fetch.call_args_list[0].args[0], URLS[4:8])
+
+        self.assertEqual(trained, 10)
+        expected = train_vectorizer(CountVectorizerConfig(), list(DOCUMENTS.values()))
+        self.assertEqual(load_vectorizer(self.model_path).vocabulary_, expected.vocabulary_)
+
+    @pytest.mark.unittest
+    def test_resumes_max_features_counts_with_term_frequencies(self):
+        config = TfidfVectorizerConfig(max_features=5, ngram_range=(1, 2))
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents',
+                   side_effect=[_fetch_documents(URLS[:4]), KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                stream_train_and_save_vectorizer(self.model_path, self.train_file, config, 4)
+
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents',
+                   side_effect=_fetch_documents):
+            stream_train_and_save_vectorizer(self.model_path, self.train_file, config, 4, resume=True)
+
+        expected = train_vectorizer_streaming(config, iter(DOCUMENTS.values()))
+        self.assertEqual(load_vectorizer(self.model_path).vocabulary_, expected.vocabulary_)
+
+    @pytest.mark.unittest
+    def test_refuses_checkpoint_of_other_parameters(self):
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents',
+                   side_effect=[_fetch_documents(URLS[:4]), KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                stream_train_and_save_vectorizer(self.model_path, self.train_file, CountVectorizerConfig(), 4)
+
+        with self.assertRaises(ValueError):
+            stream_train_and_save_vectorizer(self.model_path, self.train_file, CountVectorizerConfig(binary=True), 4,
+                                             resume=True)
+
+    @pytest.mark.unittest
+    @patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents')
+    def test_hashing_does_not_download(self, mock_fetch):
+        trained = stream_train_and_save_vectorizer(self.model_path, self.train_file, HashingVectorizerConfig(), 4)
+
+        self.assertEqual(trained, 0)
+        mock_fetch.assert_not_called()
+        self.assertEqual(load_vectorizer(self.model_path).n_features, HashingVectorizerConfig().n_features)
+
+
+@pytest.mark.unittest
+def test_cli_train_streaming():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_file = os.path.join(tmp_dir, "train.csv")
+        with open(train_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(URLS))
+        model_path = os.path.join(tmp_dir, "model.pkl")
+
+        invalid = runner.invoke(cli_app, ["train", "--train-file-path", train_file, "--output-model-path", model_path,
+                                          "--chunk-size", "0"])
+        with patch('text_matcher.streaming_training.get_wikipedia_core_texts_contents',
+                   side_effect=_fetch_documents):
+            result = runner.invoke(cli_app, ["train", "--vectorizer-type", "tfidf", "--train-file-path", train_file,
+                                             "--output-model-path", model_path, "--chunk-size", "3",
+                                             "--max-terms", "100"])
+
+        assert invalid.exit_code == 1
+        assert result.exit_code == 0
+        assert len(load_vectorizer(model_path).vocabulary_) <= 100
+
+
+if __name__ == '__main__':
+    unittest.main()
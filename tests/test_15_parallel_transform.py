@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.document_index import load_document_index
+from text_matcher.parallel import parallel_transform, resolve_n_jobs
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+from tests.documents import random_documents
+
+
+def _documents(count: int, seed: int = 0) -> list:
+    return random_documents(count, vocabulary_size=1000, max_words=50, min_words=0, seed=seed)
+
+
+class TestParallelTransform(unittest.TestCase):
+    def setUp(self):
+        self.documents = _documents(600)
+
+    def _assert_equals_transform(self, vectorizer, **kwargs):
+        expected = vectorizer.transform(self.documents)
+
+        vectors = parallel_transform(vectorizer, self.documents, 2, **kwargs)
+
+        self.assertEqual(vectors.shape, expected.shape)
+        self.assertEqual(vectors.dtype, expected.dtype)
+        np.testing.assert_array_equal(vectors.indptr, expected.indptr)
+        np.testing.assert_array_equal(vectors.indices, expected.indices)
+        np.testing.assert_array_equal(vectors.data, expected.data)
+
+    @pytest.mark.unittest
+    def test_equals_transform(self):
+        self._assert_equals_transform(train_vectorizer(CountVectorizerConfig(max_df=1.0), self.documents))
+        self._assert_equals_transform(train_vectorizer(TfidfVectorizerConfig(), self.documents), shard_size=7)
+        self._assert_equals_transform(train_vectorizer(HashingVectorizerConfig(n_features=2 ** 12), []))
+
+    @pytest.mark.unittest
+    @patch('text_matcher.parallel.ProcessPoolExecutor')
+    def test_small_inputs_skip_the_pool(self, mock_pool):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), self.documents)
+
+        vectors = parallel_transform(vectorizer, self.documents[:10], 4)
+
+        mock_pool.assert_not_called()
+        self.assertEqual(vectors.shape[0], 10)
+
+    @pytest.mark.unittest
+    def test_resolve_n_jobs(self):
+        self.assertEqual(resolve_n_jobs(None), 1)
+        self.assertEqual(resolve_n_jobs(3), 3)
+        self.assertEqual(resolve_n_jobs(-1), os.cpu_count())
+        with self.assertRaises(ValueError):
+            resolve_n_jobs(0)
+
+
+@pytest.mark.unittest
+def test_cli_index_with_n_jobs():
+    runner = CliRunner()
+    texts = _documents(600, seed=1)
+    documents = {f"https://pl.wikipedia.org/wiki/{i}": text for i, text in enumerate(texts)}
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), texts)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_file = os.path.join(tmp_dir, "documents.csv")
+        with open(documents_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(documents.keys()))
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        index_dir = os.path.join(tmp_dir, "index")
+        save_vectorizer(vectorizer, model_path)
+
+        invalid = runner.invoke(cli_app, ["index", "--documents-path", documents_file, "--vectorizer-path",
+                                          model_path, "--index-dir", index_dir, "--n-jobs", "0"])
+        with patch('text_matcher.core.get_wikipedia_revisions', return_value=dict.fromkeys(documents, "1")), \
+                patch('text_matcher.core.get_wikipedia_core_texts_contents', return_value=documents):
+            indexed = runner.invoke(cli_app, ["index", "--documents-path", documents_file, "--vectorizer-path",
+                                              model_path, "--index-dir", index_dir, "--n-jobs", "2"])
+        index = load_document_index(index_dir, vectorizer)
+
+        assert invalid.exit_code == 1
+        assert indexed.exit_code == 0
+        assert (index.vectors != vectorizer.transform(texts)).nnz == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import http.client
+import json
+import os
+import pickle
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from text_matcher.document_index import build_document_index, save_document_index
+from text_matcher.server import MatchService, build_server
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig, CountVectorizerConfig
+
+DOCUMENTS = {f"https://pl.wikipedia.org/wiki/Doc{i}": f"dokument numer {i} słowo{i} temat{i % 3}" for i in range(6)}
+QUERY_URL = "https://pl.wikipedia.org/wiki/Q4"
+
+
+def _fetch_queries(urls, **kwargs):
+    return {url: "zapytanie słowo4" for url in urls if url == QUERY_URL}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+class TestMatchServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values()))
+        save_vectorizer(vectorizer, self.model_path)
+        save_document_index(build_document_index(vectorizer, DOCUMENTS), self.index_dir)
+        self.service = MatchService(self.model_path, "unused.csv", self.index_dir)
+        self.server = build_server(self.service, port=0)
+        self._start(self.server)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _start(self, server):
+        thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def _request(self, method: str, path: str, body=None, connection=None):
+        connection = connection or http.client.HTTPConnection("127.0.0.1", self.server.server_port)
+        payload = body if isinstance(body, (bytes, type(None))) else json.dumps(body).encode("utf-8")
+        connection.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        result = response.status, json.loads(response.read())
+        connection.close()
+        return result
+
+    @pytest.mark.unittest
+    def test_matches_raw_text(self):
+        status, body = self._request("POST", "/match", {"text": "zapytanie słowo2", "k": 2})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["query"], "zapytanie słowo2")
+        self.assertEqual(len(body["matches"]), 2)
+        self.assertEqual(body["matches"][0]["url"], "https://pl.wikipedia.org/wiki/Doc2")
+
+    @pytest.mark.unittest
+    @patch('text_matcher.server.get_wikipedia_core_texts_contents', side_effect=_fetch_queries)
+    def test_matches_batch_of_urls_and_texts(self, mock_fetch):
+        status, body = self._request("POST", "/match", {"queries": [
+            {"url": QUERY_URL}, {"text": "słowo1"}, {"url": "https://pl.wikipedia.org/wiki/Missing"}]})
+
+        self.assertEqual(status, 200)
+        results = body["results"]
+        self.assertEqual(results[0]["matches"][0]["url"], "https://pl.wikipedia.org/wiki/Doc4")
+        self.assertEqual(results[1]["matches"][0]["url"], "https://pl.wikipedia.org/wiki/Doc1")
+        self.assertIn("error", results[2])
+        mock_fetch.assert_called_once()
+
+    @pytest.mark.unittest
+    def test_rejects_malformed_requests(self):
+        for body in [b"not json", {"url": "a", "text": "b"}, {"queries": []}, {"text": "a", "k": 0},
+                     {"text": "a", "distance_metric": "hamming"}]:
+            status, response = self._request("POST", "/match", body)
+            self.assertEqual(status, 400, body)
+            self.assertIn("error", response)
+        self.assertEqual(self._request("GET", "/unknown")[0], 404)
+
+    @pytest.mark.unittest
+    def test_reports_latency_metrics(self):
+        for body in [{"text": "słowo1"}, {"queries": [{"text": "słowo2"}, {"text": "słowo3"}]}, {"text": 1}]:
+            self._request("POST", "/match", body)
+
+        status, metrics = self._request("GET", "/metrics")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(metrics["queries"], 3)
+        self.assertEqual(metrics["endpoints"]["match"]["requests"], 3)
+        self.assertEqual(metrics["endpoints"]["match"]["errors"], 1)
+        self.assertGreater(metrics["endpoints"]["match"]["latency_ms"]["p99"], 0)
+
+    @pytest.mark.unittest
+    def test_reloads_configured_paths_and_refuses_mismatched_index(self):
+        documents = {f"https://pl.wikipedia.org/wiki/New{i}": f"nowy tekst {i} wyraz{i}" for i in range(3)}
+        vectorizer = train_vectorizer(CountVectorizerConfig(), list(documents.values()))
+        save_document_index(build_document_index(vectorizer, documents), self.index_dir)
+
+        mismatch, _ = self._request("POST", "/reload")
+        self.assertEqual(self.service.status()["documents"], 6)
+        save_vectorizer(vectorizer, self.model_path)
+        status, body = self._request("POST", "/reload")
+        _, match = self._request("POST", "/match", {"text": "wyraz2"})
+
+        self.assertEqual(mismatch, 409)
+        self.assertEqual(status, 200)
+        self.assertEqual(body["documents"], 3)
+        self.assertEqual(match["matches"][0]["url"], "https://pl.wikipedia.org/wiki/New2")
+
+    @pytest.mark.unittest
+    def test_reload_refuses_paths_and_pickled_models(self):
+        other_model_path = os.path.join(self.tmp_dir.name, "other_model.npz")
+        save_vectorizer(train_vectorizer(CountVectorizerConfig(), list(DOCUMENTS.values())), other_model_path)
+        with open(self.model_path, "wb") as f:
+            pickle.dump(train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values())), f)
+
+        with_path, _ = self._request("POST", "/reload", {"vectorizer_path": other_model_path})
+        pickled, body = self._request("POST", "/reload")
+
+        self.assertEqual(with_path, 400)
+        self.assertEqual(pickled, 500)
+        self.assertIn("convert-model", body["error"])
+        self.assertEqual(self.service.status()["documents"], 6)
+
+    @pytest.mark.unittest
+    def test_serves_on_unix_socket(self):
+        path = os.path.join(self.tmp_dir.name, "server.sock")
+        self._start(build_server(self.service, unix_socket=path))
+
+        status, body = self._request("GET", "/health", connection=UnixHTTPConnection(path))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["documents"], 6)
+
+    @pytest.mark.unittest
+    def test_unix_socket_replaces_only_stale_sockets(self):
+        path = os.path.join(self.tmp_dir.name, "server.sock")
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()
+        self._start(build_server(self.service, unix_socket=path))
+        other_path = os.path.join(self.tmp_dir.name, "index.json")
+        with open(other_path, "w") as f:
+            f.write("{}")
+
+        status, _ = self._request("GET", "/health", connection=UnixHTTPConnection(path))
+        with self.assertRaises(FileExistsError):
+            build_server(self.service, unix_socket=other_path)
+
+        self.assertEqual(status, 200)
+        with open(other_path) as f:
+            self.assertEqual(f.read(), "{}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.core import load_documents
+from text_matcher.sources import detect_source_type, iter_local_documents, iter_document_chunks
+
+DOCUMENTS = {f"doc{i}": f"dokument numer {i} słowo{i} temat{i % 3}" for i in range(6)}
+
+
+def _no_network(*args, **kwargs):
+    raise AssertionError("network access")
+
+
+class TestSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        self.documents_dir = os.path.join(self.root, "documents")
+        os.makedirs(os.path.join(self.documents_dir, "nested"))
+        for i, (key, text) in enumerate(DOCUMENTS.items()):
+            directory = self.documents_dir if i % 2 else os.path.join(self.documents_dir, "nested")
+            self._write(os.path.join(directory, f"{key}.txt"), text)
+        self._write(os.path.join(self.documents_dir, "notes.md"), "not a document")
+        self.jsonl_path = os.path.join(self.root, "documents.jsonl")
+        self._write(self.jsonl_path, "\n".join(json.dumps({"id": key, "text": text}, ensure_ascii=False)
+                                               for key, text in DOCUMENTS.items()) + "\n\n")
+        self.urls_path = os.path.join(self.root, "urls.txt")
+        self._write(self.urls_path, "https://pl.wikipedia.org/wiki/Automat\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _write(path: str, text: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    @pytest.mark.unittest
+    def test_detects_source_types(self):
+        self.assertEqual(detect_source_type("-"), "stdin")
+        self.assertEqual(detect_source_type("https://pl.wikipedia.org/wiki/Automat"), "url")
+        self.assertEqual(detect_source_type(self.documents_dir), "directory")
+        self.assertEqual(detect_source_type(self.jsonl_path), "jsonl")
+        self.assertEqual(detect_source_type(self.urls_path), "urls")
+        self.assertEqual(detect_source_type(os.path.join(self.documents_dir, "doc1.txt")), "file")
+        with self.assertRaises(ValueError):
+            detect_source_type(os.path.join(self.root, "missing.csv"))
+
+    @pytest.mark.unittest
+    def test_reads_directory_recursively_in_order(self):
+        documents = list(iter_local_documents(self.documents_dir, "directory"))
+
+        self.assertEqual([os.path.relpath(path, self.documents_dir) for path, _ in documents],
+                         ["doc1.txt", "doc3.txt", "doc5.txt", os.path.join("nested", "doc0.txt"),
+                          os.path.join("nested", "doc2.txt"), os.path.join("nested", "doc4.txt")])
+        self.assertEqual(documents[0][1], DOCUMENTS["doc1"])
+
+    @pytest.mark.unittest
+    def test_reads_jsonl_and_stdin_records(self):
+        self.assertEqual(dict(iter_local_documents(self.jsonl_path, "jsonl")), DOCUMENTS)
+        with patch("sys.stdin", io.StringIO('{"url": "u", "text": "a"}\n{"text": "b"}\n')):
+            self.assertEqual(load_documents("-"), {"u": "a", "<stdin>:2": "b"})
+        with patch("sys.stdin", io.StringIO('{"id": "u"}\n')):
+            with self.assertRaises(ValueError):
+                load_documents("-")
+
+    @pytest.mark.unittest
+    def test_chunks_skip_consumed_entries(self):
+        chunks = list(iter_document_chunks(self.jsonl_path, None, 4, _no_network, skip=1))
+
+        self.assertEqual([consumed for consumed, _ in chunks], [4, 1])
+        self.assertEqual(list(chunks[0][1]), ["doc1", "doc2", "doc3", "doc4"])
+
+    @pytest.mark.unittest
+    @patch('text_matcher.core.get_wikipedia_core_texts_contents', return_value={"u": "tekst"})
+    def test_wikipedia_sources_are_fetched(self, mock_fetch):
+        self.assertEqual(load_documents(self.urls_path), {"u": "tekst"})
+        mock_fetch.assert_called_once()
+        self.assertEqual(mock_fetch.call_args.args[0], ["https://pl.wikipedia.org/wiki/Automat"])
+
+
+@pytest.mark.unittest
+@patch('requests.Session.get', side_effect=_no_network)
+@patch('requests.get', side_effect=_no_network)
+def test_cli_runs_offline_on_local_sources(*mocks):
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_dir = os.path.join(tmp_dir, "documents")
+        os.makedirs(documents_dir)
+        for key, text in DOCUMENTS.items():
+            with open(os.path.join(documents_dir, f"{key}.txt"), "w", encoding="utf-8") as f:
+                f.write(text)
+        queries_path = os.path.join(tmp_dir, "queries.jsonl")
+        with open(queries_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps({"id": f"q{i}", "text": f"zapytanie słowo{i}"}) for i in (2, 5)))
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        index_dir = os.path.join(tmp_dir, "index")
+
+        trained = runner.invoke(cli_app, ["train", "--vectorizer-type", "tfidf", "--train-file-path", documents_dir,
+                                          "--output-model-path", model_path])
+        indexed = runner.invoke(cli_app, ["index", "--documents-path", documents_dir, "--vectorizer-path",
+                                          model_path, "--index-dir", index_dir])
+        text_query = runner.invoke(cli_app, ["pick-best", "zapytanie słowo3", "--query-source", "text", "--index",
+                                             index_dir, "--vectorizer-path", model_path])
+        jsonl_queries = runner.invoke(cli_app, ["pick-best", queries_path, "--documents-path", documents_dir,
+                                                "--vectorizer-path", model_path])
+        streamed = runner.invoke(cli_app, ["pick-best", queries_path, "--index", index_dir, "--vectorizer-path",
+                                           model_path, "--chunk-size", "1", "--output-format", "jsonl"])
+        stdin_queries = runner.invoke(cli_app, ["pick-best", "-", "--index", index_dir, "--vectorizer-path",
+                                                model_path], input='{"id": "q", "text": "słowo4"}\n')
+        invalid = runner.invoke(cli_app, ["pick-best", "-", "--documents-path", "-", "--vectorizer-path",
+                                          model_path])
+
+        assert trained.exit_code == 0, trained.output
+        assert indexed.exit_code == 0, indexed.output
+        assert text_query.output.strip() == f"Best match for zapytanie słowo3 is: {documents_dir}{os.sep}doc3.txt"
+        assert jsonl_queries.output.splitlines() == [f"Best match for q2 is: {documents_dir}{os.sep}doc2.txt",
+                                                     f"Best match for q5 is: {documents_dir}{os.sep}doc5.txt"]
+        assert [json.loads(line)["query"] for line in streamed.output.splitlines()] == ["q2", "q5"]
+        assert stdin_queries.output.strip() == f"Best match for q is: {documents_dir}{os.sep}doc4.txt"
+        assert invalid.exit_code == 1
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.model_format import is_compact_model
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer, load_vectorizer, vectorizer_fingerprint
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+
+DOCUMENTS = [
+    "Kot siedzi na macie.",
+    "Psy są lojalnymi zwierzętami i szczekają.",
+    "Ptaki mogą latać wysoko na niebie, a jeż nie.",
+    "Ryby pływają w oceanie i jeziorach.",
+    "Słońce wschodzi na wschodzie każdego ranka.",
+]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("vectorizer_config", [
+    CountVectorizerConfig(),
+    CountVectorizerConfig(max_features=10, binary=True),
+    TfidfVectorizerConfig(ngram_range=(1, 2), sublinear_tf=True),
+    TfidfVectorizerConfig(use_idf=False, norm='l1'),
+    TfidfVectorizerConfig(analyzer='char', ngram_range=(2, 3)),
+    HashingVectorizerConfig(n_features=2 ** 10),
+])
+def test_compact_model_round_trip(vectorizer_config):
+    vectorizer = train_vectorizer(vectorizer_config, DOCUMENTS + ["wiersz\nz nową linią"])
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.npz")
+        save_vectorizer(vectorizer, model_path)
+        loaded = load_vectorizer(model_path)
+
+        assert is_compact_model(model_path)
+    assert type(loaded) is type(vectorizer)
+    assert loaded.fingerprint_ == vectorizer_fingerprint(vectorizer)
+    # the stored fingerprint matches the one recomputed from the loaded vocabulary
+    del loaded.fingerprint_
+    assert vectorizer_fingerprint(loaded) == vectorizer_fingerprint(vectorizer)
+    assert (loaded.transform(DOCUMENTS) != vectorizer.transform(DOCUMENTS)).nnz == 0
+
+
+class TestModelFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pickle_path = os.path.join(self.tmp_dir.name, "model.pkl")
+        self.vectorizer = train_vectorizer(TfidfVectorizerConfig(), DOCUMENTS)
+        with open(self.pickle_path, 'wb') as f:
+            pickle.dump(self.vectorizer, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @pytest.mark.unittest
+    def test_loads_legacy_pickled_models_only_when_allowed(self):
+        self.assertFalse(is_compact_model(self.pickle_path))
+        with self.assertRaisesRegex(ValueError, "convert-model"):
+            load_vectorizer(self.pickle_path)
+        self.assertEqual(vectorizer_fingerprint(load_vectorizer(self.pickle_path, allow_pickle=True)),
+                         vectorizer_fingerprint(self.vectorizer))
+
+    @pytest.mark.unittest
+    def test_refuses_parameters_outside_the_configs(self):
+        vectorizer = TfidfVectorizer(tokenizer=str.split, token_pattern=None).fit(DOCUMENTS)
+
+        with self.assertRaises(ValueError):
+            save_vectorizer(vectorizer, os.path.join(self.tmp_dir.name, "model.npz"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "model.npz")))
+
+    @pytest.mark.unittest
+    def test_converts_pickled_model(self):
+        runner = CliRunner()
+
+        result = runner.invoke(cli_app, ["convert-model", self.pickle_path])
+        missing = runner.invoke(cli_app, ["convert-model", os.path.join(self.tmp_dir.name, "missing.pkl")])
+
+        model_path = os.path.join(self.tmp_dir.name, "model.npz")
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue(is_compact_model(model_path))
+        self.assertEqual(vectorizer_fingerprint(load_vectorizer(model_path)), vectorizer_fingerprint(self.vectorizer))
+        self.assertEqual(missing.exit_code, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
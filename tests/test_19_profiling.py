@@ -0,0 +1,111 @@
+import json
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.core import load_vectorizer_and_pick_best_for_all
+from text_matcher.profiling import Profiler, profiling, profile_stage, profile_count
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+DOCUMENTS = {f"doc{i}": f"dokument numer {i} słowo{i} temat{i % 3}" for i in range(6)}
+
+
+def _article_response(*args, params=None, **kwargs):
+    title = params["titles"]
+    response = Mock()
+    response.status_code = 200
+    response.content = b"x" * 100
+    response.json.return_value = {"query": {"pages": {"1": {"extract": f"dokument {title}\n== Przypisy ==\nx"}}}}
+    return response
+
+
+class TestProfiler(unittest.TestCase):
+    @pytest.mark.unittest
+    def test_records_stages_only_while_active(self):
+        with profile_stage("ignored"):
+            profile_count("ignored", documents=1)
+        with profiling() as profiler:
+            for _ in range(2):
+                with profile_stage("transform"):
+                    profile_count("transform", documents=3, nnz=7)
+            with profile_stage("score"):
+                pass
+
+        trace = profiler.trace()
+        self.assertEqual(list(trace["stages"]), ["transform", "score"])
+        self.assertEqual(trace["stages"]["transform"]["calls"], 2)
+        self.assertEqual(trace["stages"]["transform"]["documents"], 6)
+        self.assertEqual(trace["stages"]["transform"]["nnz"], 14)
+        self.assertGreaterEqual(trace["wall_seconds"], trace["stages"]["transform"]["seconds"])
+        self.assertIn("documents=6 nnz=14", profiler.summary())
+
+    @pytest.mark.unittest
+    def test_dumps_outermost_stages_with_cprofile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with profiling(Profiler(tmp_dir)) as profiler:
+                with profile_stage("outer"):
+                    with profile_stage("inner"):
+                        sorted(range(1000))
+            profiler.dump_profiles()
+
+            self.assertEqual(os.listdir(tmp_dir), ["outer.prof"])
+            self.assertEqual(profiler.trace()["stages"]["inner"]["calls"], 1)
+            self.assertGreater(pstats.Stats(os.path.join(tmp_dir, "outer.prof")).total_calls, 0)
+
+    @pytest.mark.unittest
+    @patch('requests.get', side_effect=_article_response)
+    def test_profiles_matching_pipeline(self, mock_get):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = os.path.join(tmp_dir, "model.npz")
+            test_file = os.path.join(tmp_dir, "test.csv")
+            save_vectorizer(train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values())), model_path)
+            with open(test_file, 'w', encoding='utf-8') as f:
+                f.write("\n".join(f"https://pl.wikipedia.org/wiki/Doc{i}" for i in range(3)))
+
+            with profiling() as profiler:
+                load_vectorizer_and_pick_best_for_all("cosine", ["https://pl.wikipedia.org/wiki/Q"], test_file,
+                                                      model_path)
+
+        stages = profiler.trace()["stages"]
+        self.assertEqual(stages["fetch"]["requests"], 4)
+        self.assertEqual(stages["fetch"]["bytes"], 400)
+        self.assertEqual(stages["clean"]["documents"], 4)
+        self.assertEqual(stages["transform"]["documents"], 4)
+        self.assertGreater(stages["transform"]["nnz"], 0)
+        self.assertEqual(stages["score"], {**stages["score"], "queries": 1, "documents": 3})
+        self.assertEqual(stages["load_model"]["calls"], 1)
+
+
+@pytest.mark.unittest
+def test_cli_writes_profile_trace_and_dumps():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_path = os.path.join(tmp_dir, "documents.jsonl")
+        with open(documents_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps({"id": key, "text": text}) for key, text in DOCUMENTS.items()))
+        model_path = os.path.join(tmp_dir, "model.npz")
+        trace_path = os.path.join(tmp_dir, "trace.json")
+        profile_dir = os.path.join(tmp_dir, "profiles")
+        save_vectorizer(train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values())), model_path)
+
+        result = runner.invoke(cli_app, ["pick-best", "słowo2", "--query-source", "text", "--documents-path",
+                                         documents_path, "--vectorizer-path", model_path, "--profile-output",
+                                         trace_path, "--profile-dir", profile_dir])
+
+        assert result.exit_code == 0, result.output
+        with open(trace_path, encoding="utf-8") as f:
+            trace = json.load(f)
+        assert {"load_model", "transform", "score"} <= set(trace["stages"])
+        assert trace["stages"]["transform"]["documents"] == len(DOCUMENTS) + 1
+        assert {"load_model.prof", "transform.prof", "score.prof"} <= set(os.listdir(profile_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+import unittest
+
+import pytest
+
+HEAVY_MODULES = ("sklearn", "scipy", "numpy", "requests", "pydantic")
+# importing the CLI takes about 0.2 s, most of it in typer; loading sklearn and scipy alone used to add over a second
+MAX_IMPORT_SECONDS = 1.0
+
+
+def _import_times(module: str) -> dict:
+    """
+    Imports `module` in a fresh interpreter with `-X importtime`, returning the cumulative import time in seconds of
+    every module it loaded.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+                            text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    @pytest.mark.unittest
+    def test_cli_import_does_not_load_heavy_dependencies(self):
+        times = _import_times("text_matcher.cli")
+
+        loaded = sorted(name for name in times if name.split(".")[0] in HEAVY_MODULES)
+        self.assertEqual(loaded, [])
+        self.assertLess(times["text_matcher.cli"], MAX_IMPORT_SECONDS)
+
+    @pytest.mark.unittest
+    def test_module_entry_point_runs_cli(self):
+        result = subprocess.run([sys.executable, "-m", "text_matcher", "--help"], capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        for command in ("train", "pick-best", "index", "serve", "convert-model"):
+            self.assertIn(command, result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
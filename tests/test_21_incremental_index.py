@@ -0,0 +1,257 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.ann import RandomProjectionConfig
+from text_matcher.article_cache import ArticleCache
+from text_matcher.cli import cli_app
+from text_matcher.core import index_documents, update_index, pick_top_k_matches
+from text_matcher.document_index import build_document_index, save_document_index, load_document_index, \
+    diff_document_index, update_document_index, compact_document_index, METADATA_FILE_NAME
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+
+URL = "https://pl.wikipedia.org/wiki/"
+DOCUMENTS = {
+    URL + "Pies": "Pies bawi się na podwórku.",
+    URL + "Kot": "Koty uwielbiają gonić myszy.",
+    URL + "Ptak": "Ptaki budują gniazda na wysokich drzewach.",
+    URL + "Jeż": "Jeż jest małym ssakiem, który nocą tupta po ogrodzie.",
+}
+UPDATED_DOCUMENTS = {
+    URL + "Pies": DOCUMENTS[URL + "Pies"],
+    URL + "Kot": "Koty śpią na parapecie w słońcu.",
+    URL + "Jeż": DOCUMENTS[URL + "Jeż"],
+    URL + "Ryba": "Ryby pływają w jeziorach i oceanach.",
+}
+QUERIES = ["Kot śpi w słońcu", "Ryby w jeziorze", "Jeż tupta nocą", "Pies na podwórku"]
+
+
+class FakeWikipedia:
+    """
+    Answers `prop=info` and `prop=extracts` queries from a dict of articles and their revisions, recording the
+    titles whose extracts were requested.
+    """
+
+    def __init__(self, articles: dict, revisions: dict):
+        self.articles = articles
+        self.revisions = revisions
+        self.fetched = []
+
+    def get(self, url, params=None, **kwargs) -> Mock:
+        titles = params["titles"].split("|")
+        pages = {}
+        for i, title in enumerate(titles, start=1):
+            if URL + title not in self.articles:
+                pages[str(-i)] = {"title": title, "missing": ""}
+            elif params["prop"] == "info":
+                pages[str(i)] = {"title": title, "lastrevid": self.revisions[URL + title],
+                                 "touched": "2024-01-01T00:00:00Z"}
+            else:
+                self.fetched.append(title)
+                pages[str(i)] = {"title": title, "extract": self.articles[URL + title]}
+        response = Mock()
+        response.status_code = 200
+        response.json.return_value = {"query": {"pages": pages}}
+        return response
+
+
+class TestIncrementalIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        self.vectorizer = train_vectorizer(TfidfVectorizerConfig(),
+                                           list(DOCUMENTS.values()) + list(UPDATED_DOCUMENTS.values()))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _search_urls(self, index, exact=True):
+        idxs, _ = index.search(self.vectorizer.transform(QUERIES), "cosine", 1, exact=exact)
+        return [[index.urls[idx] for idx in row if idx >= 0] for row in idxs.tolist()]
+
+    def _build(self, documents, ann_config=None):
+        # the texts themselves serve as versions
+        return build_document_index(self.vectorizer, documents, ann_config, versions=dict(documents))
+
+    def _update(self, index, documents):
+        versions = dict(documents)
+        diff = diff_document_index(index, versions)
+        return diff, update_document_index(index, self.vectorizer,
+                                           {url: documents[url] for url in diff.added + diff.changed}, versions,
+                                           diff.removed)
+
+    @pytest.mark.unittest
+    def test_update_matches_rebuilt_index(self):
+        index = self._build(DOCUMENTS)
+
+        diff, updated = self._update(index, UPDATED_DOCUMENTS)
+
+        self.assertEqual(diff, ([URL + "Ryba"], [URL + "Kot"], [URL + "Ptak"]))
+        self.assertEqual(len(updated), 4)
+        self.assertEqual(updated.deleted.tolist(), [1, 2])
+        self.assertEqual(self._search_urls(updated),
+                         self._search_urls(build_document_index(self.vectorizer, UPDATED_DOCUMENTS)))
+        self.assertEqual(diff_document_index(updated, dict(UPDATED_DOCUMENTS)), ([], [], []))
+
+    @pytest.mark.unittest
+    def test_approximate_search_skips_tombstones(self):
+        index = self._build(DOCUMENTS, RandomProjectionConfig(n_tables=8, n_bits=2))
+
+        _, updated = self._update(index, UPDATED_DOCUMENTS)
+
+        self.assertEqual(updated.ann.config, index.ann.config)
+        for row in self._search_urls(updated, exact=False):
+            self.assertTrue(set(row) <= set(UPDATED_DOCUMENTS))
+
+    @pytest.mark.unittest
+    def test_approximate_search_falls_back_when_all_candidates_are_tombstones(self):
+        documents = {url: DOCUMENTS[url] for url in (URL + "Pies", URL + "Kot", URL + "Ptak")}
+        index = self._build(documents, RandomProjectionConfig())
+        updated = update_document_index(index, self.vectorizer, {}, removed=[URL + "Pies"])
+        query_vecs = self.vectorizer.transform([DOCUMENTS[URL + "Pies"]])
+
+        self.assertEqual(updated.ann.candidates(query_vecs)[0].tolist(), [0])
+        idxs, scores = updated.search(query_vecs, "cosine", 3)
+        self.assertEqual(sorted(idxs[0].tolist()), [1, 2])
+        self.assertFalse(np.isnan(scores).any())
+        self.assertEqual(len(pick_top_k_matches(self.vectorizer, updated, [DOCUMENTS[URL + "Pies"]], "cosine", 1)[0]),
+                         1)
+
+    @pytest.mark.unittest
+    def test_compaction_drops_tombstones(self):
+        _, updated = self._update(self._build(DOCUMENTS), UPDATED_DOCUMENTS)
+
+        compacted = compact_document_index(updated)
+
+        self.assertEqual(compacted.urls, [URL + "Pies", URL + "Jeż", URL + "Ryba", URL + "Kot"])
+        self.assertEqual(compacted.vectors.shape[0], 4)
+        self.assertEqual(len(compacted.deleted), 0)
+        self.assertEqual(self._search_urls(compacted), self._search_urls(updated))
+
+    @pytest.mark.unittest
+    def test_saves_generations_without_breaking_readers(self):
+        index = self._build(DOCUMENTS)
+        save_document_index(index, self.index_dir)
+        reader = load_document_index(self.index_dir, self.vectorizer)
+        expected = self._search_urls(reader)
+
+        _, updated = self._update(index, UPDATED_DOCUMENTS)
+        save_document_index(updated, self.index_dir)
+        save_document_index(updated, self.index_dir)
+
+        self.assertEqual(self._search_urls(reader), expected)
+        self.assertEqual(sorted(os.listdir(self.index_dir)),
+                         sorted([f"{name}.{generation}.npy" for name in
+                                 ("data", "indices", "indptr", "l2_norms", "l1_norms") for generation in (1, 2)]
+                                + [METADATA_FILE_NAME]))
+        loaded = load_document_index(self.index_dir, self.vectorizer)
+        self.assertEqual(loaded.deleted.tolist(), [1, 2])
+        self.assertEqual(self._search_urls(loaded), self._search_urls(updated))
+
+    @pytest.mark.unittest
+    def test_loads_indexes_without_versions(self):
+        save_document_index(build_document_index(self.vectorizer, DOCUMENTS), self.index_dir)
+        metadata_path = os.path.join(self.index_dir, METADATA_FILE_NAME)
+        with open(metadata_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump({key: metadata[key] for key in ("vectorizer_fingerprint", "shape", "urls")} | {"version": 2},
+                      f)
+
+        index = load_document_index(self.index_dir, self.vectorizer)
+
+        self.assertEqual(len(index), 4)
+        self.assertEqual(diff_document_index(index, dict.fromkeys(DOCUMENTS, "1")).changed, list(DOCUMENTS))
+
+    @pytest.mark.unittest
+    def test_update_index_fetches_only_new_and_changed_articles(self):
+        model_path = os.path.join(self.tmp_dir.name, "model.npz")
+        test_file = os.path.join(self.tmp_dir.name, "test.csv")
+        save_vectorizer(self.vectorizer, model_path)
+        cache = ArticleCache(os.path.join(self.tmp_dir.name, "cache"))
+        wikipedia = FakeWikipedia(DOCUMENTS, dict.fromkeys(DOCUMENTS, 1))
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(DOCUMENTS))
+
+        with patch('requests.get', side_effect=wikipedia.get):
+            built = update_index(model_path, test_file, self.index_dir, cache=cache, batch_size=50)
+            wikipedia.fetched.clear()
+            unchanged = update_index(model_path, test_file, self.index_dir, cache=cache, batch_size=50)
+
+            wikipedia.articles = UPDATED_DOCUMENTS
+            wikipedia.revisions = {**wikipedia.revisions, URL + "Kot": 2, URL + "Ryba": 1}
+            with open(test_file, 'w', encoding='utf-8') as f:
+                f.write("\n".join(UPDATED_DOCUMENTS))
+            updated = update_index(model_path, test_file, self.index_dir, cache=cache, batch_size=50,
+                                   compact_ratio=0.9)
+
+        self.assertEqual(built, (4, 0, 0, 0, 4, False))
+        self.assertEqual(unchanged, (0, 0, 0, 0, 4, False))
+        self.assertEqual(updated, (1, 1, 1, 0, 4, False))
+        self.assertEqual(sorted(wikipedia.fetched), ["Kot", "Ryba"])
+        index = load_document_index(self.index_dir, self.vectorizer)
+        self.assertEqual(index.versions[index.live_rows()[URL + "Kot"]], "2@2024-01-01T00:00:00Z")
+        self.assertEqual(self._search_urls(index),
+                         self._search_urls(build_document_index(self.vectorizer, UPDATED_DOCUMENTS)))
+
+    @pytest.mark.unittest
+    def test_built_index_records_revisions_for_updates(self):
+        model_path = os.path.join(self.tmp_dir.name, "model.npz")
+        test_file = os.path.join(self.tmp_dir.name, "test.csv")
+        save_vectorizer(self.vectorizer, model_path)
+        cache = ArticleCache(os.path.join(self.tmp_dir.name, "cache"))
+        wikipedia = FakeWikipedia(DOCUMENTS, dict.fromkeys(DOCUMENTS, 1))
+        with open(test_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(DOCUMENTS))
+
+        with patch('requests.get', side_effect=wikipedia.get):
+            indexed = index_documents(model_path, test_file, self.index_dir, cache=cache, batch_size=50)
+            wikipedia.fetched.clear()
+            unchanged = update_index(model_path, test_file, self.index_dir, cache=cache, batch_size=50)
+
+        self.assertEqual(indexed, 4)
+        self.assertEqual(unchanged, (0, 0, 0, 0, 4, False))
+        self.assertEqual(wikipedia.fetched, [])
+
+
+@pytest.mark.unittest
+def test_cli_updates_local_documents():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_path = os.path.join(tmp_dir, "documents.jsonl")
+        model_path = os.path.join(tmp_dir, "model.npz")
+        index_dir = os.path.join(tmp_dir, "index")
+        save_vectorizer(train_vectorizer(TfidfVectorizerConfig(),
+                                         list(DOCUMENTS.values()) + list(UPDATED_DOCUMENTS.values())), model_path)
+
+        def write_documents(documents: dict):
+            with open(documents_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(json.dumps({"id": key, "text": text}) for key, text in documents.items()))
+
+        def run_update(*options: str):
+            return runner.invoke(cli_app, ["index", "--documents-path", documents_path, "--vectorizer-path",
+                                           model_path, "--index-dir", index_dir, "--update", *options])
+
+        write_documents(DOCUMENTS)
+        built = run_update()
+        write_documents(UPDATED_DOCUMENTS)
+        updated = run_update("--compact-ratio", "0.1")
+
+        assert built.exit_code == 0, built.output
+        assert "4 added, 0 changed, 0 removed, 0 failed, 4 documents." in built.output
+        assert updated.exit_code == 0, updated.output
+        assert "1 added, 1 changed, 1 removed, 0 failed, 4 documents, compacted." in updated.output
+        index = load_document_index(index_dir)
+        assert sorted(index.urls) == sorted(UPDATED_DOCUMENTS)
+        assert np.all(index.l2_norms > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
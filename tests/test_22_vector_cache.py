@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.parallel import parallel_transform
+from text_matcher.sources import text_version
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+
+DOCUMENTS = [
+    "Kot siedzi na macie.",
+    "Psy są lojalnymi zwierzętami i szczekają.",
+    "Ptaki mogą latać wysoko na niebie, a jeż nie.",
+    "Ryby pływają w oceanie i jeziorach.",
+    "Słońce wschodzi na wschodzie każdego ranka.",
+]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("vectorizer_config", [
+    CountVectorizerConfig(),
+    TfidfVectorizerConfig(ngram_range=(1, 2)),
+    HashingVectorizerConfig(n_features=2 ** 10),
+])
+def test_cached_vectors_equal_transformed_ones(vectorizer_config):
+    vectorizer = train_vectorizer(vectorizer_config, DOCUMENTS)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = VectorCache(tmp_dir)
+        first = parallel_transform(vectorizer, DOCUMENTS, vector_cache=cache)
+        second = parallel_transform(vectorizer, DOCUMENTS + ["tekst spoza korpusu"], vector_cache=cache)
+        cache.close()
+
+    expected = vectorizer.transform(DOCUMENTS + ["tekst spoza korpusu"])
+    assert (first != expected[:len(DOCUMENTS)]).nnz == 0
+    assert (second != expected).nnz == 0
+    assert second.dtype == expected.dtype
+    assert (cache.hits, cache.misses) == (len(DOCUMENTS), len(DOCUMENTS) + 1)
+    assert cache.bytes_saved == sum(len(document.encode('utf-8')) for document in DOCUMENTS)
+
+
+class TestVectorCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.vectorizer = train_vectorizer(TfidfVectorizerConfig(), DOCUMENTS)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    @pytest.mark.unittest
+    def test_transforms_only_missing_distinct_texts(self):
+        cache = VectorCache(self.cache_dir.name)
+        transform = Mock(side_effect=self.vectorizer.transform)
+        cache.transform(self.vectorizer, DOCUMENTS[:2], transform)
+
+        cache.transform(self.vectorizer, [DOCUMENTS[0], DOCUMENTS[2], DOCUMENTS[2]], transform)
+
+        self.assertEqual(transform.call_args_list[1].args, ([DOCUMENTS[2]],))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(len(cache), 3)
+
+    @pytest.mark.unittest
+    def test_persists_and_separates_vectorizers(self):
+        cache = VectorCache(self.cache_dir.name)
+        parallel_transform(self.vectorizer, DOCUMENTS, vector_cache=cache)
+        cache.close()
+
+        reopened = VectorCache(self.cache_dir.name)
+        parallel_transform(self.vectorizer, DOCUMENTS, vector_cache=reopened)
+        parallel_transform(train_vectorizer(CountVectorizerConfig(), DOCUMENTS), DOCUMENTS, vector_cache=reopened)
+
+        self.assertEqual((reopened.hits, reopened.misses), (len(DOCUMENTS), len(DOCUMENTS)))
+        self.assertAlmostEqual(reopened.hit_rate, 0.5)
+
+    @pytest.mark.unittest
+    def test_evicts_least_recently_used_vectors(self):
+        cache = VectorCache(self.cache_dir.name)
+        parallel_transform(self.vectorizer, DOCUMENTS, vector_cache=cache)
+        size = cache.size()
+
+        limited = VectorCache(self.cache_dir.name, max_bytes=size)
+        parallel_transform(self.vectorizer, DOCUMENTS[1:], vector_cache=limited)
+        parallel_transform(self.vectorizer, ["Nowy dokument o kotach na macie."], vector_cache=limited)
+
+        self.assertLessEqual(limited.size(), size)
+        self.assertEqual(limited.get_many(cache.fingerprint(self.vectorizer), [text_version(DOCUMENTS[0])]), {})
+        parallel_transform(self.vectorizer, DOCUMENTS[1:], vector_cache=limited)
+        self.assertEqual(limited.misses, 1)
+
+
+@pytest.mark.unittest
+def test_cli_reports_vector_cache_hits():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_path = os.path.join(tmp_dir, "documents.jsonl")
+        with open(documents_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps({"id": str(i), "text": text}) for i, text in enumerate(DOCUMENTS)))
+        model_path = os.path.join(tmp_dir, "model.npz")
+        save_vectorizer(train_vectorizer(TfidfVectorizerConfig(), DOCUMENTS), model_path)
+        arguments = ["pick-best", "kot na macie", "--query-source", "text", "--documents-path", documents_path,
+                     "--vectorizer-path", model_path, "--vector-cache-dir", os.path.join(tmp_dir, "vectors")]
+
+        first = runner.invoke(cli_app, arguments)
+        second = runner.invoke(cli_app, arguments)
+
+        assert first.exit_code == 0, first.output
+        assert "Vector cache: 0 hits, 6 misses (0.0% hit rate)" in first.output
+        assert "Vector cache: 6 hits, 0 misses (100.0% hit rate)" in second.output
+        assert second.output.splitlines()[0] == first.output.splitlines()[0]
+
+
+if __name__ == '__main__':
+    unittest.main()
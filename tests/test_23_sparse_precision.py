@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from text_matcher.document_index import build_document_index, save_document_index, load_document_index
+from text_matcher.parallel import parallel_transform
+from text_matcher.similarity import prune_rows
+from text_matcher.streaming_training import train_vectorizer_streaming
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer, load_vectorizer, vectorizer_fingerprint, \
+    transform_and_pick_best_documents
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+
+DOCUMENTS = [
+    "Kot siedzi na macie i patrzy na ptaki za oknem.",
+    "Psy są lojalnymi zwierzętami i szczekają na listonosza.",
+    "Ptaki mogą latać wysoko na niebie, a jeż nie.",
+    "Ryby pływają w oceanie i jeziorach.",
+    "Słońce wschodzi na wschodzie każdego ranka.",
+]
+QUERIES = ["kot na macie", "ryby w jeziorach", "ptaki na niebie"]
+
+
+@pytest.mark.unittest
+def test_prune_rows_keeps_largest_weights():
+    vecs = csr_matrix(np.array([[0.1, -0.5, 0.3, 0.3, 0.0],
+                                [0.0, 0.2, 0.0, 0.0, 0.0],
+                                [0.0, 0.0, 0.0, 0.0, 0.0]]))
+
+    pruned = prune_rows(vecs, 2)
+
+    np.testing.assert_array_equal(pruned.toarray(), [[0.0, -0.5, 0.3, 0.0, 0.0],
+                                                     [0.0, 0.2, 0.0, 0.0, 0.0],
+                                                     [0.0, 0.0, 0.0, 0.0, 0.0]])
+    assert (prune_rows(vecs, None) != vecs).nnz == 0
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("vectorizer_config", [
+    CountVectorizerConfig(dtype='float32', max_terms_per_document=3),
+    TfidfVectorizerConfig(dtype='float32', max_terms_per_document=3),
+    HashingVectorizerConfig(dtype='float32', max_terms_per_document=3, n_features=2 ** 10),
+])
+def test_transform_respects_dtype_and_pruning(vectorizer_config):
+    vectorizer = train_vectorizer(vectorizer_config, DOCUMENTS)
+
+    vectors = parallel_transform(vectorizer, DOCUMENTS)
+
+    assert vectors.dtype == np.float32
+    assert vectors.indices.dtype == np.int32
+    assert np.diff(vectors.indptr).max() == 3
+    assert (vectors != prune_rows(vectorizer.transform(DOCUMENTS), 3)).nnz == 0
+
+
+class TestSparsePrecision(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @pytest.mark.unittest
+    def test_saved_model_keeps_dtype_and_pruning(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(dtype='float32', max_terms_per_document=4), DOCUMENTS)
+        model_path = os.path.join(self.tmp_dir.name, "model.npz")
+
+        save_vectorizer(vectorizer, model_path)
+        loaded = load_vectorizer(model_path)
+
+        self.assertEqual(loaded.dtype, np.float32)
+        self.assertEqual(loaded.max_terms_per_document, 4)
+        self.assertEqual(vectorizer_fingerprint(loaded), vectorizer_fingerprint(vectorizer))
+        self.assertEqual((parallel_transform(loaded, DOCUMENTS) != parallel_transform(vectorizer, DOCUMENTS)).nnz, 0)
+
+    @pytest.mark.unittest
+    def test_fingerprint_covers_new_settings_only_when_set(self):
+        default = train_vectorizer(TfidfVectorizerConfig(), DOCUMENTS)
+        pruned = train_vectorizer(TfidfVectorizerConfig(max_terms_per_document=4), DOCUMENTS)
+        single = train_vectorizer(TfidfVectorizerConfig(dtype='float32'), DOCUMENTS)
+
+        # indexes built before the settings existed stay valid for vectorizers that do not use them
+        legacy = TfidfVectorizer(**TfidfVectorizerConfig().model_dump(exclude={"dtype", "max_terms_per_document"}))
+        self.assertEqual(vectorizer_fingerprint(default), vectorizer_fingerprint(legacy.fit(DOCUMENTS)))
+        self.assertEqual(len({vectorizer_fingerprint(v) for v in (default, pruned, single)}), 3)
+
+    @pytest.mark.unittest
+    def test_index_and_scoring_keep_float32(self):
+        vectorizer = train_vectorizer(TfidfVectorizerConfig(dtype='float32'), DOCUMENTS)
+        reference = train_vectorizer(TfidfVectorizerConfig(), DOCUMENTS)
+        index_dir = os.path.join(self.tmp_dir.name, "index")
+
+        save_document_index(build_document_index(vectorizer, dict(enumerate(DOCUMENTS))), index_dir)
+        index = load_document_index(index_dir, vectorizer)
+        best, _ = index.search(parallel_transform(vectorizer, QUERIES), "cosine", 1)
+
+        self.assertEqual(index.vectors.dtype, np.float32)
+        self.assertEqual(best[:, 0].tolist(), [0, 3, 2])
+        for metric in ("cosine", "euclidean", "manhattan"):
+            self.assertEqual(transform_and_pick_best_documents(vectorizer, DOCUMENTS, QUERIES, metric),
+                             transform_and_pick_best_documents(reference, DOCUMENTS, QUERIES, metric))
+
+    @pytest.mark.unittest
+    def test_streaming_training_matches_float32_idf(self):
+        config = TfidfVectorizerConfig(dtype='float32')
+
+        streamed = train_vectorizer_streaming(config, iter(DOCUMENTS))
+
+        self.assertEqual(streamed.idf_.dtype, np.float32)
+        np.testing.assert_array_equal(streamed.idf_, train_vectorizer(config, DOCUMENTS).idf_)
+
+    @pytest.mark.unittest
+    def test_rejects_invalid_settings(self):
+        with self.assertRaises(ValidationError):
+            TfidfVectorizerConfig(dtype='int8')
+        with self.assertRaises(ValidationError):
+            CountVectorizerConfig(max_terms_per_document=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
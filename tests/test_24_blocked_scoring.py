@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from text_matcher.similarity import blocked_top_k, top_k, cosine_similarity, euclidean_distances, \
+    manhattan_distances, row_norms
+from text_matcher.vectorizer import pick_top_k_documents, pick_best_documents, pick_best_document
+
+
+def random_vectors(rows: int, seed: int) -> sp.csr_matrix:
+    return sp.random(rows, 300, density=0.05, format='csr', random_state=seed)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("distance_func, largest, ord", [
+    (cosine_similarity, True, 2),
+    (euclidean_distances, False, 2),
+    (manhattan_distances, False, 1),
+])
+@pytest.mark.parametrize("n_threads", [1, 3])
+def test_blocked_top_k_equals_full_matrix(distance_func, largest, ord, n_threads):
+    queries, documents = random_vectors(23, seed=1), random_vectors(101, seed=2)
+    norms = row_norms(documents, ord=ord)
+
+    indices, scores = blocked_top_k(distance_func, queries, documents, 5, largest, norms, n_threads=n_threads,
+                                    query_block_size=4, document_block_size=10)
+
+    expected_indices, expected_scores = top_k(distance_func(queries, documents), 5, largest)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(scores, expected_scores)
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("distance_func, largest", [(cosine_similarity, True), (euclidean_distances, False)])
+def test_blocked_top_k_skips_excluded_rows(distance_func, largest):
+    queries, documents = random_vectors(9, seed=5), random_vectors(60, seed=6)
+    exclude = np.zeros(60, dtype=bool)
+    exclude[::3] = True
+    live = np.flatnonzero(~exclude)
+
+    indices, scores = blocked_top_k(distance_func, queries, documents, 4, largest, query_block_size=4,
+                                    document_block_size=7, exclude=exclude)
+    capped, _ = blocked_top_k(distance_func, queries, documents, 100, largest, exclude=exclude)
+
+    expected_indices, expected_scores = top_k(distance_func(queries, documents[live]), 4, largest)
+    np.testing.assert_array_equal(indices, live[expected_indices])
+    np.testing.assert_allclose(scores, expected_scores)
+    assert capped.shape == (9, len(live)) and not exclude[capped].any()
+
+
+class TestBlockedScoring(unittest.TestCase):
+    def setUp(self):
+        self.queries = random_vectors(7, seed=3)
+        self.documents = random_vectors(40, seed=4)
+
+    @pytest.mark.unittest
+    def test_caps_k_at_documents_and_handles_empty_inputs(self):
+        indices, scores = blocked_top_k(cosine_similarity, self.queries, self.documents[:3], 10, True,
+                                        document_block_size=2)
+        self.assertEqual(indices.shape, (7, 3))
+        self.assertTrue(np.all(np.sort(indices, axis=1) == [0, 1, 2]))
+
+        indices, scores = blocked_top_k(cosine_similarity, self.queries[:0], self.documents, 3, True)
+        self.assertEqual((indices.shape, scores.shape), ((0, 3), (0, 3)))
+        indices, _ = blocked_top_k(cosine_similarity, self.queries, self.documents[:0], 3, True)
+        self.assertEqual(indices.shape, (7, 0))
+
+    @pytest.mark.unittest
+    def test_pick_functions_agree_across_thread_counts(self):
+        single = pick_top_k_documents(self.queries, self.documents, 'euclidean', 3)
+        threaded = pick_top_k_documents(self.queries, self.documents, 'euclidean', 3, n_jobs=-1)
+        best = pick_best_documents(self.queries, self.documents, 'cosine')
+
+        np.testing.assert_array_equal(single[0], threaded[0])
+        self.assertEqual(pick_best_documents(self.queries, self.documents, 'cosine', n_jobs=2), best)
+        self.assertEqual(pick_best_document(self.queries[2].toarray().ravel(), self.documents, 'cosine'), best[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.async_api import AsyncHttpClient, AsyncMatcher
+from text_matcher.document_index import build_document_index, save_document_index
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import TfidfVectorizerConfig
+from text_matcher.wikipedia_connector import ArticleNotFound
+
+URL = "https://pl.wikipedia.org/wiki/"
+DOCUMENTS = {
+    URL + "Pies": "Pies bawi się na podwórku.",
+    URL + "Kot": "Koty uwielbiają gonić myszy.",
+    URL + "Ryba": "Ryby pływają w jeziorach i oceanach.",
+}
+ARTICLES = {
+    "Szczeniak": "Szczeniak to młody pies, który bawi się na podwórku.",
+    "Mysz": "Myszy uciekają, gdy koty je gonią.",
+    "Jezioro": "W jeziorach pływają ryby.",
+}
+
+
+class StubWikipediaHandler(BaseHTTPRequestHandler):
+    """
+    Answers multi-title `prop=extracts` queries from `ARTICLES` after `server.delay` seconds, failing the first
+    requests listed in `server.failures` and recording the highest number of requests in flight at once.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        titles = parse_qs(urlparse(self.path).query)["titles"][0].split("|")
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            self.server.requested.extend(titles)
+            status = self.server.failures.pop(0) if self.server.failures else 200
+        time.sleep(self.server.delay)
+        pages = {}
+        for i, title in enumerate(titles, start=1):
+            if title in ARTICLES:
+                pages[str(i)] = {"title": title, "extract": ARTICLES[title]}
+            else:
+                pages[str(-i)] = {"title": title, "missing": ""}
+        body = json.dumps({"query": {"pages": pages}}).encode() if status == 200 else b""
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestAsyncApi(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWikipediaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.requested = []
+        self.server.failures = []
+        self.server.delay = 0.0
+        self.api_url = f"http://127.0.0.1:{self.server.server_address[1]}/w/api.php"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.vectorizer = train_vectorizer(TfidfVectorizerConfig(),
+                                           list(DOCUMENTS.values()) + list(ARTICLES.values()))
+        self.index = build_document_index(self.vectorizer, DOCUMENTS)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _matcher(self, **kwargs) -> AsyncMatcher:
+        return AsyncMatcher(self.vectorizer, self.index, api_url=self.api_url, **kwargs)
+
+    @pytest.mark.unittest
+    def test_concurrent_calls_within_concurrency_limit(self):
+        self.server.delay = 0.05
+
+        async def run():
+            async with self._matcher(client=AsyncHttpClient(concurrency=2), batch_size=1) as matcher:
+                return await asyncio.gather(matcher.pick_best(URL + "Szczeniak"),
+                                            matcher.pick_best_many([URL + "Mysz", URL + "Jezioro", URL + "Brak"]),
+                                            matcher.pick_best(URL + "Jezioro", "euclidean"))
+
+        single, many, euclidean = asyncio.run(run())
+
+        self.assertEqual(single, URL + "Pies")
+        self.assertEqual(many, {URL + "Mysz": URL + "Kot", URL + "Jezioro": URL + "Ryba"})
+        self.assertEqual(euclidean, URL + "Ryba")
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    @pytest.mark.unittest
+    def test_fetches_query_articles_concurrently_by_default(self):
+        self.server.delay = 0.1
+
+        async def run():
+            async with self._matcher() as matcher:
+                return await matcher.pick_best_many([URL + "Szczeniak", URL + "Mysz", URL + "Jezioro"])
+
+        self.assertEqual(len(asyncio.run(run())), 3)
+        self.assertEqual(sorted(self.server.requested), ["Jezioro", "Mysz", "Szczeniak"])
+        self.assertEqual(self.server.max_in_flight, 3)
+
+    @pytest.mark.unittest
+    def test_fetching_does_not_block_the_event_loop(self):
+        self.server.delay = 0.2
+        ticks = []
+
+        async def ticker(done: asyncio.Event):
+            while not done.is_set():
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            done = asyncio.Event()
+            async with self._matcher() as matcher:
+                ticking = asyncio.create_task(ticker(done))
+                best = await matcher.pick_best(URL + "Mysz")
+                done.set()
+                await ticking
+            return best
+
+        self.assertEqual(asyncio.run(run()), URL + "Kot")
+        self.assertGreater(len(ticks), 5)
+
+    @pytest.mark.unittest
+    def test_missing_query_article(self):
+        async def run():
+            async with self._matcher() as matcher:
+                self.assertEqual(await matcher.pick_best_many([URL + "Brak"]), {})
+                with self.assertRaises(ArticleNotFound):
+                    await matcher.pick_best(URL + "Brak")
+
+        asyncio.run(run())
+
+    @pytest.mark.unittest
+    def test_retries_failing_requests_and_serves_cached_articles(self):
+        self.server.failures = [503, 429]
+
+        async def run(cache: ArticleCache):
+            client = AsyncHttpClient(backoff_factor=0.001)
+            async with self._matcher(client=client, cache=cache) as matcher:
+                first = await matcher.pick_best(URL + "Mysz")
+                second = await matcher.pick_best(URL + "Mysz")
+            return first, second, client
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first, second, client = asyncio.run(run(ArticleCache(os.path.join(tmp_dir, "cache"))))
+
+        self.assertEqual((first, second), (URL + "Kot", URL + "Kot"))
+        self.assertEqual((client.requests, client.retries), (3, 2))
+        self.assertEqual(self.server.requested, ["Mysz"] * 3)
+
+    @pytest.mark.unittest
+    def test_loads_saved_model_and_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path, index_dir = os.path.join(tmp_dir, "model.npz"), os.path.join(tmp_dir, "index")
+            save_vectorizer(self.vectorizer, model_path)
+            save_document_index(self.index, index_dir)
+
+            async def run():
+                async with await AsyncMatcher.load(model_path, index_dir, api_url=self.api_url) as matcher:
+                    return await matcher.pick_best(URL + "Jezioro")
+
+            self.assertEqual(asyncio.run(run()), URL + "Ryba")
+
+
+if __name__ == '__main__':
+    unittest.main()
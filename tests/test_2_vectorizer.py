@@ -1,10 +1,11 @@
 import unittest
 
-from text_matcher.vectorizer import transform_and_pick_best_document, train_vectorizer
+from text_matcher.vectorizer import transform_and_pick_best_document, train_vectorizer, \
+    transform_and_pick_best_documents
 import pytest
 import numpy as np
 from scipy.sparse import csr_matrix
-from text_matcher.vectorizer import pick_best_document
+from text_matcher.vectorizer import pick_best_document, pick_best_documents, pick_top_k_documents
 from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig, \
     build_vectorizer_config
 
@@ -111,6 +112,47 @@ def test_pick_best_document(distance_metric, expected):
     assert best_idx == expected
 
 
+@pytest.mark.unittest
+@pytest.mark.parametrize("distance_metric", ['cosine', 'euclidean', 'manhattan'])
+@pytest.mark.parametrize("vectorizer_config", [CountVectorizerConfig(), TfidfVectorizerConfig(),
+                                               HashingVectorizerConfig(n_features=2 ** 10)])
+def test_batch_matching_matches_per_query_matching(distance_metric, vectorizer_config):
+    train_documents = [
+        "Kot siedzi na macie.",
+        "Psy są lojalnymi zwierzętami i szczekają.",
+        "Ptaki mogą latać wysoko na niebie, a jeż nie.",
+        "Ryby pływają w oceanie i jeziorach.",
+    ]
+    test_documents = [
+        "Pies bawi się na podwórku.",
+        "Koty uwielbiają gonić myszy.",
+        "Ptaki budują gniazda na wysokich drzewach.",
+        "Ryby żyją w jeziorach i w oceanie.",
+        "Jeż jest małym ssakiem.",
+    ]
+    query_texts = ["Dokąd nocą tupta jeż?", "Kot na macie", "Ryby w oceanie", "Ptaki latają wysoko na niebie"]
+    vectorizer = train_vectorizer(vectorizer_config, train_documents)
+
+    best_idxs = transform_and_pick_best_documents(vectorizer, test_documents, query_texts, distance_metric)
+
+    assert best_idxs == [transform_and_pick_best_document(vectorizer, test_documents, query_text, distance_metric)
+                         for query_text in query_texts]
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("distance_metric", ['cosine', 'euclidean', 'manhattan'])
+def test_pick_top_k_documents_starts_with_best_document(distance_metric):
+    query_vecs = csr_matrix(np.array([[1, 0, 1, 0], [0, 2, 0, 1]]))
+    test_vecs = csr_matrix(np.array([[1, 0, 1, 0], [0, 1, 0, 0], [1, 1, 1, 1], [0, 2, 0, 2]]))
+
+    best_idxs, scores = pick_top_k_documents(query_vecs, test_vecs, distance_metric, k=3)
+
+    assert best_idxs.shape == scores.shape == (2, 3)
+    assert best_idxs[:, 0].tolist() == pick_best_documents(query_vecs, test_vecs, distance_metric)
+    ordered = scores[:, ::-1] if distance_metric == 'cosine' else scores
+    assert np.all(np.diff(ordered, axis=1) >= 0)
+
+
 class TestVectorizerConfig(unittest.TestCase):
     @pytest.mark.unittest
     def test_build_count_vectorizer(self):
@@ -88,5 +88,92 @@ class TestWikipediaConnector(unittest.TestCase):
                 ["https://pl.wikipedia.org/wiki/Test1", "https://pl.wikipedia.org/wiki/Test2"], raise_on_error=True)
 
 
+def _query_response(query: dict, continuation: dict = None) -> Mock:
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {"query": query, **({"continue": continuation} if continuation else {})}
+    return response
+
+
+def _one_extract_per_response(url, params) -> Mock:
+    # like the live API for whole-article extracts: one extract per response, the next one behind `continue`
+    titles = params["titles"].split("|")
+    position = params.get("excontinue", 0)
+    pages = {str(i): {"title": title, **({"extract": f"Content {title}"} if i == position else {})}
+             for i, title in enumerate(titles)}
+    more = position + 1 < len(titles)
+    return _query_response({"pages": pages}, {"excontinue": position + 1, "continue": "||"} if more else None)
+
+
+class TestBatchedWikipediaConnector(unittest.TestCase):
+    @pytest.mark.unittest
+    @patch('requests.get', side_effect=_one_extract_per_response)
+    def test_batches_take_one_request_per_whole_article(self, mock_get):
+        urls = [f"https://pl.wikipedia.org/wiki/T{i}" for i in range(5)]
+
+        batched = get_wikipedia_core_texts_contents(urls, batch_size=5)
+        batched_requests = mock_get.call_count
+        separate = get_wikipedia_core_texts_contents(urls)
+
+        self.assertEqual(batched, separate)
+        self.assertEqual(batched[urls[3]], "Content T3")
+        self.assertEqual(batched_requests, 5)
+        self.assertEqual(mock_get.call_count - batched_requests, 5)
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_groups_titles_into_batches(self, mock_get):
+        mock_get.side_effect = lambda url, params: _query_response({"pages": {
+            str(i): {"title": title, "extract": f"Content {title}"}
+            for i, title in enumerate(params["titles"].split("|"), start=1)}})
+        urls = [f"https://pl.wikipedia.org/wiki/T{i}" for i in range(5)]
+
+        result = get_wikipedia_core_texts_contents(urls, batch_size=2)
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(mock_get.call_args_list[0].kwargs["params"]["titles"], "T0|T1")
+        self.assertEqual(list(result.keys()), urls)
+        self.assertEqual(result[urls[4]], "Content T4")
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_follows_continuation_and_maps_aliases(self, mock_get):
+        mock_get.side_effect = [
+            _query_response({
+                "normalized": [{"from": "Sztuczna_inteligencja", "to": "Sztuczna inteligencja"}],
+                "redirects": [{"from": "AI", "to": "Sztuczna inteligencja"}],
+                "pages": {"10": {"title": "Sztuczna inteligencja", "extract": "Content AI"},
+                          "20": {"title": "Kot"}}},
+                {"excontinue": 1, "continue": "||"}),
+            _query_response({"pages": {"10": {"title": "Sztuczna inteligencja"},
+                                       "20": {"title": "Kot", "extract": "Content Kot"}}}),
+        ]
+
+        result = get_wikipedia_core_texts_contents(["https://pl.wikipedia.org/wiki/Sztuczna_inteligencja",
+                                                    "https://pl.wikipedia.org/wiki/AI",
+                                                    "https://pl.wikipedia.org/wiki/Kot"], batch_size=50)
+
+        self.assertEqual(mock_get.call_args_list[1].kwargs["params"]["excontinue"], 1)
+        self.assertEqual(result, {
+            "https://pl.wikipedia.org/wiki/Sztuczna_inteligencja": "Content AI",
+            "https://pl.wikipedia.org/wiki/AI": "Content AI",
+            "https://pl.wikipedia.org/wiki/Kot": "Content Kot"
+        })
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_reports_missing_pages_per_title(self, mock_get):
+        mock_get.return_value = _query_response({"pages": {
+            "-1": {"title": "Brak", "missing": ""},
+            "1": {"title": "Kot", "extract": "Content Kot"}}})
+        urls = ["https://pl.wikipedia.org/wiki/Brak", "https://pl.wikipedia.org/wiki/Kot"]
+
+        result = get_wikipedia_core_texts_contents(urls, batch_size=50)
+
+        self.assertEqual(result, {"https://pl.wikipedia.org/wiki/Kot": "Content Kot"})
+        with self.assertRaises(ArticleNotFound):
+            get_wikipedia_core_texts_contents(urls, batch_size=50, raise_on_error=True)
+
+
 if __name__ == '__main__':
     unittest.main()
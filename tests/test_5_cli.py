@@ -13,7 +13,7 @@ def test_with_no_additional_params():
     assert result.exit_code == 0
 
     # cleanup
-    file_path = 'vectorizer_model.pkl'
+    file_path = 'vectorizer_model.npz'
     if os.path.exists(file_path):
         os.remove(file_path)
 
@@ -39,6 +39,6 @@ def test_many_query_documents_from_file():
     assert result.exit_code == 0
 
     # cleanup
-    file_path = 'vectorizer_model.pkl'
+    file_path = 'vectorizer_model.npz'
     if os.path.exists(file_path):
         os.remove(file_path)
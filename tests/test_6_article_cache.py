@@ -0,0 +1,158 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, Mock
+
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.cli import cli_app
+from text_matcher.wikipedia_connector import get_wikipedia_core_text_content, get_wikipedia_core_texts_contents, \
+    ArticleNotFound
+
+
+def _article_response(extract: str) -> Mock:
+    response = Mock()
+    response.status_code = 200
+    response.json.return_value = {"query": {"pages": {"1": {"extract": extract}}}}
+    return response
+
+
+def _articles_response(titles: list) -> Mock:
+    response = Mock()
+    response.status_code = 200
+    pages = {str(i): {"title": title, "extract": f"Artykuł o {title}"} for i, title in enumerate(titles, start=1)}
+    response.json.return_value = {"query": {"pages": pages}}
+    return response
+
+
+class TestArticleCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    @pytest.mark.unittest
+    def test_stores_and_returns_extracts(self):
+        cache = ArticleCache(self.cache_dir.name)
+
+        self.assertIsNone(cache.get("Test"))
+        cache.put("Test", "Test content")
+
+        self.assertEqual(cache.get("Test"), "Test content")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    @pytest.mark.unittest
+    def test_persists_between_instances(self):
+        ArticleCache(self.cache_dir.name).put("Test", "Test content")
+
+        self.assertEqual(ArticleCache(self.cache_dir.name).get("Test"), "Test content")
+
+    @pytest.mark.unittest
+    def test_expired_entries_are_missing_unless_offline(self):
+        ArticleCache(self.cache_dir.name).put("Test", "Test content")
+        time.sleep(0.01)
+
+        self.assertIsNone(ArticleCache(self.cache_dir.name, ttl=0.001).get("Test"))
+        self.assertEqual(ArticleCache(self.cache_dir.name, ttl=0.001, offline=True).get("Test"), "Test content")
+
+    @pytest.mark.unittest
+    def test_evicts_least_recently_used_above_size_cap(self):
+        cache = ArticleCache(self.cache_dir.name, max_bytes=10)
+        cache.put("A", "aaaa")
+        cache.put("B", "bbbb")
+        cache.get("A")
+        cache.put("C", "cccc")
+
+        self.assertEqual(cache.get("A"), "aaaa")
+        self.assertIsNone(cache.get("B"))
+        self.assertEqual(cache.get("C"), "cccc")
+        self.assertLessEqual(cache.size(), 10)
+
+    @pytest.mark.unittest
+    def test_bypass_skips_lookups(self):
+        ArticleCache(self.cache_dir.name).put("Test", "Test content")
+
+        cache = ArticleCache(self.cache_dir.name, bypass=True)
+
+        self.assertIsNone(cache.get("Test"))
+        self.assertEqual(cache.misses, 1)
+
+
+class TestCachedConnector(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_downloads_each_article_once(self, mock_get):
+        mock_get.return_value = _article_response("Test content")
+        cache = ArticleCache(self.cache_dir.name)
+
+        first = get_wikipedia_core_text_content("https://pl.wikipedia.org/wiki/Test", cache=cache)
+        second = get_wikipedia_core_text_content("https://pl.wikipedia.org/wiki/Test", cache=cache)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_offline_mode_never_downloads(self, mock_get):
+        cache = ArticleCache(self.cache_dir.name, offline=True)
+        cache.put("Test1", "Test content 1")
+
+        result = get_wikipedia_core_texts_contents(
+            ["https://pl.wikipedia.org/wiki/Test1", "https://pl.wikipedia.org/wiki/Test2"], cache=cache)
+
+        self.assertEqual(result, {"https://pl.wikipedia.org/wiki/Test1": "Test content 1"})
+        mock_get.assert_not_called()
+        with self.assertRaises(ArticleNotFound):
+            get_wikipedia_core_text_content("https://pl.wikipedia.org/wiki/Test2", cache=cache)
+
+    @pytest.mark.unittest
+    @patch('requests.get')
+    def test_bypass_refreshes_cached_articles(self, mock_get):
+        ArticleCache(self.cache_dir.name).put("Test", "Old content")
+        mock_get.return_value = _article_response("New content")
+
+        result = get_wikipedia_core_text_content("https://pl.wikipedia.org/wiki/Test",
+                                                 cache=ArticleCache(self.cache_dir.name, bypass=True))
+
+        self.assertEqual(result, "New content")
+        self.assertEqual(ArticleCache(self.cache_dir.name).get("Test"), "New content")
+
+
+@pytest.mark.unittest
+@patch('requests.Session.get')
+def test_cli_train_fills_cache_and_runs_offline(mock_get):
+    runner = CliRunner()
+    mock_get.side_effect = lambda url, params, timeout: _articles_response(params['titles'].split("|"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_file = os.path.join(tmp_dir, "train.csv")
+        with open(train_file, "w", encoding="utf-8") as f:
+            f.write("https://pl.wikipedia.org/wiki/Kot\nhttps://pl.wikipedia.org/wiki/Pies\n")
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        cache_dir = os.path.join(tmp_dir, "cache")
+
+        online = runner.invoke(cli_app, ["train", "--train-file-path", train_file, "--output-model-path", model_path,
+                                         "--cache-dir", cache_dir])
+        offline = runner.invoke(cli_app, ["train", "--train-file-path", train_file, "--output-model-path", model_path,
+                                          "--cache-dir", cache_dir, "--offline"])
+
+        assert online.exit_code == 0
+        assert "0 hits, 2 misses" in online.output
+        assert offline.exit_code == 0
+        assert "2 hits, 0 misses" in offline.output
+        # one request per article online, none offline
+        assert mock_get.call_count == 2
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from text_matcher.http_client import HttpClient
+from text_matcher.wikipedia_connector import get_wikipedia_core_texts_contents
+from text_matcher.wikipedia_scraper import scrape_wikipedia_core_texts_contents
+
+
+class StubWikipediaHandler(BaseHTTPRequestHandler):
+    """
+    Answers MediaWiki `query` requests with `Content of <title>`, failing the first requests for titles listed in
+    `server.failures` and serving plain HTML on any other path.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        self.server.clients.add(self.client_address)
+        time.sleep(self.server.delay)
+        if parsed.path == "/w/api.php":
+            title = parse_qs(parsed.query)["titles"][0]
+            with self.server.lock:
+                self.server.requested.append(title)
+                failures = self.server.failures.get(title, [])
+                status = failures.pop(0) if failures else 200
+            if status != 200:
+                self._send(status, b"", "text/plain")
+                return
+            body = json.dumps({"query": {"pages": {"1": {"extract": f"Content of {title}"}}}}).encode()
+            self._send(200, body, "application/json")
+        else:
+            body = f"<html><body><p>Page {parsed.path}</p></body></html>".encode()
+            self._send(200, body, "text/html")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWikipediaHandler)
+        self.server.lock = threading.Lock()
+        self.server.clients = set()
+        self.server.requested = []
+        self.server.failures = {}
+        self.server.delay = 0.0
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        patcher = patch('text_matcher.wikipedia_connector.API_URL', f"{self.base_url}/w/api.php")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _urls(self, count: int):
+        return [f"https://pl.wikipedia.org/wiki/Title{i}" for i in range(count)]
+
+    @pytest.mark.unittest
+    def test_preserves_input_order_with_concurrency(self):
+        self.server.delay = 0.02
+        urls = self._urls(20)
+        client = HttpClient(concurrency=8)
+
+        start = time.monotonic()
+        result = get_wikipedia_core_texts_contents(urls, client=client)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(list(result.keys()), urls)
+        self.assertEqual(result[urls[3]], "Content of Title3")
+        self.assertLess(elapsed, 20 * 0.02)
+
+    @pytest.mark.unittest
+    def test_reuses_pooled_connections(self):
+        client = HttpClient(concurrency=2)
+
+        get_wikipedia_core_texts_contents(self._urls(10), client=client)
+
+        self.assertLessEqual(len(self.server.clients), 2)
+        self.assertEqual(client.requests, 10)
+
+    @pytest.mark.unittest
+    def test_retries_rate_limited_and_failing_requests(self):
+        self.server.failures = {"Title0": [429, 503], "Title1": [500, 500, 500, 500]}
+        client = HttpClient(concurrency=2, backoff_factor=0.001)
+
+        result = get_wikipedia_core_texts_contents(self._urls(2), client=client)
+
+        self.assertEqual(result, {"https://pl.wikipedia.org/wiki/Title0": "Content of Title0"})
+        self.assertEqual(self.server.requested.count("Title0"), 3)
+        self.assertEqual(self.server.requested.count("Title1"), 4)
+        self.assertEqual(client.retries, 5)
+
+    @pytest.mark.unittest
+    def test_rate_limits_requests_per_host(self):
+        client = HttpClient(concurrency=4, requests_per_second=50)
+
+        start = time.monotonic()
+        get_wikipedia_core_texts_contents(self._urls(6), client=client)
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, 5 / 50)
+
+    @pytest.mark.unittest
+    def test_scrapes_pages_concurrently_in_order(self):
+        urls = [f"{self.base_url}/wiki/Page{i}" for i in range(5)]
+
+        result = scrape_wikipedia_core_texts_contents(urls, client=HttpClient(concurrency=3))
+
+        self.assertEqual(list(result.keys()), urls)
+        self.assertEqual(result[urls[2]], "Page /wiki/Page2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from scipy.sparse import random as sparse_random, csr_matrix
+from sklearn.metrics import pairwise
+
+from text_matcher.similarity import cosine_similarity, euclidean_distances, manhattan_distances, row_norms, top_k
+
+
+def _random_vectors(rows: int, seed: int) -> csr_matrix:
+    vecs = sparse_random(rows, 300, density=0.05, format='csr', random_state=seed)
+    vecs.data -= 0.5
+    return vecs
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize(
+    "kernel, reference",
+    [
+        (cosine_similarity, pairwise.cosine_similarity),
+        (euclidean_distances, pairwise.euclidean_distances),
+        (manhattan_distances, pairwise.manhattan_distances),
+    ]
+)
+def test_sparse_kernels_match_sklearn(kernel, reference):
+    queries = _random_vectors(7, seed=1)
+    documents = _random_vectors(40, seed=2)
+    documents[5] = 0
+    documents.eliminate_zeros()
+
+    result = kernel(queries, documents)
+
+    assert result.shape == (7, 40)
+    np.testing.assert_allclose(result, reference(queries.toarray(), documents.toarray()), atol=1e-10)
+
+
+@pytest.mark.unittest
+def test_kernels_accept_precomputed_norms():
+    queries = _random_vectors(3, seed=3)
+    documents = _random_vectors(10, seed=4)
+
+    np.testing.assert_allclose(cosine_similarity(queries, documents, y_norms=row_norms(documents)),
+                               cosine_similarity(queries, documents))
+    np.testing.assert_allclose(manhattan_distances(queries, documents, y_norms=row_norms(documents, ord=1)),
+                               manhattan_distances(queries, documents))
+
+
+@pytest.mark.unittest
+def test_row_norms_of_empty_rows_are_zero():
+    vecs = csr_matrix(np.array([[0, 0, 0], [3, 0, -4], [0, 0, 0]]))
+
+    np.testing.assert_array_equal(row_norms(vecs), [0, 5, 0])
+    np.testing.assert_array_equal(row_norms(vecs, ord=1), [0, 7, 0])
+
+
+@pytest.mark.unittest
+@pytest.mark.parametrize("largest", [True, False])
+def test_top_k_matches_full_sort(largest):
+    scores = np.random.default_rng(5).random((6, 50))
+
+    indices, selected = top_k(scores, 4, largest=largest)
+
+    expected = np.argsort(-scores if largest else scores, axis=1, kind='stable')[:, :4]
+    np.testing.assert_array_equal(indices, expected)
+    np.testing.assert_array_equal(selected, np.take_along_axis(scores, expected, axis=1))
+
+
+@pytest.mark.unittest
+def test_top_k_caps_k_and_breaks_ties_by_index():
+    scores = np.array([[0.5, 0.9, 0.5]])
+
+    indices, selected = top_k(scores, 10, largest=True)
+
+    np.testing.assert_array_equal(indices, [[1, 0, 2]])
+    np.testing.assert_array_equal(selected, [[0.9, 0.5, 0.5]])
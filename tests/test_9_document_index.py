@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from text_matcher.cli import cli_app
+from text_matcher.document_index import build_document_index, save_document_index, load_document_index, \
+    IndexMismatch
+from text_matcher.vectorizer import train_vectorizer, pick_best_documents, transform_and_pick_best_documents, \
+    save_vectorizer
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig
+
+DOCUMENTS = {
+    "https://pl.wikipedia.org/wiki/Pies": "Pies bawi się na podwórku.",
+    "https://pl.wikipedia.org/wiki/Kot": "Koty uwielbiają gonić myszy.",
+    "https://pl.wikipedia.org/wiki/Ptak": "Ptaki budują gniazda na wysokich drzewach.",
+    "https://pl.wikipedia.org/wiki/Jeż": "Jeż jest małym ssakiem, który nocą tupta po ogrodzie.",
+}
+
+
+def _articles_response(titles: list) -> Mock:
+    response = Mock()
+    response.status_code = 200
+    # answers revision queries as well, so the same pages serve `prop=info` and `prop=extracts`
+    pages = {str(i): {"title": title, "extract": DOCUMENTS[f"https://pl.wikipedia.org/wiki/{title}"],
+                      "lastrevid": 1, "touched": "2024-01-01T00:00:00Z"}
+             for i, title in enumerate(titles, start=1)}
+    response.json.return_value = {"query": {"pages": pages}}
+    return response
+
+
+class TestDocumentIndex(unittest.TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.TemporaryDirectory()
+        self.vectorizer = train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values()))
+
+    def tearDown(self):
+        self.index_dir.cleanup()
+
+    @pytest.mark.unittest
+    def test_round_trips_vectors_norms_and_urls(self):
+        index = build_document_index(self.vectorizer, DOCUMENTS)
+
+        save_document_index(index, self.index_dir.name)
+        loaded = load_document_index(self.index_dir.name, self.vectorizer)
+
+        self.assertEqual(loaded.urls, list(DOCUMENTS.keys()))
+        self.assertEqual((loaded.vectors != index.vectors).nnz, 0)
+        np.testing.assert_array_equal(loaded.l2_norms, index.l2_norms)
+        np.testing.assert_array_equal(loaded.l1_norms, index.l1_norms)
+
+    @pytest.mark.unittest
+    def test_memory_maps_arrays_read_only(self):
+        save_document_index(build_document_index(self.vectorizer, DOCUMENTS), self.index_dir.name)
+
+        index = load_document_index(self.index_dir.name)
+
+        for array in [index.vectors.data, index.vectors.indices, index.vectors.indptr, index.l2_norms]:
+            self.assertFalse(array.flags.writeable)
+            self.assertFalse(array.flags.owndata)
+        self.assertIsInstance(index.l1_norms, np.memmap)
+
+    @pytest.mark.unittest
+    def test_refuses_index_of_another_vectorizer(self):
+        save_document_index(build_document_index(self.vectorizer, DOCUMENTS), self.index_dir.name)
+        other_vectorizer = train_vectorizer(CountVectorizerConfig(), list(DOCUMENTS.values()))
+
+        with self.assertRaises(IndexMismatch):
+            load_document_index(self.index_dir.name, other_vectorizer)
+
+    @pytest.mark.unittest
+    def test_matches_like_freshly_vectorized_documents(self):
+        save_document_index(build_document_index(self.vectorizer, DOCUMENTS), self.index_dir.name)
+        index = load_document_index(self.index_dir.name, self.vectorizer)
+        queries = ["Dokąd nocą tupta jeż?", "Kot goni myszy", "Gniazda ptaków"]
+
+        for metric in ['cosine', 'euclidean', 'manhattan']:
+            self.assertEqual(
+                pick_best_documents(self.vectorizer.transform(queries), index.vectors, metric, index.norms(metric)),
+                transform_and_pick_best_documents(self.vectorizer, list(DOCUMENTS.values()), queries, metric))
+
+
+@pytest.mark.unittest
+@patch('requests.Session.get')
+def test_cli_pick_best_uses_index_without_fetching_documents(mock_get):
+    runner = CliRunner()
+    mock_get.side_effect = lambda url, params, timeout: _articles_response(params['titles'].split("|"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        documents_file = os.path.join(tmp_dir, "documents.csv")
+        with open(documents_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(DOCUMENTS.keys()))
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        index_dir = os.path.join(tmp_dir, "index")
+
+        runner.invoke(cli_app, ["train", "--train-file-path", documents_file, "--output-model-path", model_path])
+        indexed = runner.invoke(cli_app, ["index", "--documents-path", documents_file, "--vectorizer-path",
+                                          model_path, "--index-dir", index_dir])
+        mock_get.reset_mock()
+        result = runner.invoke(cli_app, ["pick-best", "https://pl.wikipedia.org/wiki/Jeż", "--documents-path",
+                                         "missing.csv", "--vectorizer-path", model_path, "--index", index_dir])
+
+        assert indexed.exit_code == 0
+        assert "Indexed 4 documents" in indexed.output
+        assert result.exit_code == 0
+        assert "Best match: https://pl.wikipedia.org/wiki/Jeż" in result.output
+        assert mock_get.call_count == 1
+
+
+@pytest.mark.unittest
+def test_cli_pick_best_outputs_top_k_as_json_and_csv():
+    runner = CliRunner()
+    vectorizer = train_vectorizer(TfidfVectorizerConfig(), list(DOCUMENTS.values()))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        index_dir = os.path.join(tmp_dir, "index")
+        save_vectorizer(vectorizer, model_path)
+        save_document_index(build_document_index(vectorizer, DOCUMENTS), index_dir)
+        query_url = "https://pl.wikipedia.org/wiki/Kot"
+
+        with patch('text_matcher.core.get_wikipedia_core_text_content', return_value=DOCUMENTS[query_url]):
+            as_json = runner.invoke(cli_app, ["pick-best", query_url, "--vectorizer-path", model_path, "--index",
+                                              index_dir, "--top-k", "2", "--output-format", "json"])
+            as_csv = runner.invoke(cli_app, ["pick-best", query_url, "--vectorizer-path", model_path, "--index",
+                                             index_dir, "--top-k", "2", "--output-format", "csv"])
+
+        matches = json.loads(as_json.output)[query_url]
+        assert [match["url"] for match in matches][0] == query_url
+        assert len(matches) == 2
+        assert matches[0]["score"] == pytest.approx(1.0)
+        rows = as_csv.output.strip().splitlines()
+        assert rows[0] == "query,rank,url,score"
+        assert rows[1].startswith(f"{query_url},1,{query_url},")
+        assert len(rows) == 3
+
+
+if __name__ == '__main__':
+    unittest.main()
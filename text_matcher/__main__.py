@@ -0,0 +1,4 @@
+from text_matcher.cli import cli_app
+
+if __name__ == "__main__":
+    cli_app(prog_name="python -m text_matcher")
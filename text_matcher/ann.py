@@ -0,0 +1,255 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+from scipy.sparse import csr_matrix
+
+from text_matcher.parallel import resolve_n_jobs
+from text_matcher.similarity import as_csr, top_k, blocked_top_k
+from text_matcher.vectorizer import get_distance_function
+
+ANN_METADATA_FILE_NAME = "ann.json"
+SORTED_KEYS_FILE_NAME = "sorted_keys.npy"
+ORDER_FILE_NAME = "order.npy"
+SIGNATURE_BLOCK_ROWS = 1024
+QUERY_BLOCK_ROWS = 32
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+class AnnConfig(BaseModel):
+    seed: int = Field(0, description="Seed of the random hash functions.")
+
+    class Config:
+        extra = 'forbid'
+
+
+class RandomProjectionConfig(AnnConfig):
+    n_tables: int = Field(16, ge=1, description="Number of hash tables; more tables raise recall.")
+    n_bits: int = Field(12, ge=1, le=64,
+                        description="Signed random projections per table; more bits make buckets smaller and search faster.")
+    probe_radius: int = Field(1, ge=0, le=1,
+                              description="Also probe buckets whose key differs in this many bits (0 or 1).")
+
+
+class MinHashConfig(AnnConfig):
+    n_bands: int = Field(16, ge=1, description="Number of bands (hash tables); more bands raise recall.")
+    band_size: int = Field(4, ge=1,
+                           description="MinHash values per band; larger bands make buckets smaller and search faster.")
+
+
+def build_ann_config(ann_type: str, config: str) -> AnnConfig:
+    try:
+        config = json.loads(config)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON format.")
+
+    match ann_type:
+        case 'random-projection':
+            return RandomProjectionConfig(**config)
+        case 'minhash':
+            return MinHashConfig(**config)
+        case _:
+            raise ValueError("Unsupported ANN type. Choose from 'random-projection', 'minhash'.")
+
+
+class AnnIndex(ABC):
+    """
+    Approximate nearest-neighbour index: every document is hashed into one bucket per table, and only documents
+    sharing a bucket with the query are scored exactly. Subclasses define the hash keys.
+    """
+    ann_type = None
+
+    def __init__(self, config: AnnConfig, sorted_keys: Optional[np.ndarray] = None,
+                 order: Optional[np.ndarray] = None):
+        self.config = config
+        self.sorted_keys = sorted_keys
+        self.order = order
+
+    def fit(self, vectors: csr_matrix) -> "AnnIndex":
+        keys = self.hash_keys(as_csr(vectors))
+        self.order = np.argsort(keys, axis=0, kind='stable').T.copy()
+        self.sorted_keys = np.take_along_axis(keys.T, self.order, axis=1)
+        return self
+
+    @abstractmethod
+    def hash_keys(self, vecs: csr_matrix) -> np.ndarray:
+        """
+        Returns the bucket key of every row in every table, as an array of shape (rows, tables).
+        """
+
+    def probe_keys(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Returns the keys to look up for a query with the given key in one table.
+        """
+        return keys[np.newaxis]
+
+    def candidates(self, query_vecs: csr_matrix) -> List[np.ndarray]:
+        """
+        Returns the indices of the documents sharing at least one probed bucket with every query.
+        """
+        query_keys = self.hash_keys(as_csr(query_vecs))
+        n_documents = self.order.shape[1]
+        pairs = []
+        for table in range(query_keys.shape[1]):
+            probes = np.stack([self.probe_keys(key) for key in query_keys[:, table]])
+            starts = np.searchsorted(self.sorted_keys[table], probes, side='left').ravel()
+            ends = np.searchsorted(self.sorted_keys[table], probes, side='right').ravel()
+            queries = np.repeat(np.arange(query_keys.shape[0]), probes.shape[1])
+            lengths = ends - starts
+            # one (query, document) pair key per document in every matched bucket
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            pairs.append(np.repeat(queries, lengths) * n_documents + self.order[table, positions])
+        pairs = np.unique(np.concatenate(pairs))
+        bounds = np.searchsorted(pairs, np.arange(query_keys.shape[0] + 1) * n_documents)
+        return [pairs[start:end] % n_documents for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def search(self, query_vecs: csr_matrix, test_vecs: csr_matrix, distance_metric: str, k: int,
+               test_norms: Optional[np.ndarray] = None, n_jobs: Optional[int] = None,
+               exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the `k` closest documents for every query among its candidates, scored exactly with
+        `distance_metric`. Rows of `test_vecs` in the boolean mask `exclude` are dropped from the candidates first,
+        and queries left without any candidate are scored against all other documents, in blocks and in `n_jobs`
+        threads if given (see `blocked_top_k`).
+
+        Queries are scored in blocks against the union of their candidates, so small candidate sets cost a single
+        small kernel call per block instead of one per query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices in `test_vecs` and their similarities (cosine) or distances,
+            closest first, both of shape (queries, k), with `k` capped at the number of rows not excluded. Queries
+            with fewer than `k` candidates are padded with index -1 and score NaN.
+        """
+        query_vecs, test_vecs = as_csr(query_vecs), as_csr(test_vecs)
+        distance_func = get_distance_function(distance_metric)
+        largest = distance_metric.lower() == 'cosine'
+        k = min(k, test_vecs.shape[0] - (int(np.count_nonzero(exclude)) if exclude is not None else 0))
+        indices = np.full((query_vecs.shape[0], k), -1, dtype=np.int64)
+        scores = np.full((query_vecs.shape[0], k), np.nan, dtype=np.float64)
+        candidates = self.candidates(query_vecs)
+        if exclude is not None:
+            candidates = [found[~exclude[found]] for found in candidates]
+        unmatched = np.array([row for row, found in enumerate(candidates) if not len(found)], dtype=np.int64)
+        if len(unmatched) and k:
+            indices[unmatched], scores[unmatched] = blocked_top_k(distance_func, query_vecs[unmatched], test_vecs, k,
+                                                                  largest, test_norms, resolve_n_jobs(n_jobs),
+                                                                  exclude=exclude)
+        matched = np.array([row for row, found in enumerate(candidates) if len(found)], dtype=np.int64)
+        for start in range(0, len(matched), QUERY_BLOCK_ROWS):
+            rows = matched[start:start + QUERY_BLOCK_ROWS]
+            block = [candidates[row] for row in rows]
+            union = np.unique(np.concatenate(block))
+            is_candidate = np.zeros((len(block), len(union)), dtype=bool)
+            is_candidate[np.repeat(np.arange(len(block)), [len(found) for found in block]),
+                         np.searchsorted(union, np.concatenate(block))] = True
+            norms = test_norms[union] if test_norms is not None else None
+            distances = distance_func(query_vecs[rows], test_vecs[union], y_norms=norms)
+            distances[~is_candidate] = -np.inf if largest else np.inf
+            best, best_scores = top_k(distances, k, largest)
+            found = np.take_along_axis(is_candidate, best, axis=1)
+            indices[rows, :best.shape[1]] = np.where(found, union[best], -1)
+            scores[rows, :best.shape[1]] = np.where(found, best_scores, np.nan)
+        return indices, scores
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, SORTED_KEYS_FILE_NAME), self.sorted_keys)
+        np.save(os.path.join(directory, ORDER_FILE_NAME), self.order)
+        with open(os.path.join(directory, ANN_METADATA_FILE_NAME), 'w', encoding='utf-8') as f:
+            json.dump({"ann_type": self.ann_type, "config": self.config.model_dump()}, f)
+
+
+class RandomProjectionIndex(AnnIndex):
+    """
+    Signed random projections for cosine similarity: every table key holds the signs of `n_bits` projections on
+    random +1/-1 hyperplanes, so documents at a small angle from the query share its bucket with high probability.
+    The hyperplanes are derived from a hash of the feature index, so nothing proportional to `n_features` is stored.
+    """
+    ann_type = 'random-projection'
+
+    def hash_keys(self, vecs: csr_matrix) -> np.ndarray:
+        n_planes = self.config.n_tables * self.config.n_bits
+        bit_values = np.uint64(1) << np.arange(self.config.n_bits, dtype=np.uint64)
+        keys = np.empty((vecs.shape[0], self.config.n_tables), dtype=np.uint64)
+        for start in range(0, vecs.shape[0], SIGNATURE_BLOCK_ROWS):
+            block = vecs[start:start + SIGNATURE_BLOCK_ROWS]
+            columns, compact_indices = np.unique(block.indices, return_inverse=True)
+            compact = csr_matrix((block.data, compact_indices.ravel(), block.indptr),
+                                 shape=(block.shape[0], len(columns)))
+            plane_ids = columns.astype(np.uint64)[:, np.newaxis] * np.uint64(n_planes) + \
+                np.arange(n_planes, dtype=np.uint64)
+            signs = np.where(_mix64(plane_ids, self.config.seed) >> np.uint64(63), 1.0, -1.0)
+            bits = np.asarray(compact @ signs) > 0
+            bits = bits.reshape(block.shape[0], self.config.n_tables, self.config.n_bits)
+            keys[start:start + block.shape[0]] = (bits * bit_values).sum(axis=2, dtype=np.uint64)
+        return keys
+
+    def probe_keys(self, keys: np.ndarray) -> np.ndarray:
+        if self.config.probe_radius == 0:
+            return keys[np.newaxis]
+        flips = np.uint64(1) << np.arange(self.config.n_bits, dtype=np.uint64)
+        return np.concatenate([[keys], keys ^ flips])
+
+
+class MinHashIndex(AnnIndex):
+    """
+    MinHash with banding for Jaccard similarity of the sets of terms, suited to `binary=True` vectorizers: every
+    band key combines `band_size` minimum hash values of the document's terms.
+    """
+    ann_type = 'minhash'
+
+    def hash_keys(self, vecs: csr_matrix) -> np.ndarray:
+        n_hashes = self.config.n_bands * self.config.band_size
+        hash_ids = np.arange(n_hashes, dtype=np.uint64)
+        minimums = np.full((vecs.shape[0], n_hashes), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, vecs.shape[0], SIGNATURE_BLOCK_ROWS):
+            block = vecs[start:start + SIGNATURE_BLOCK_ROWS]
+            non_empty = np.flatnonzero(np.diff(block.indptr))
+            if not len(non_empty):
+                continue
+            hashes = _mix64(block.indices.astype(np.uint64)[:, np.newaxis] * np.uint64(n_hashes) + hash_ids,
+                            self.config.seed)
+            minimums[start + non_empty] = np.minimum.reduceat(hashes, block.indptr[non_empty], axis=0)
+        bands = minimums.reshape(vecs.shape[0], self.config.n_bands, self.config.band_size)
+        keys = np.zeros((vecs.shape[0], self.config.n_bands), dtype=np.uint64)
+        for position in range(self.config.band_size):
+            keys = _mix64(keys ^ bands[:, :, position], self.config.seed)
+        return keys
+
+
+ANN_INDEX_TYPES = {index_type.ann_type: index_type for index_type in (RandomProjectionIndex, MinHashIndex)}
+ANN_CONFIG_TYPES = {'random-projection': RandomProjectionConfig, 'minhash': MinHashConfig}
+
+
+def build_ann_index(config: AnnConfig, vectors: csr_matrix) -> AnnIndex:
+    match config:
+        case RandomProjectionConfig():
+            index = RandomProjectionIndex(config)
+        case MinHashConfig():
+            index = MinHashIndex(config)
+        case _:
+            raise ValueError("Unsupported ANN config.")
+    return index.fit(vectors)
+
+
+def load_ann_index(directory: str, mmap: bool = True) -> Union[RandomProjectionIndex, MinHashIndex]:
+    with open(os.path.join(directory, ANN_METADATA_FILE_NAME), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    ann_type = metadata["ann_type"]
+    mmap_mode = 'r' if mmap else None
+    return ANN_INDEX_TYPES[ann_type](ANN_CONFIG_TYPES[ann_type](**metadata["config"]),
+                                     np.load(os.path.join(directory, SORTED_KEYS_FILE_NAME), mmap_mode=mmap_mode),
+                                     np.load(os.path.join(directory, ORDER_FILE_NAME), mmap_mode=mmap_mode))
+
+
+def _mix64(values: np.ndarray, seed: int) -> np.ndarray:
+    """
+    SplitMix64 finalizer: a fast, well-distributed hash of unsigned 64-bit integers, vectorized over `values`.
+    """
+    values = values.astype(np.uint64) + np.uint64((seed + 1) * GOLDEN_GAMMA % 2 ** 64)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+CACHE_FILE_NAME = "articles.sqlite3"
+
+
+class ArticleCache:
+    """
+    Persistent on-disk cache of raw Wikipedia extracts keyed by article title.
+
+    Entries older than `ttl` seconds are treated as missing, and once the stored extracts exceed `max_bytes`
+    the least recently used ones are evicted. In `offline` mode the cache is the only source of articles
+    (expired entries are still served), while `bypass` skips lookups but keeps storing fresh downloads.
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 offline: bool = False, bypass: bool = False):
+        if offline and bypass:
+            raise ValueError("Article cache cannot be both offline and bypassed.")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE_NAME), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "title TEXT PRIMARY KEY, extract TEXT NOT NULL, size INTEGER NOT NULL, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self._connection.commit()
+
+    def get(self, title: str) -> Optional[str]:
+        """
+        Returns the cached extract for `title`, or None when it is missing, expired or the cache is bypassed.
+        """
+        with self._lock:
+            if self.bypass:
+                self.misses += 1
+                return None
+            row = self._connection.execute("SELECT extract, fetched_at FROM articles WHERE title = ?",
+                                           (title,)).fetchone()
+            now = time.time()
+            if row is None or (self._is_expired(row[1], now) and not self.offline):
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE articles SET accessed_at = ? WHERE title = ?", (now, title))
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, title: str, extract: str):
+        with self._lock:
+            now = time.time()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO articles (title, extract, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (title, extract, len(extract.encode('utf-8')), now, now))
+            self._evict()
+            self._connection.commit()
+
+    def invalidate(self, titles: Iterable[str]):
+        """
+        Drops the cached extracts of `titles`, e.g. of articles edited since they were cached.
+        """
+        with self._lock:
+            self._connection.executemany("DELETE FROM articles WHERE title = ?", [(title,) for title in titles])
+            self._connection.commit()
+
+    def size(self) -> int:
+        """
+        Returns the total size in bytes of the cached extracts.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _is_expired(self, fetched_at: float, now: float) -> bool:
+        return self.ttl is not None and now - fetched_at > self.ttl
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._connection.execute("SELECT title, size FROM articles ORDER BY accessed_at ASC").fetchall()
+        for title, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM articles WHERE title = ?", (title,))
+            total -= size
@@ -0,0 +1,206 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Union
+
+import httpx
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.core import pick_top_k_matches
+from text_matcher.document_index import DocumentIndex, load_document_index
+from text_matcher.http_client import RETRY_STATUSES
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import load_vectorizer, get_distance_function
+from text_matcher.wikipedia_connector import API_URL, FILTER, MAX_TITLES_PER_QUERY, ArticleNotFound, \
+    extracts_query_params, collect_extracts, resolve_extracts, remove_sections_and_clean_text, get_title_from_url
+
+
+class AsyncHttpClient:
+    """
+    Asyncio counterpart of `HttpClient`: one `httpx.AsyncClient` keeps a pool of at most `concurrency` keep-alive
+    connections, and at most `concurrency` requests are in flight at once, however many coroutines call `get`.
+
+    Requests are retried with exponential backoff on 429/5xx responses and connection errors. `transport` replaces
+    the network transport of httpx, e.g. with an `httpx.MockTransport` in tests.
+    """
+
+    def __init__(self, concurrency: int = 4, max_retries: int = 3, backoff_factor: float = 0.5, timeout: float = 30,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1.")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.requests = 0
+        self.retries = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.session = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=timeout, transport=transport)
+
+    async def get(self, url: str, params: Optional[dict] = None) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                async with self._semaphore:
+                    response = await self.session.get(url, params=params)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= self.max_retries):
+                return response
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    async def aclose(self):
+        await self.session.aclose()
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * 2 ** attempt
+
+
+async def fetch_wikipedia_articles(titles: List[str], client: AsyncHttpClient, cache: Optional[ArticleCache] = None,
+                                   batch_size: int = 1, api_url: str = API_URL) -> Dict[str, Optional[str]]:
+    """
+    Fetches the raw extracts of Wikipedia articles with API queries of `batch_size` titles, all queries
+    concurrently, serving cached ones from `cache`. Cache lookups run in the default executor.
+
+    The API returns whole-article extracts one per response, so a multi-title query takes one request per title,
+    made one after another through `continue`. With the default of one title per query every request is made
+    concurrently, up to the `concurrency` of `client`.
+
+    Returns:
+        Dict[str, Optional[str]]: Extract for every title, None for missing articles and failed queries.
+    """
+    batch_size = min(batch_size, MAX_TITLES_PER_QUERY)
+    unique_titles = list(dict.fromkeys(titles))
+    extracts = {}
+    if cache is not None:
+        cached = await asyncio.to_thread(lambda: {title: cache.get(title) for title in unique_titles})
+        extracts = {title: text for title, text in cached.items() if text is not None or cache.offline}
+    pending = [title for title in unique_titles if title not in extracts]
+
+    async def fetch(batch: List[str]) -> Dict[str, Optional[str]]:
+        try:
+            return await _fetch_extracts(batch, client, api_url)
+        except (ArticleNotFound, httpx.TransportError):
+            return dict.fromkeys(batch)
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    for batch_extracts in await asyncio.gather(*(fetch(batch) for batch in batches)):
+        extracts.update(batch_extracts)
+        if cache is not None:
+            fetched = {title: text for title, text in batch_extracts.items() if text is not None}
+            await asyncio.to_thread(lambda: [cache.put(title, text) for title, text in fetched.items()])
+    return extracts
+
+
+async def _fetch_extracts(titles: List[str], client: AsyncHttpClient, api_url: str) -> Dict[str, Optional[str]]:
+    params = extracts_query_params(titles)
+    aliases = {}
+    page_extracts = {}
+    continuation = {}
+    while True:
+        response = await client.get(api_url, params={**params, **continuation})
+        if response.status_code != 200:
+            raise ArticleNotFound(f"Failed to fetch articles: {response.status_code}")
+        data = response.json()
+        collect_extracts(data, aliases, page_extracts)
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+    return resolve_extracts(titles, aliases, page_extracts)
+
+
+class AsyncMatcher:
+    """
+    Matches Wikipedia articles against a document index from asyncio code without blocking the event loop:
+    articles are downloaded with an `AsyncHttpClient`, while cleaning, vectorizing and scoring run in `executor`
+    (the default executor of the loop if None). Any number of `pick_best` and `pick_best_many` calls can be awaited
+    concurrently; the vectorizer and the index are only read.
+    """
+
+    def __init__(self, vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer], index: DocumentIndex,
+                 client: Optional[AsyncHttpClient] = None, cache: Optional[ArticleCache] = None,
+                 batch_size: int = 1, executor: Optional[Executor] = None,
+                 vector_cache: Optional[VectorCache] = None, api_url: str = API_URL,
+                 headers: Sequence[str] = FILTER):
+        self.vectorizer = vectorizer
+        self.index = index
+        self.client = client if client is not None else AsyncHttpClient()
+        self.cache = cache
+        self.batch_size = batch_size
+        self.executor = executor
+        self.vector_cache = vector_cache
+        self.api_url = api_url
+        self.headers = headers
+
+    @classmethod
+    async def load(cls, vectorizer_path: str, index_dir: str, **kwargs) -> "AsyncMatcher":
+        """
+        Loads the vectorizer and the prebuilt index in `index_dir` without blocking the event loop, in the
+        `executor` of `kwargs` if given. `kwargs` are passed to the constructor.
+        """
+        def load():
+            vectorizer = load_vectorizer(vectorizer_path)
+            return vectorizer, load_document_index(index_dir, vectorizer)
+
+        vectorizer, index = await asyncio.get_running_loop().run_in_executor(kwargs.get("executor"), load)
+        return cls(vectorizer, index, **kwargs)
+
+    async def pick_best(self, query_url: str, distance_metric: str = "cosine", exact: bool = False) -> str:
+        """
+        Returns the URL of the document closest to the article behind `query_url`, like
+        `load_vectorizer_and_pick_best`.
+
+        Raises:
+            ArticleNotFound: The query article is missing or could not be downloaded.
+        """
+        best = await self.pick_best_many([query_url], distance_metric, exact)
+        if query_url not in best:
+            raise ArticleNotFound(f"Article not found: {query_url}")
+        return best[query_url]
+
+    async def pick_best_many(self, query_urls: List[str], distance_metric: str = "cosine",
+                             exact: bool = False) -> Dict[str, str]:
+        """
+        Returns the URL of the closest document for every query URL, like `load_vectorizer_and_pick_best_for_all`:
+        all query articles are fetched concurrently and scored as one batch. Missing articles are skipped.
+        """
+        get_distance_function(distance_metric)
+        extracts = await fetch_wikipedia_articles([get_title_from_url(url) for url in query_urls], self.client,
+                                                  self.cache, self.batch_size, self.api_url)
+        found = [url for url in dict.fromkeys(query_urls) if extracts.get(get_title_from_url(url)) is not None]
+        if not found:
+            return {}
+        texts = [extracts[get_title_from_url(url)] for url in found]
+        matches = await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(self._match, texts, distance_metric, exact))
+        return {url: url_matches[0][0] for url, url_matches in zip(found, matches) if url_matches}
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncMatcher":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _match(self, texts: List[str], distance_metric: str, exact: bool):
+        cleaned = [remove_sections_and_clean_text(text, self.headers) for text in texts]
+        return pick_top_k_matches(self.vectorizer, self.index, cleaned, distance_metric, 1, exact,
+                                  vector_cache=self.vector_cache)
@@ -1,12 +1,18 @@
-from typing import Optional
-from urllib.parse import urlparse
+import os
+from typing import TYPE_CHECKING, Optional
 
 import typer
-from pydantic import ValidationError
 
-from text_matcher.core import train_and_save_vectorizer, load_vectorizer_and_pick_best, \
-    load_vectorizer_and_pick_best_for_all, load_data
-from text_matcher.vectorizer_config import build_vectorizer_config
+from text_matcher.article_cache import ArticleCache
+from text_matcher.match_output import OUTPUT_FORMATS, STREAMING_OUTPUT_FORMATS, format_matches, format_match_lines
+from text_matcher.profiling import Profiler, activate_profiler, deactivate_profiler
+from text_matcher.sources import STDIN, check_source_type, detect_source_type
+
+# modules depending on sklearn, scipy, numpy, requests or pydantic are imported inside the commands using them, so
+# --help and argument errors answer without loading them
+if TYPE_CHECKING:
+    from text_matcher.http_client import HttpClient
+    from text_matcher.vector_cache import VectorCache
 
 cli_app = typer.Typer()
 
@@ -16,59 +22,472 @@ def train(
         vectorizer_type: str = typer.Option("count",
                                             help="Vectorizer type: count, tfidf, hashing"),
         train_file_path: str = typer.Option("data/train.csv",
-                                            help="Wikipedia URLs csv file path"),
-        output_model_path: str = typer.Option("vectorizer_model.pkl",
+                                            help="Training documents: a CSV file of Wikipedia URLs, a text file, a directory of .txt files, a JSONL file or - for stdin"),
+        output_model_path: str = typer.Option("vectorizer_model.npz",
                                               help="Path to save the model"),
-        vectorizer_params: Optional[str] = "{}"
+        vectorizer_params: Optional[str] = "{}",
+        cache_dir: Optional[str] = typer.Option(None,
+                                                help="Directory of the persistent article cache"),
+        cache_ttl: Optional[float] = typer.Option(None,
+                                                  help="Seconds after which cached articles are downloaded again"),
+        cache_max_bytes: Optional[int] = typer.Option(None,
+                                                      help="Size cap of the article cache, least recently used articles are evicted first"),
+        offline: bool = typer.Option(False,
+                                     help="Use only articles from the cache, never download"),
+        bypass_cache: bool = typer.Option(False,
+                                          help="Download every article, refreshing the cache"),
+        concurrency: int = typer.Option(4,
+                                        help="Number of articles downloaded in parallel over a shared connection pool"),
+        batch_size: int = typer.Option(1,
+                                       help="Number of article titles sent in one Wikipedia API query (max 50); the API returns one whole article per response, so batches do not save requests and fetch their articles one after another"),
+        chunk_size: Optional[int] = typer.Option(None,
+                                                 help="Stream the training file in chunks of this many articles, keeping only vocabulary counts in memory"),
+        max_terms: Optional[int] = typer.Option(None,
+                                                help="Maximum number of terms counted at once while streaming, the rarest are pruned"),
+        resume: bool = typer.Option(False,
+                                    help="Resume a streamed training from the checkpoint next to --output-model-path")
 
 ):
+    from pydantic import ValidationError
+    from text_matcher.core import train_and_save_vectorizer
+    from text_matcher.streaming_training import stream_train_and_save_vectorizer
+    from text_matcher.vectorizer_config import build_vectorizer_config
+
     try:
         vectorizer_config = build_vectorizer_config(vectorizer_type, vectorizer_params)
     except ValidationError:
         typer.echo(f"Invalid vectorizer parameters {vectorizer_params} for {vectorizer_type} vectorizer.")
         raise typer.Exit(1)
-    train_and_save_vectorizer(output_model_path, train_file_path, vectorizer_config)
+    if chunk_size is not None and chunk_size < 1:
+        typer.echo(f"--chunk-size must be at least 1, got {chunk_size}.")
+        raise typer.Exit(1)
+    if max_terms is not None and max_terms < 1:
+        typer.echo(f"--max-terms must be at least 1, got {max_terms}.")
+        raise typer.Exit(1)
+    cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+    client = build_http_client(concurrency)
+    try:
+        if chunk_size is not None or max_terms is not None or resume:
+            stream_train_and_save_vectorizer(output_model_path, train_file_path, vectorizer_config,
+                                             chunk_size or 1000, max_terms=max_terms, resume=resume, cache=cache,
+                                             client=client, batch_size=batch_size)
+        else:
+            train_and_save_vectorizer(output_model_path, train_file_path, vectorizer_config, cache=cache,
+                                      client=client, batch_size=batch_size)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
     typer.echo(f"Model {vectorizer_type} saved as {output_model_path}.")
+    echo_cache_stats(cache)
+
+
+def build_article_cache(cache_dir: Optional[str], ttl: Optional[float], max_bytes: Optional[int], offline: bool,
+                        bypass: bool) -> Optional[ArticleCache]:
+    if cache_dir is None:
+        if offline or bypass:
+            typer.echo("--offline and --bypass-cache require --cache-dir.")
+            raise typer.Exit(1)
+        return None
+    if offline and bypass:
+        typer.echo("--offline and --bypass-cache cannot be used together.")
+        raise typer.Exit(1)
+    return ArticleCache(cache_dir, ttl=ttl, max_bytes=max_bytes, offline=offline, bypass=bypass)
+
+
+def build_http_client(concurrency: int) -> "HttpClient":
+    from text_matcher.http_client import HttpClient
+
+    if concurrency < 1:
+        typer.echo(f"Concurrency must be at least 1, got {concurrency}.")
+        raise typer.Exit(1)
+    return HttpClient(concurrency=concurrency)
+
+
+def check_n_jobs(n_jobs: Optional[int]):
+    if n_jobs is not None and n_jobs < 1 and n_jobs != -1:
+        typer.echo(f"--n-jobs must be at least 1 or -1 for one process per CPU, got {n_jobs}.")
+        raise typer.Exit(1)
+
+
+def start_profiler(profile: bool, profile_output: Optional[str], profile_dir: Optional[str]) -> Optional[Profiler]:
+    if not (profile or profile_output or profile_dir):
+        return None
+    return activate_profiler(Profiler(profile_dir))
 
 
-def is_file(path) -> bool:
-    if ".csv" in path:
-        return True
-    return False
+def report_profile(profiler: Optional[Profiler], profile_output: Optional[str]):
+    if profiler is None:
+        return
+    deactivate_profiler()
+    typer.echo(profiler.summary(), err=True)
+    if profile_output is not None:
+        profiler.save_trace(profile_output)
+    profiler.dump_profiles()
 
 
-def is_valid_url(url):
+def echo_cache_stats(cache: Optional[ArticleCache]):
+    if cache is not None:
+        typer.echo(f"Article cache: {cache.hits} hits, {cache.misses} misses.")
+
+
+def build_vector_cache(cache_dir: Optional[str], max_bytes: Optional[int]) -> Optional["VectorCache"]:
+    from text_matcher.vector_cache import VectorCache
+
+    if cache_dir is None:
+        if max_bytes is not None:
+            typer.echo("--vector-cache-max-bytes requires --vector-cache-dir.")
+            raise typer.Exit(1)
+        return None
+    return VectorCache(cache_dir, max_bytes=max_bytes)
+
+
+def echo_vector_cache_stats(vector_cache: Optional["VectorCache"]):
+    if vector_cache is not None:
+        typer.echo(f"Vector cache: {vector_cache.hits} hits, {vector_cache.misses} misses "
+                   f"({vector_cache.hit_rate:.1%} hit rate), {vector_cache.bytes_saved} bytes of text not tokenized.")
+
+
+@cli_app.command()
+def index(
+        documents_path: str = typer.Option("data/test.csv",
+                                           help="Documents to be matched: a CSV file of URLs, a text file, a directory of .txt files, a JSONL file or - for stdin"),
+        vectorizer_path: str = typer.Option("vectorizer_model.npz",
+                                            help="Path to the saved vectorizer model"),
+        index_dir: str = typer.Option("document_index",
+                                      help="Directory to save the document index to"),
+        ann: Optional[str] = typer.Option(None,
+                                          help="Approximate nearest-neighbour backend built into the index: random-projection, minhash"),
+        ann_params: Optional[str] = "{}",
+        n_jobs: Optional[int] = typer.Option(None,
+                                             help="Number of processes transforming documents to vectors, -1 for one per CPU"),
+        cache_dir: Optional[str] = typer.Option(None,
+                                                help="Directory of the persistent article cache"),
+        cache_ttl: Optional[float] = typer.Option(None,
+                                                  help="Seconds after which cached articles are downloaded again"),
+        cache_max_bytes: Optional[int] = typer.Option(None,
+                                                      help="Size cap of the article cache, least recently used articles are evicted first"),
+        offline: bool = typer.Option(False,
+                                     help="Use only articles from the cache, never download"),
+        bypass_cache: bool = typer.Option(False,
+                                          help="Download every article, refreshing the cache"),
+        concurrency: int = typer.Option(4,
+                                        help="Number of articles downloaded in parallel over a shared connection pool"),
+        batch_size: int = typer.Option(1,
+                                       help="Number of article titles sent in one Wikipedia API query (max 50); the API returns one whole article per response, so batches do not save requests and fetch their articles one after another"),
+        update: bool = typer.Option(False,
+                                    help="Update the existing index: fetch and transform only new and changed documents, tombstone removed ones"),
+        compact_ratio: float = typer.Option(0.2,
+                                            help="With --update, compact the index once this share of its rows are tombstones"),
+        vector_cache_dir: Optional[str] = typer.Option(None,
+                                                       help="Directory of the persistent cache of document vectors, so texts seen before are not tokenized again"),
+        vector_cache_max_bytes: Optional[int] = typer.Option(None,
+                                                             help="Size cap of the vector cache, least recently used vectors are evicted first"),
+        profile: bool = typer.Option(False,
+                                     help="Print the time, counters and peak memory of every pipeline stage to stderr"),
+        profile_output: Optional[str] = typer.Option(None,
+                                                     help="Write the profile of every pipeline stage to this JSON file"),
+        profile_dir: Optional[str] = typer.Option(None,
+                                                  help="Write a cProfile dump of every pipeline stage to this directory")
+):
+    from pydantic import ValidationError
+    from text_matcher.ann import build_ann_config
+    from text_matcher.core import index_documents, update_index
+    from text_matcher.document_index import IndexMismatch
+    from text_matcher.wikipedia_connector import ArticleNotFound
+
+    ann_config = None
+    if ann is not None:
+        try:
+            ann_config = build_ann_config(ann, ann_params)
+        except (ValueError, ValidationError):
+            typer.echo(f"Invalid ANN parameters {ann_params} for {ann} backend.")
+            raise typer.Exit(1)
+    check_n_jobs(n_jobs)
+    cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+    client = build_http_client(concurrency)
+    vector_cache = build_vector_cache(vector_cache_dir, vector_cache_max_bytes)
+    profiler = start_profiler(profile, profile_output, profile_dir)
     try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except ValueError:
-        return False
+        if update:
+            updated = update_index(vectorizer_path, documents_path, index_dir, cache=cache, client=client,
+                                   batch_size=batch_size, ann_config=ann_config, n_jobs=n_jobs,
+                                   vector_cache=vector_cache, compact_ratio=compact_ratio)
+        else:
+            indexed = index_documents(vectorizer_path, documents_path, index_dir, cache=cache, client=client,
+                                      batch_size=batch_size, ann_config=ann_config, n_jobs=n_jobs,
+                                      vector_cache=vector_cache)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    except IndexMismatch as e:
+        typer.echo(f"{e.message} Rebuild the index without --update.")
+        raise typer.Exit(1)
+    except ArticleNotFound as e:
+        typer.echo(e.message)
+        raise typer.Exit(1)
+    finally:
+        report_profile(profiler, profile_output)
+    if update:
+        typer.echo(f"Updated {index_dir}: {updated.added} added, {updated.changed} changed, {updated.removed} removed, "
+                   f"{updated.failed} failed, {updated.documents} documents"
+                   + (", compacted." if updated.compacted else "."))
+    else:
+        typer.echo(f"Indexed {indexed} documents in {index_dir}.")
+    echo_cache_stats(cache)
+    echo_vector_cache_stats(vector_cache)
+
+
+def resolve_source_type(source: str, source_type: str) -> str:
+    if source_type == "auto":
+        return detect_source_type(source)
+    check_source_type(source_type)
+    return source_type
 
 
 @cli_app.command()
 def pick_best(
         query: str = typer.Argument(...,
-                                    help="A single URL or a path to a csv file containing URLs to find the best match for"),
+                                    help="A single URL, a csv file of URLs, a text file, a directory of .txt files, a JSONL file, - for stdin or raw text with --query-source text"),
+        query_source: str = typer.Option("auto",
+                                         help="Type of the query: auto, url, urls, file, directory, jsonl, stdin, text"),
         documents_path: str = typer.Option("data/test.csv",
-                                           help="Path to the CSV file with document to be matched URLs"),
-        vectorizer_path: str = typer.Option("vectorizer_model.pkl",
+                                           help="Documents to be matched: a CSV file of URLs, a text file, a directory of .txt files, a JSONL file or - for stdin"),
+        vectorizer_path: str = typer.Option("vectorizer_model.npz",
                                             help="Path to the saved vectorizer model"),
+        index_dir: Optional[str] = typer.Option(None, "--index",
+                                                help="Directory of a document index built with the index command, used instead of --documents-path"),
         distance_metric: str = typer.Option("cosine",
-                                            help="Distance metric: cosine, euclidean, manhattan")
+                                            help="Distance metric: cosine, euclidean, manhattan"),
+        exact: bool = typer.Option(False,
+                                   help="Score all documents even if the index was built with an ANN backend"),
+        n_jobs: Optional[int] = typer.Option(None,
+                                             help="Number of processes transforming documents to vectors and of threads scoring them, -1 for one per CPU"),
+        top_k: Optional[int] = typer.Option(None,
+                                            help="Return the k best matches with their similarity or distance"),
+        output_format: str = typer.Option("text",
+                                          help="Output format of the matches: text, json, jsonl, csv"),
+        chunk_size: Optional[int] = typer.Option(None,
+                                                 help="Stream a query file in chunks of this many queries, writing results as each chunk completes"),
+        output: Optional[str] = typer.Option(None,
+                                             help="File to write streamed results to, with a checkpoint next to it"),
+        resume: bool = typer.Option(False,
+                                    help="Resume a streamed run from the checkpoint of --output"),
+        cache_dir: Optional[str] = typer.Option(None,
+                                                help="Directory of the persistent article cache"),
+        cache_ttl: Optional[float] = typer.Option(None,
+                                                  help="Seconds after which cached articles are downloaded again"),
+        cache_max_bytes: Optional[int] = typer.Option(None,
+                                                      help="Size cap of the article cache, least recently used articles are evicted first"),
+        offline: bool = typer.Option(False,
+                                     help="Use only articles from the cache, never download"),
+        bypass_cache: bool = typer.Option(False,
+                                          help="Download every article, refreshing the cache"),
+        concurrency: int = typer.Option(4,
+                                        help="Number of articles downloaded in parallel over a shared connection pool"),
+        batch_size: int = typer.Option(1,
+                                       help="Number of article titles sent in one Wikipedia API query (max 50); the API returns one whole article per response, so batches do not save requests and fetch their articles one after another"),
+        vector_cache_dir: Optional[str] = typer.Option(None,
+                                                       help="Directory of the persistent cache of document vectors, so texts seen before are not tokenized again"),
+        vector_cache_max_bytes: Optional[int] = typer.Option(None,
+                                                             help="Size cap of the vector cache, least recently used vectors are evicted first"),
+        profile: bool = typer.Option(False,
+                                     help="Print the time, counters and peak memory of every pipeline stage to stderr"),
+        profile_output: Optional[str] = typer.Option(None,
+                                                     help="Write the profile of every pipeline stage to this JSON file"),
+        profile_dir: Optional[str] = typer.Option(None,
+                                                  help="Write a cProfile dump of every pipeline stage to this directory")
 ):
-    if is_file(query):
-        query_urls = load_data(str(query))
-        best_matches = load_vectorizer_and_pick_best_for_all(distance_metric, query_urls, documents_path,
-                                                             vectorizer_path)
-        for query_url, best_match in best_matches.items():
-            typer.echo(f"Best match for {query_url} is: {best_match}")
-    elif is_valid_url(query):
-        best_match = load_vectorizer_and_pick_best(distance_metric, str(query), documents_path,
-                                                   vectorizer_path)
-        typer.echo(f"Best match: {best_match}")
-    else:
+    from text_matcher.core import load_vectorizer_and_pick_best, load_vectorizer_and_pick_best_for_all, load_data, \
+        load_vectorizer_and_pick_top_k, load_vectorizer_and_pick_top_k_for_all, \
+        load_vectorizer_and_pick_top_k_for_source
+    from text_matcher.document_index import IndexMismatch
+    from text_matcher.streaming import stream_matches
+
+    if output_format not in OUTPUT_FORMATS:
+        typer.echo(f"Unsupported output format: {output_format}. Choose from {', '.join(OUTPUT_FORMATS)}.")
+        raise typer.Exit(1)
+    if top_k is not None and top_k < 1:
+        typer.echo(f"--top-k must be at least 1, got {top_k}.")
+        raise typer.Exit(1)
+    if chunk_size is not None and chunk_size < 1:
+        typer.echo(f"--chunk-size must be at least 1, got {chunk_size}.")
+        raise typer.Exit(1)
+    with_scores = top_k is not None or output_format != "text"
+    streaming = chunk_size is not None or output is not None or resume
+    if streaming and output_format not in STREAMING_OUTPUT_FORMATS:
+        typer.echo(f"Streamed results support only {', '.join(STREAMING_OUTPUT_FORMATS)} output formats.")
+        raise typer.Exit(1)
+    if resume and output is None:
+        typer.echo("--resume requires --output.")
+        raise typer.Exit(1)
+    check_n_jobs(n_jobs)
+    try:
+        source_type = resolve_source_type(query, query_source)
+    except ValueError:
         typer.echo(f"provided query_url_or_file_path is not a valid URL or file path: {query}")
         raise typer.Exit(1)
+    if source_type == "stdin" and documents_path == STDIN and index_dir is None:
+        typer.echo("Queries and documents cannot both be read from stdin.")
+        raise typer.Exit(1)
+    vector_cache = build_vector_cache(vector_cache_dir, vector_cache_max_bytes)
+    profiler = start_profiler(profile, profile_output, profile_dir)
+    try:
+        if source_type != "url" and streaming:
+            cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+            client = build_http_client(concurrency)
+            completed = stream_matches(distance_metric, str(query), documents_path, vectorizer_path,
+                                       chunk_size or 1000, output_path=output, k=top_k,
+                                       output_format=output_format, resume=resume, cache=cache, client=client,
+                                       batch_size=batch_size, index_dir=index_dir, exact=exact,
+                                       n_jobs=n_jobs, query_source_type=source_type, vector_cache=vector_cache)
+            if output is not None:
+                typer.echo(f"Matched {completed} queries into {output}.")
+        elif source_type == "urls":
+            cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+            client = build_http_client(concurrency)
+            query_urls = load_data(str(query))
+            if with_scores:
+                matches = load_vectorizer_and_pick_top_k_for_all(distance_metric, query_urls, documents_path,
+                                                                 vectorizer_path, top_k or 1, cache=cache,
+                                                                 client=client, batch_size=batch_size,
+                                                                 index_dir=index_dir, exact=exact, n_jobs=n_jobs,
+                                                                 vector_cache=vector_cache)
+                typer.echo(format_matches(matches, output_format))
+            else:
+                best_matches = load_vectorizer_and_pick_best_for_all(distance_metric, query_urls, documents_path,
+                                                                     vectorizer_path, cache=cache, client=client,
+                                                                     batch_size=batch_size, index_dir=index_dir,
+                                                                     exact=exact, n_jobs=n_jobs,
+                                                                     vector_cache=vector_cache)
+                for query_url, best_match in best_matches.items():
+                    typer.echo(f"Best match for {query_url} is: {best_match}")
+        elif source_type == "url":
+            cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+            client = build_http_client(concurrency)
+            if with_scores:
+                matches = load_vectorizer_and_pick_top_k(distance_metric, str(query), documents_path,
+                                                         vectorizer_path, top_k or 1, cache=cache, client=client,
+                                                         batch_size=batch_size, index_dir=index_dir,
+                                                         exact=exact, n_jobs=n_jobs,
+                                                         vector_cache=vector_cache)
+                typer.echo(format_matches({str(query): matches}, output_format))
+            else:
+                best_match = load_vectorizer_and_pick_best(distance_metric, str(query), documents_path,
+                                                           vectorizer_path, cache=cache, client=client,
+                                                           batch_size=batch_size, index_dir=index_dir,
+                                                           exact=exact, n_jobs=n_jobs,
+                                                           vector_cache=vector_cache)
+                typer.echo(f"Best match: {best_match}")
+        else:
+            cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+            client = build_http_client(concurrency)
+            matches = load_vectorizer_and_pick_top_k_for_source(distance_metric, query, documents_path,
+                                                                vectorizer_path, top_k or 1, source_type, cache=cache,
+                                                                client=client, batch_size=batch_size,
+                                                                index_dir=index_dir, exact=exact, n_jobs=n_jobs,
+                                                                vector_cache=vector_cache)
+            if with_scores:
+                typer.echo(format_matches(matches, output_format))
+            else:
+                for line in format_match_lines(matches, "text", best_only=True):
+                    typer.echo(line)
+    except IndexMismatch as e:
+        typer.echo(e.message)
+        raise typer.Exit(1)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    finally:
+        report_profile(profiler, profile_output)
+    echo_cache_stats(cache)
+    echo_vector_cache_stats(vector_cache)
+
+
+@cli_app.command()
+def serve(
+        documents_path: str = typer.Option("data/test.csv",
+                                           help="Documents to be matched: a CSV file of URLs, a text file, a directory of .txt files, a JSONL file or - for stdin"),
+        vectorizer_path: str = typer.Option("vectorizer_model.npz",
+                                            help="Path to the saved vectorizer model"),
+        index_dir: Optional[str] = typer.Option(None, "--index",
+                                                help="Directory of a document index built with the index command, used instead of --documents-path"),
+        distance_metric: str = typer.Option("cosine",
+                                            help="Default distance metric: cosine, euclidean, manhattan"),
+        host: str = typer.Option("127.0.0.1",
+                                 help="Address to listen on"),
+        port: int = typer.Option(8000,
+                                 help="Port to listen on"),
+        unix_socket: Optional[str] = typer.Option(None,
+                                                  help="Listen on this Unix socket path instead of host and port"),
+        cache_dir: Optional[str] = typer.Option(None,
+                                                help="Directory of the persistent article cache"),
+        cache_ttl: Optional[float] = typer.Option(None,
+                                                  help="Seconds after which cached articles are downloaded again"),
+        cache_max_bytes: Optional[int] = typer.Option(None,
+                                                      help="Size cap of the article cache, least recently used articles are evicted first"),
+        offline: bool = typer.Option(False,
+                                     help="Use only articles from the cache, never download"),
+        bypass_cache: bool = typer.Option(False,
+                                          help="Download every article, refreshing the cache"),
+        concurrency: int = typer.Option(4,
+                                        help="Number of articles downloaded in parallel over a shared connection pool"),
+        batch_size: int = typer.Option(1,
+                                       help="Number of article titles sent in one Wikipedia API query (max 50); the API returns one whole article per response, so batches do not save requests and fetch their articles one after another"),
+        vector_cache_dir: Optional[str] = typer.Option(None,
+                                                       help="Directory of the persistent cache of document vectors, so texts seen before are not tokenized again"),
+        vector_cache_max_bytes: Optional[int] = typer.Option(None,
+                                                             help="Size cap of the vector cache, least recently used vectors are evicted first")
+):
+    from text_matcher.document_index import IndexMismatch
+    from text_matcher.server import MatchService, build_server
+
+    cache = build_article_cache(cache_dir, cache_ttl, cache_max_bytes, offline, bypass_cache)
+    client = build_http_client(concurrency)
+    vector_cache = build_vector_cache(vector_cache_dir, vector_cache_max_bytes)
+    try:
+        service = MatchService(vectorizer_path, documents_path, index_dir, distance_metric, cache=cache,
+                               client=client, batch_size=batch_size, vector_cache=vector_cache)
+    except IndexMismatch as e:
+        typer.echo(e.message)
+        raise typer.Exit(1)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    try:
+        server = build_server(service, host, port, unix_socket)
+    except FileExistsError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    address = unix_socket if unix_socket is not None else f"http://{host}:{server.server_port}"
+    typer.echo(f"Serving {service.status()['documents']} documents on {address}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    echo_cache_stats(cache)
+    echo_vector_cache_stats(vector_cache)
+
+
+@cli_app.command()
+def convert_model(
+        model_path: str = typer.Argument(..., help="Path to a pickled vectorizer model"),
+        output_model_path: Optional[str] = typer.Option(None,
+                                                        help="Path to save the converted model [default: model_path with the .npz suffix]")
+):
+    from text_matcher.vectorizer import load_vectorizer, save_vectorizer
+
+    output_model_path = output_model_path or f"{os.path.splitext(model_path)[0]}.npz"
+    try:
+        save_vectorizer(load_vectorizer(model_path, allow_pickle=True), output_model_path)
+    except FileNotFoundError:
+        typer.echo(f"Model file not found: {model_path}")
+        raise typer.Exit(1)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(1)
+    typer.echo(f"Saved the converted model to {output_model_path}.")
 
 
 if __name__ == "__main__":
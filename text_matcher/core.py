@@ -1,56 +1,286 @@
-from typing import List
+from typing import List, NamedTuple, Optional, Dict, Tuple
 
-from text_matcher.vectorizer import train_vectorizer, save_vectorizer, load_vectorizer, transform_and_pick_best_document
-from text_matcher.vectorizer_config import VectorizerConfig
-from text_matcher.wikipedia_connector import get_wikipedia_core_text_content, get_wikipedia_core_texts_contents
+from text_matcher.ann import AnnConfig
+from text_matcher.article_cache import ArticleCache
+from text_matcher.document_index import DocumentIndex, IndexDiff, build_document_index, save_document_index, \
+    load_document_index, document_index_exists, diff_document_index, update_document_index, \
+    compact_document_index, COMPACT_DELETED_RATIO
+from text_matcher.http_client import HttpClient
+from text_matcher.parallel import parallel_transform
+from text_matcher.profiling import profile_stage
+from text_matcher.sources import detect_source_type, iter_data, load_local_documents, text_version, \
+    WIKIPEDIA_SOURCE_TYPES
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import train_vectorizer, save_vectorizer, load_vectorizer
+from text_matcher.vectorizer_config import VectorizerConfig, HashingVectorizerConfig
+from text_matcher.wikipedia_connector import get_wikipedia_core_text_content, get_wikipedia_core_texts_contents, \
+    get_wikipedia_revisions, invalidate_cached_articles
 
 
-def train_and_save_vectorizer(output_model_path: str, train_file: str, vectorizer_config: VectorizerConfig):
-    urls = load_data(train_file)
-    documents = get_wikipedia_core_texts_contents(urls)
+def train_and_save_vectorizer(output_model_path: str, train_file: str, vectorizer_config: VectorizerConfig,
+                              cache: Optional[ArticleCache] = None, client: Optional[HttpClient] = None,
+                              batch_size: int = 1):
+    if isinstance(vectorizer_config, HashingVectorizerConfig):
+        # a hashing vectorizer learns nothing from the articles, so they are not downloaded
+        save_vectorizer(train_vectorizer(vectorizer_config, []), output_model_path)
+        return
+    documents = load_documents(train_file, cache=cache, client=client, batch_size=batch_size)
     # this is a good place for data preprocess like a stemming, lemmatization, stopwords removal, lowercase, etc.
     vectorizer = train_vectorizer(vectorizer_config, list(documents.values()))
     save_vectorizer(vectorizer, output_model_path)
 
 
-def load_vectorizer_and_pick_best(distance_metric: str, query_url: str, test_file: str, vectorizer_path: str) -> str:
+def index_documents(vectorizer_path: str, test_file: str, index_dir: str, cache: Optional[ArticleCache] = None,
+                    client: Optional[HttpClient] = None, batch_size: int = 1,
+                    ann_config: Optional[AnnConfig] = None, n_jobs: Optional[int] = None,
+                    vector_cache: Optional[VectorCache] = None) -> int:
+    """
+    Builds the index of the documents of `test_file` in `index_dir`, recording the version of every document (see
+    `update_index`) so that a later update only fetches what changed since. Article revisions cannot be fetched in
+    offline mode, so an index of Wikipedia articles built offline has no versions and its first update fetches every
+    article once.
+    """
     vectorizer = load_vectorizer(vectorizer_path)
+    source_type = detect_source_type(test_file)
+    if source_type in WIKIPEDIA_SOURCE_TYPES and cache is not None and cache.offline:
+        index = fetch_and_index_documents(vectorizer, test_file, cache=cache, client=client, batch_size=batch_size,
+                                          ann_config=ann_config, n_jobs=n_jobs, vector_cache=vector_cache)
+    else:
+        versions, local_documents = load_document_versions(test_file, source_type, client=client)
+        documents = fetch_documents(list(versions), local_documents, cache=cache, client=client,
+                                    batch_size=batch_size)
+        index = build_document_index(vectorizer, documents, ann_config, n_jobs, versions, vector_cache)
+    save_document_index(index, index_dir)
+    return len(index)
 
-    test_urls = load_data(test_file)
 
-    test_documents_unprocessed = get_wikipedia_core_texts_contents(
-        test_urls)
-    query_text = get_wikipedia_core_text_content(query_url)
+def load_document_versions(test_file: str, source_type: str,
+                           client: Optional[HttpClient] = None) -> Tuple[Dict[str, str], Optional[Dict[str, str]]]:
+    """
+    Returns the current version of every document of `test_file`: the revision of Wikipedia articles, fetched with
+    one light `prop=info` query per batch of titles, or the content hash of local documents. Local documents are
+    read to hash them, so their texts are returned as well (None for Wikipedia sources).
+    """
+    if source_type not in WIKIPEDIA_SOURCE_TYPES:
+        local_documents = load_local_documents(test_file, source_type)
+        return {key: text_version(text) for key, text in local_documents.items()}, local_documents
+    urls = [test_file] if source_type == "url" else load_data(test_file)
+    # revision queries return every requested title at once, so they are always batched
+    return get_wikipedia_revisions(urls, client=client), None
 
-    best_idx = transform_and_pick_best_document(vectorizer, list(test_documents_unprocessed.values()), query_text,
-                                                distance_metric)
-    best_match_url = list(test_documents_unprocessed.keys())[best_idx]
-    return best_match_url
 
+def fetch_documents(keys: List[str], local_documents: Optional[Dict[str, str]], cache: Optional[ArticleCache] = None,
+                    client: Optional[HttpClient] = None, batch_size: int = 1) -> Dict[str, str]:
+    """
+    Returns the texts of the documents `keys`, taken from `local_documents` or downloaded from Wikipedia. Cached
+    extracts of the articles are dropped first, since they may predate the revisions just fetched.
+    """
+    if local_documents is not None:
+        return {key: local_documents[key] for key in keys}
+    if cache is not None:
+        invalidate_cached_articles(keys, cache)
+    return get_wikipedia_core_texts_contents(keys, cache=cache, client=client, batch_size=batch_size)
 
-def load_vectorizer_and_pick_best_for_all(distance_metric: str, query_urls: List[str], test_file: str,
-                                          vectorizer_path: str) -> dict:
+
+class IndexUpdate(NamedTuple):
+    added: int
+    changed: int
+    removed: int
+    failed: int
+    documents: int
+    compacted: bool
+
+
+def update_index(vectorizer_path: str, test_file: str, index_dir: str, cache: Optional[ArticleCache] = None,
+                 client: Optional[HttpClient] = None, batch_size: int = 1, ann_config: Optional[AnnConfig] = None,
+                 n_jobs: Optional[int] = None, vector_cache: Optional[VectorCache] = None,
+                 compact_ratio: float = COMPACT_DELETED_RATIO) -> IndexUpdate:
+    """
+    Brings the index in `index_dir` up to date with the documents of `test_file`, building it if there is none.
+
+    Only the documents added or changed since the index was saved are fetched and transformed: Wikipedia articles
+    are compared by revision (one light `prop=info` query per batch of titles), local documents by content hash.
+    Removed documents and the previous rows of changed ones are tombstoned, and the index is compacted once more
+    than `compact_ratio` of its rows are tombstones. A document that fails to download keeps its previous row.
+    The index is saved as a new generation, so processes reading it keep working during the update.
+
+    `ann_config` is only used when the index is built from scratch; updates keep the ANN config of the index.
+    """
+    vectorizer = load_vectorizer(vectorizer_path)
+    source_type = detect_source_type(test_file)
+    if source_type in WIKIPEDIA_SOURCE_TYPES and cache is not None and cache.offline:
+        raise ValueError("Updating an index needs the current article revisions, which cannot be fetched "
+                         "in offline mode.")
+    versions, local_documents = load_document_versions(test_file, source_type, client=client)
+
+    index = load_document_index(index_dir, vectorizer) if document_index_exists(index_dir) else None
+    diff = diff_document_index(index, versions) if index is not None else IndexDiff(list(versions), [], [])
+    pending = diff.added + diff.changed
+    documents = fetch_documents(pending, local_documents, cache=cache, client=client, batch_size=batch_size)
+
+    compacted = False
+    if index is None:
+        index = build_document_index(vectorizer, documents, ann_config, n_jobs, versions, vector_cache)
+        save_document_index(index, index_dir)
+    elif documents or diff.removed:
+        index = update_document_index(index, vectorizer, documents, versions, diff.removed, n_jobs, vector_cache)
+        if index.deleted_ratio > compact_ratio:
+            index = compact_document_index(index)
+            compacted = True
+        save_document_index(index, index_dir)
+    changed = set(diff.changed)
+    return IndexUpdate(added=sum(url not in changed for url in documents), changed=len(changed & set(documents)),
+                       removed=len(diff.removed), failed=len(pending) - len(documents), documents=len(index),
+                       compacted=compacted)
+
+
+def fetch_and_index_documents(vectorizer, test_file: str, cache: Optional[ArticleCache] = None,
+                              client: Optional[HttpClient] = None, batch_size: int = 1,
+                              ann_config: Optional[AnnConfig] = None, n_jobs: Optional[int] = None,
+                              vector_cache: Optional[VectorCache] = None) -> DocumentIndex:
+    test_documents_unprocessed = load_documents(test_file, cache=cache, client=client, batch_size=batch_size)
+    return build_document_index(vectorizer, test_documents_unprocessed, ann_config, n_jobs,
+                                vector_cache=vector_cache)
+
+
+def load_vectorizer_and_pick_best(distance_metric: str, query_url: str, test_file: str, vectorizer_path: str,
+                                  cache: Optional[ArticleCache] = None, client: Optional[HttpClient] = None,
+                                  batch_size: int = 1, index_dir: Optional[str] = None, exact: bool = False,
+                                  n_jobs: Optional[int] = None, vector_cache: Optional[VectorCache] = None) -> str:
     vectorizer = load_vectorizer(vectorizer_path)
 
-    test_urls = load_data(test_file)
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+    query_text = get_wikipedia_core_text_content(query_url, cache=cache, client=client)
+
+    return pick_top_k_matches(vectorizer, index, [query_text], distance_metric, 1, exact, n_jobs,
+                              vector_cache)[0][0][0]
+
 
-    test_documents_unprocessed = get_wikipedia_core_texts_contents(
-        test_urls)
-    query_texts = get_wikipedia_core_texts_contents(query_urls)
+def load_vectorizer_and_pick_best_for_all(distance_metric: str, query_urls: List[str], test_file: str,
+                                          vectorizer_path: str, cache: Optional[ArticleCache] = None,
+                                          client: Optional[HttpClient] = None, batch_size: int = 1,
+                                          index_dir: Optional[str] = None, exact: bool = False,
+                                          n_jobs: Optional[int] = None,
+                                          vector_cache: Optional[VectorCache] = None) -> dict:
+    vectorizer = load_vectorizer(vectorizer_path)
+
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+    query_texts = get_wikipedia_core_texts_contents(query_urls, cache=cache, client=client,
+                                                    batch_size=batch_size)
 
-    best_matches = {}
-    for url, text in query_texts.items():
-        best_idx = transform_and_pick_best_document(vectorizer, list(test_documents_unprocessed.values()), text,
-                                                    distance_metric)
-        best_match_url = list(test_documents_unprocessed.keys())[best_idx]
-        best_matches[url] = best_match_url
+    matches = pick_top_k_matches(vectorizer, index, list(query_texts.values()), distance_metric, 1, exact, n_jobs,
+                                 vector_cache)
+    best_matches = {url: url_matches[0][0] for url, url_matches in zip(query_texts.keys(), matches) if url_matches}
     return best_matches
 
 
+def load_vectorizer_and_pick_top_k(distance_metric: str, query_url: str, test_file: str, vectorizer_path: str,
+                                   k: int, cache: Optional[ArticleCache] = None,
+                                   client: Optional[HttpClient] = None, batch_size: int = 1,
+                                   index_dir: Optional[str] = None, exact: bool = False,
+                                   n_jobs: Optional[int] = None,
+                                   vector_cache: Optional[VectorCache] = None) -> List[Tuple[str, float]]:
+    vectorizer = load_vectorizer(vectorizer_path)
+
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+    query_text = get_wikipedia_core_text_content(query_url, cache=cache, client=client)
+
+    return pick_top_k_matches(vectorizer, index, [query_text], distance_metric, k, exact, n_jobs,
+                              vector_cache)[0]
+
+
+def load_vectorizer_and_pick_top_k_for_all(distance_metric: str, query_urls: List[str], test_file: str,
+                                           vectorizer_path: str, k: int, cache: Optional[ArticleCache] = None,
+                                           client: Optional[HttpClient] = None, batch_size: int = 1,
+                                           index_dir: Optional[str] = None,
+                                           exact: bool = False,
+                                           n_jobs: Optional[int] = None, vector_cache: Optional[VectorCache] = None
+                                           ) -> Dict[str, List[Tuple[str, float]]]:
+    vectorizer = load_vectorizer(vectorizer_path)
+
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+    query_texts = get_wikipedia_core_texts_contents(query_urls, cache=cache, client=client,
+                                                    batch_size=batch_size)
+
+    matches = pick_top_k_matches(vectorizer, index, list(query_texts.values()), distance_metric, k, exact, n_jobs,
+                                 vector_cache)
+    return dict(zip(query_texts.keys(), matches))
+
+
+def load_vectorizer_and_pick_top_k_for_source(distance_metric: str, query_source: str, test_file: str,
+                                              vectorizer_path: str, k: int, query_source_type: Optional[str] = None,
+                                              cache: Optional[ArticleCache] = None,
+                                              client: Optional[HttpClient] = None, batch_size: int = 1,
+                                              index_dir: Optional[str] = None, exact: bool = False,
+                                              n_jobs: Optional[int] = None, vector_cache: Optional[VectorCache] = None
+                                              ) -> Dict[str, List[Tuple[str, float]]]:
+    """
+    Matches every query of `query_source`, of any source type, returning the `k` closest (url, score) pairs of
+    every query key.
+    """
+    vectorizer = load_vectorizer(vectorizer_path)
+
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+    query_texts = load_documents(query_source, query_source_type, cache=cache, client=client, batch_size=batch_size)
+
+    matches = pick_top_k_matches(vectorizer, index, list(query_texts.values()), distance_metric, k, exact, n_jobs,
+                                 vector_cache)
+    return dict(zip(query_texts.keys(), matches))
+
+
+def pick_top_k_matches(vectorizer, index: DocumentIndex, query_texts: List[str], distance_metric: str,
+                       k: int, exact: bool = False, n_jobs: Optional[int] = None,
+                       vector_cache: Optional[VectorCache] = None) -> List[List[Tuple[str, float]]]:
+    """
+    Returns the `k` closest (url, score) pairs of `index` for every query text, closest first. Indexes built with
+    an ANN backend are searched approximately, and may return fewer than `k` pairs, unless `exact` is set.
+    Query texts are transformed in `n_jobs` processes, and scored in `n_jobs` threads, if given.
+    """
+    query_vecs = parallel_transform(vectorizer, query_texts, n_jobs, vector_cache=vector_cache)
+    best_idxs, scores = index.search(query_vecs, distance_metric, k, exact, n_jobs)
+    return [[(index.urls[idx], score) for idx, score in zip(row_idxs.tolist(), row_scores.tolist()) if idx >= 0]
+            for row_idxs, row_scores in zip(best_idxs, scores)]
+
+
+def load_or_fetch_document_index(vectorizer, test_file: str, index_dir: Optional[str],
+                                 cache: Optional[ArticleCache] = None, client: Optional[HttpClient] = None,
+                                 batch_size: int = 1, n_jobs: Optional[int] = None,
+                                 vector_cache: Optional[VectorCache] = None) -> DocumentIndex:
+    """
+    Loads the prebuilt index from `index_dir` if given, otherwise fetches and vectorizes the documents of `test_file`.
+    """
+    if index_dir is not None:
+        with profile_stage("load_index"):
+            return load_document_index(index_dir, vectorizer)
+    return fetch_and_index_documents(vectorizer, test_file, cache=cache, client=client, batch_size=batch_size,
+                                     n_jobs=n_jobs, vector_cache=vector_cache)
+
+
 def reverse_lookup(d, value):
     return next((k for k, v in d.items() if v == value), None)
 
 
 def load_data(file_path: str) -> List[str]:
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return [line.strip() for line in file]
+    return list(iter_data(file_path))
+
+
+def load_documents(source: str, source_type: Optional[str] = None, cache: Optional[ArticleCache] = None,
+                   client: Optional[HttpClient] = None, batch_size: int = 1) -> Dict[str, str]:
+    """
+    Loads the (key, text) documents of any source, see `detect_source_type`. Wikipedia articles are fetched and
+    cleaned, skipping missing ones, while local sources are read from disk or standard input as they are.
+    """
+    source_type = source_type or detect_source_type(source)
+    match source_type:
+        case "url":
+            urls = [source]
+        case "urls":
+            urls = load_data(source)
+        case _:
+            return load_local_documents(source, source_type)
+    return get_wikipedia_core_texts_contents(urls, cache=cache, client=client, batch_size=batch_size)
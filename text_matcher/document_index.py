@@ -0,0 +1,309 @@
+import json
+import os
+import re
+import shutil
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.ann import AnnConfig, AnnIndex, build_ann_index, load_ann_index
+from text_matcher.parallel import parallel_transform
+from text_matcher.profiling import profile_stage, profile_count
+from text_matcher.similarity import as_csr, row_norms
+from text_matcher.vectorizer import vectorizer_fingerprint, pick_top_k_documents
+
+if TYPE_CHECKING:
+    from text_matcher.vector_cache import VectorCache
+
+INDEX_FORMAT_VERSION = 3
+SUPPORTED_INDEX_FORMAT_VERSIONS = (2, 3)
+ARRAY_FILE_NAMES = {
+    "data": "data.npy",
+    "indices": "indices.npy",
+    "indptr": "indptr.npy",
+    "l2_norms": "l2_norms.npy",
+    "l1_norms": "l1_norms.npy",
+}
+METADATA_FILE_NAME = "index.json"
+ANN_DIR_NAME = "ann"
+# share of tombstoned rows above which an update compacts the index
+COMPACT_DELETED_RATIO = 0.2
+GENERATION_FILE_PATTERN = re.compile(
+    "^(?:" + "|".join(re.escape(name) for name in ARRAY_FILE_NAMES) + r")(?:\.(\d+))?\.npy$"
+    "|^" + re.escape(ANN_DIR_NAME) + r"(?:\.(\d+))?$")
+
+
+class IndexMismatch(Exception):
+    """
+    Exception raised when a document index was built with a different vectorizer than the one used for queries.
+    """
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class IndexDiff(NamedTuple):
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+
+
+class DocumentIndex:
+    """
+    Vectorized document corpus: one row of `vectors` per URL in `urls`, with precomputed L2 and L1 row norms and
+    an optional approximate nearest-neighbour index.
+
+    `versions` holds the revision every row was built from (None where unknown), and the rows in `deleted` are
+    tombstones of removed or re-indexed documents: they stay in the arrays until the index is compacted, but are
+    never returned by `search`.
+    """
+
+    def __init__(self, urls: List[str], vectors: csr_matrix, l2_norms: np.ndarray, l1_norms: np.ndarray,
+                 vectorizer_fingerprint: str, ann: Optional[AnnIndex] = None,
+                 versions: Optional[List[Optional[str]]] = None, deleted: Iterable[int] = ()):
+        self.urls = urls
+        self.vectors = vectors
+        self.l2_norms = l2_norms
+        self.l1_norms = l1_norms
+        self.vectorizer_fingerprint = vectorizer_fingerprint
+        self.ann = ann
+        self.versions = versions if versions is not None else [None] * len(urls)
+        self.deleted = np.unique(np.asarray(list(deleted), dtype=np.int64))
+
+    def search(self, query_vecs: csr_matrix, distance_metric: str, k: int, exact: bool = False,
+               n_jobs: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the `k` closest documents for every query vector, through the ANN index when there is one and
+        `exact` is not set. Exhaustive scoring runs in `n_jobs` threads if given.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices and their similarities (cosine) or distances, closest first,
+            both of shape (queries, k), with `k` capped at the number of live documents. Tombstoned rows are masked
+            inside scoring, so they cost nothing beyond their own scores. Approximate results may be padded with
+            index -1 and score NaN.
+        """
+        exclude = None
+        if len(self.deleted):
+            exclude = np.zeros(self.vectors.shape[0], dtype=bool)
+            exclude[self.deleted] = True
+        if self.ann is not None and not exact:
+            with profile_stage("score"):
+                best = self.ann.search(query_vecs, self.vectors, distance_metric, k, self.norms(distance_metric),
+                                       n_jobs, exclude)
+            profile_count("score", queries=query_vecs.shape[0], documents=len(self))
+            return best
+        return pick_top_k_documents(query_vecs, self.vectors, distance_metric, k, self.norms(distance_metric),
+                                    n_jobs, exclude)
+
+    def norms(self, distance_metric: str) -> np.ndarray:
+        """
+        Returns the row norms used by `distance_metric`: L1 for manhattan, L2 otherwise.
+        """
+        return self.l1_norms if distance_metric.lower() == 'manhattan' else self.l2_norms
+
+    def live_rows(self) -> Dict[str, int]:
+        """
+        Returns the row of every document that is not tombstoned, by URL.
+        """
+        deleted = set(self.deleted.tolist())
+        return {url: row for row, url in enumerate(self.urls) if row not in deleted}
+
+    @property
+    def deleted_ratio(self) -> float:
+        return len(self.deleted) / len(self.urls) if self.urls else 0.0
+
+    def __len__(self) -> int:
+        return len(self.urls) - len(self.deleted)
+
+
+def build_document_index(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer],
+                         documents: Dict[str, str], ann_config: Optional[AnnConfig] = None,
+                         n_jobs: Optional[int] = None,
+                         versions: Optional[Dict[str, str]] = None,
+                         vector_cache: Optional["VectorCache"] = None) -> DocumentIndex:
+    """
+    Transforms the cleaned `documents` (URL to text) once, in `n_jobs` processes if given, precomputes their row norms
+    and, given `ann_config`, builds an approximate nearest-neighbour index over them. `versions` are the revisions
+    of the documents, see `diff_document_index`. Documents found in `vector_cache` are not transformed again.
+    """
+    vectors = as_csr(parallel_transform(vectorizer, list(documents.values()), n_jobs, vector_cache=vector_cache))
+    ann = build_ann_index(ann_config, vectors) if ann_config is not None else None
+    return DocumentIndex(list(documents.keys()), vectors, row_norms(vectors), row_norms(vectors, ord=1),
+                         vectorizer_fingerprint(vectorizer), ann,
+                         [(versions or {}).get(url) for url in documents])
+
+
+def diff_document_index(index: DocumentIndex, versions: Dict[str, Optional[str]]) -> IndexDiff:
+    """
+    Compares the documents of the index with the current `versions` of the corpus (URL to revision, None where
+    unknown). Documents whose stored or current revision is unknown count as changed.
+
+    Returns:
+        IndexDiff: URLs missing from the index, URLs indexed from another revision, and indexed URLs missing from
+        `versions`.
+    """
+    rows = index.live_rows()
+    added = [url for url in versions if url not in rows]
+    changed = [url for url, version in versions.items()
+               if url in rows and (version is None or index.versions[rows[url]] != version)]
+    removed = [url for url in rows if url not in versions]
+    return IndexDiff(added, changed, removed)
+
+
+def update_document_index(index: DocumentIndex,
+                          vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer],
+                          documents: Dict[str, str], versions: Optional[Dict[str, str]] = None,
+                          removed: Iterable[str] = (), n_jobs: Optional[int] = None,
+                          vector_cache: Optional["VectorCache"] = None) -> DocumentIndex:
+    """
+    Returns a new index with the cleaned `documents` (URL to text) transformed and appended, and with the rows of
+    `removed` URLs and the previous rows of re-indexed `documents` tombstoned. Only the new documents are
+    transformed; the ANN index, if any, is rebuilt over all rows with its stored config.
+
+    Raises:
+        IndexMismatch: When the index was built with another vectorizer.
+    """
+    if index.vectorizer_fingerprint != vectorizer_fingerprint(vectorizer):
+        raise IndexMismatch("Document index was built with a different vectorizer.")
+    rows = index.live_rows()
+    deleted = set(index.deleted.tolist())
+    deleted.update(rows[url] for url in removed if url in rows)
+    deleted.update(rows[url] for url in documents if url in rows)
+    if not documents:
+        return DocumentIndex(index.urls, index.vectors, index.l2_norms, index.l1_norms,
+                             index.vectorizer_fingerprint, index.ann, index.versions, deleted)
+
+    new_vectors = as_csr(parallel_transform(vectorizer, list(documents.values()), n_jobs,
+                                            vector_cache=vector_cache))
+    vectors = as_csr(vstack([index.vectors, new_vectors], format='csr'))
+    ann = build_ann_index(index.ann.config, vectors) if index.ann is not None else None
+    return DocumentIndex(index.urls + list(documents.keys()), vectors,
+                         np.concatenate([index.l2_norms, row_norms(new_vectors)]),
+                         np.concatenate([index.l1_norms, row_norms(new_vectors, ord=1)]),
+                         index.vectorizer_fingerprint, ann,
+                         index.versions + [(versions or {}).get(url) for url in documents], deleted)
+
+
+def compact_document_index(index: DocumentIndex) -> DocumentIndex:
+    """
+    Returns the index without its tombstoned rows, rebuilding the ANN index over the remaining ones.
+    """
+    keep = np.setdiff1d(np.arange(len(index.urls)), index.deleted)
+    vectors = as_csr(index.vectors[keep])
+    ann = build_ann_index(index.ann.config, vectors) if index.ann is not None else None
+    return DocumentIndex([index.urls[row] for row in keep], vectors, np.asarray(index.l2_norms)[keep],
+                         np.asarray(index.l1_norms)[keep], index.vectorizer_fingerprint, ann,
+                         [index.versions[row] for row in keep])
+
+
+def save_document_index(index: DocumentIndex, index_dir: str):
+    """
+    Saves the CSR arrays and the norms of the index as raw `.npy` files, so they can be memory-mapped on load.
+
+    Saving over an existing index writes the files of a new generation next to the current one and then replaces
+    the metadata file, which names the generation, in one atomic rename: readers see either the old or the new
+    index, never a mix. The previous generation is kept for processes still reading it, older ones are removed.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    previous = _current_generation(index_dir)
+    generation = previous + 1 if previous is not None else 0
+    arrays = {
+        "data": index.vectors.data,
+        "indices": index.vectors.indices,
+        "indptr": index.vectors.indptr,
+        "l2_norms": index.l2_norms,
+        "l1_norms": index.l1_norms,
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(index_dir, _generation_name(ARRAY_FILE_NAMES[name], generation)),
+                np.ascontiguousarray(array))
+    metadata = {
+        "version": INDEX_FORMAT_VERSION,
+        "generation": generation,
+        "vectorizer_fingerprint": index.vectorizer_fingerprint,
+        "shape": list(index.vectors.shape),
+        "urls": index.urls,
+        "versions": index.versions,
+        "deleted": index.deleted.tolist(),
+        "ann": index.ann is not None,
+    }
+    if index.ann is not None:
+        index.ann.save(os.path.join(index_dir, _generation_name(ANN_DIR_NAME, generation)))
+    metadata_path = os.path.join(index_dir, METADATA_FILE_NAME)
+    with open(metadata_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    os.replace(metadata_path + ".tmp", metadata_path)
+    _remove_generations(index_dir, keep={generation, previous})
+
+
+def load_document_index(index_dir: str,
+                        vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer, None] = None,
+                        mmap: bool = True) -> DocumentIndex:
+    """
+    Loads a document index saved with `save_document_index`.
+
+    Args:
+        index_dir (str): Directory of the saved index.
+        vectorizer: Vectorizer the queries will be transformed with. When given, the index is refused unless it
+            was built with the same vectorizer.
+        mmap (bool): Memory-map the arrays read-only instead of reading them into memory, so loading takes the
+            same time for any corpus size and concurrent processes share the page cache.
+
+    Returns:
+        DocumentIndex: The loaded index.
+    """
+    with open(os.path.join(index_dir, METADATA_FILE_NAME), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    if metadata.get("version") not in SUPPORTED_INDEX_FORMAT_VERSIONS:
+        raise IndexMismatch(f"Unsupported document index version: {metadata.get('version')}")
+    if vectorizer is not None and metadata["vectorizer_fingerprint"] != vectorizer_fingerprint(vectorizer):
+        raise IndexMismatch(f"Document index {index_dir} was built with a different vectorizer.")
+
+    generation = metadata.get("generation", 0)
+    arrays = {name: np.load(os.path.join(index_dir, _generation_name(file_name, generation)),
+                            mmap_mode='r' if mmap else None)
+              for name, file_name in ARRAY_FILE_NAMES.items()}
+    vectors = csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(metadata["shape"]),
+                         copy=False)
+    ann_dir = os.path.join(index_dir, _generation_name(ANN_DIR_NAME, generation))
+    ann = load_ann_index(ann_dir, mmap) if metadata.get("ann", os.path.isdir(ann_dir)) else None
+    return DocumentIndex(metadata["urls"], vectors, arrays["l2_norms"], arrays["l1_norms"],
+                         metadata["vectorizer_fingerprint"], ann, metadata.get("versions"),
+                         metadata.get("deleted", ()))
+
+
+def document_index_exists(index_dir: str) -> bool:
+    return os.path.isfile(os.path.join(index_dir, METADATA_FILE_NAME))
+
+
+def _generation_name(file_name: str, generation: int) -> str:
+    # generation 0 keeps the plain names of the indexes saved before generations existed
+    if generation == 0:
+        return file_name
+    stem, extension = os.path.splitext(file_name)
+    return f"{stem}.{generation}{extension}"
+
+
+def _current_generation(index_dir: str) -> Optional[int]:
+    if not document_index_exists(index_dir):
+        return None
+    with open(os.path.join(index_dir, METADATA_FILE_NAME), 'r', encoding='utf-8') as f:
+        return json.load(f).get("generation", 0)
+
+
+def _remove_generations(index_dir: str, keep: set):
+    for name in os.listdir(index_dir):
+        match = GENERATION_FILE_PATTERN.match(name)
+        if match is None or int(match.group(1) or match.group(2) or 0) in keep:
+            continue
+        path = os.path.join(index_dir, name)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            # still open in another process on platforms that refuse to delete open files
+            pass
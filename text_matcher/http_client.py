@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from text_matcher.profiling import profile_count
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host so that at most `requests_per_second` are started per host.
+    """
+
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HttpClient:
+    """
+    Fetch engine sharing one keep-alive `requests.Session` between a bounded pool of worker threads.
+
+    Requests are rate limited per host and retried with exponential backoff on 429/5xx responses and connection
+    errors. `map` runs a function over many items concurrently and returns the results in input order.
+    """
+
+    def __init__(self, concurrency: int = 1, requests_per_second: Optional[float] = None, max_retries: int = 3,
+                 backoff_factor: float = 0.5, timeout: float = 30):
+        if concurrency < 1:
+            raise ValueError("Concurrency must be at least 1.")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.requests = 0
+        self.retries = 0
+        self._counter_lock = threading.Lock()
+        self._rate_limiter = HostRateLimiter(requests_per_second)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, params: Optional[dict] = None) -> requests.Response:
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            self._rate_limiter.wait(host)
+            self._count(requests=1)
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= self.max_retries):
+                return response
+            self._count(retries=1)
+            profile_count("fetch", retries=1)
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def map(self, func: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        if self.concurrency == 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(func, items))
+
+    def close(self):
+        self.session.close()
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * 2 ** attempt
+
+    def _count(self, requests: int = 0, retries: int = 0):
+        with self._counter_lock:
+            self.requests += requests
+            self.retries += retries
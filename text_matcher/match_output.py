@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from typing import Dict, List, Tuple
+
+OUTPUT_FORMATS = ("text", "json", "jsonl", "csv")
+STREAMING_OUTPUT_FORMATS = ("text", "jsonl", "csv")
+CSV_HEADER = ("query", "rank", "url", "score")
+
+
+def format_matches(matches: Dict[str, List[Tuple[str, float]]], output_format: str) -> str:
+    """
+    Formats the (url, score) matches of every query as text, a JSON object, JSON lines or CSV rows with a header.
+    """
+    if output_format == "json":
+        return json.dumps({query: [{"url": url, "score": score} for url, score in query_matches]
+                           for query, query_matches in matches.items()}, ensure_ascii=False, indent=2)
+    lines = format_match_lines(matches, output_format)
+    if output_format == "csv":
+        lines = [format_csv_row(CSV_HEADER)] + lines
+    return "\n".join(lines)
+
+
+def format_match_lines(matches: Dict[str, List[Tuple[str, float]]], output_format: str,
+                       best_only: bool = False) -> List[str]:
+    """
+    Formats the matches of every query as self-contained output lines, so results can be written chunk by chunk.
+
+    Args:
+        matches (Dict[str, List[Tuple[str, float]]]): (url, score) matches of every query, closest first.
+        output_format (str): One of `STREAMING_OUTPUT_FORMATS`.
+        best_only (bool): In text format, print only the best match of every query without its score. Queries
+            without any match, e.g. from an approximate search, get a "No match" line.
+
+    Returns:
+        List[str]: Output lines without line terminators.
+    """
+    lines = []
+    for query, query_matches in matches.items():
+        match output_format:
+            case "jsonl":
+                lines.append(json.dumps({"query": query,
+                                         "matches": [{"url": url, "score": score} for url, score in query_matches]},
+                                        ensure_ascii=False))
+            case "csv":
+                lines.extend(format_csv_row((query, rank, url, score))
+                             for rank, (url, score) in enumerate(query_matches, start=1))
+            case "text" if best_only and not query_matches:
+                lines.append(f"No match for {query}")
+            case "text" if best_only:
+                lines.append(f"Best match for {query} is: {query_matches[0][0]}")
+            case "text":
+                lines.append(f"Top {len(query_matches)} matches for {query}:")
+                lines.extend(f"  {rank}. {url} ({score:.4f})"
+                             for rank, (url, score) in enumerate(query_matches, start=1))
+            case _:
+                raise ValueError(f"Unsupported output format: {output_format}. "
+                                 f"Choose from {', '.join(STREAMING_OUTPUT_FORMATS)}.")
+    return lines
+
+
+def format_csv_row(values) -> str:
+    output = io.StringIO()
+    csv.writer(output, lineterminator="").writerow(values)
+    return output.getvalue()
@@ -0,0 +1,165 @@
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer, TfidfTransformer
+
+from text_matcher.vectorizer_config import CountVectorizerConfig, TfidfVectorizerConfig, HashingVectorizerConfig
+
+MODEL_FORMAT_VERSION = 1
+# saved models are uncompressed `.npz` archives, legacy models are pickles
+ZIP_MAGIC = b"PK\x03\x04"
+TERM_SEPARATOR = "\n"
+VECTORIZER_TYPES = {
+    "count": (CountVectorizer, CountVectorizerConfig),
+    "tfidf": (TfidfVectorizer, TfidfVectorizerConfig),
+    "hashing": (HashingVectorizer, HashingVectorizerConfig),
+}
+
+
+def is_compact_model(model_file: str) -> bool:
+    with open(model_file, 'rb') as f:
+        return f.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+def save_compact_model(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer], model_file: str,
+                       fingerprint: Optional[str] = None):
+    """
+    Saves a vectorizer without pickle, as an uncompressed `.npz` archive of plain arrays:
+
+    - `model`: the vectorizer type and parameters as UTF-8 JSON, the value dtype by name, and the `fingerprint` of
+      the vectorizer when given, so loading does not have to hash the whole vocabulary again.
+    - `terms`: the vocabulary as a string table, the UTF-8 text of all terms in column order separated by newlines.
+      Only when a term contains a newline itself, `term_offsets` holds the character offsets of the terms instead.
+    - `idf`: the idf weights of a TF-IDF vectorizer, in its value dtype.
+
+    Only the parameters of the vectorizer configs can be saved, a vectorizer with any other parameter changed
+    (e.g. a custom tokenizer) is refused. The file is written next to `model_file` and then renamed, so an existing
+    model is never left half-written.
+    """
+    vectorizer_type = _vectorizer_type(vectorizer)
+    vectorizer_class, config_class = VECTORIZER_TYPES[vectorizer_type]
+    params = vectorizer.get_params()
+    defaults = vectorizer_class().get_params()
+    for name, value in params.items():
+        if name not in config_class.model_fields and value != defaults[name]:
+            raise ValueError(f"Parameter {name} of the vectorizer cannot be saved in the compact model format.")
+    model = {
+        "version": MODEL_FORMAT_VERSION,
+        "vectorizer_type": vectorizer_type,
+        "params": model_params(vectorizer),
+    }
+    if fingerprint is not None:
+        model["fingerprint"] = fingerprint
+    arrays = {"model": encode_text(json.dumps(model, ensure_ascii=False))}
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is not None:
+        arrays.update(encode_terms(sorted(vocabulary, key=vocabulary.__getitem__)))
+    if isinstance(vectorizer, TfidfVectorizer) and vectorizer.use_idf and hasattr(vectorizer, "idf_"):
+        arrays["idf"] = np.asarray(vectorizer.idf_)
+
+    with open(f"{model_file}.tmp", 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(f"{model_file}.tmp", model_file)
+
+
+def load_compact_model(model_file: str) -> Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]:
+    """
+    Loads a vectorizer saved with `save_compact_model`. Nothing in the file is executed: the vectorizer is built
+    from its parameters and gets its vocabulary and idf weights back from the arrays. A stored fingerprint is kept
+    as the `fingerprint_` attribute of the vectorizer.
+    """
+    with np.load(model_file, allow_pickle=False) as arrays:
+        model = json.loads(decode_text(arrays["model"]))
+        if model.get("version") != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version: {model.get('version')}")
+        if model.get("vectorizer_type") not in VECTORIZER_TYPES:
+            raise ValueError(f"Unsupported vectorizer type: {model.get('vectorizer_type')}")
+        vectorizer_class, config_class = VECTORIZER_TYPES[model["vectorizer_type"]]
+        params = model["params"]
+        unsupported = sorted(set(params) - set(config_class.model_fields))
+        if unsupported:
+            raise ValueError(f"Unsupported vectorizer parameters: {', '.join(unsupported)}")
+        if params.get("ngram_range") is not None:
+            params["ngram_range"] = tuple(params["ngram_range"])
+        if params.get("dtype") is not None:
+            params["dtype"] = np.dtype(params["dtype"]).type
+        max_terms_per_document = params.pop("max_terms_per_document", None)
+        vectorizer = vectorizer_class(**params)
+        vectorizer.max_terms_per_document = max_terms_per_document
+        if model.get("fingerprint") is not None:
+            vectorizer.fingerprint_ = model["fingerprint"]
+
+        if "terms" in arrays:
+            terms = decode_terms(arrays)
+            vectorizer.vocabulary_ = dict(zip(terms, range(len(terms))))
+            vectorizer.fixed_vocabulary_ = False
+            if isinstance(vectorizer, TfidfVectorizer):
+                idf = arrays["idf"] if "idf" in arrays else None
+                vectorizer._tfidf = build_tfidf_transformer(vectorizer, len(vectorizer.vocabulary_), idf)
+    return vectorizer
+
+
+def build_tfidf_transformer(vectorizer: TfidfVectorizer, n_features: int,
+                            idf: Optional[np.ndarray] = None) -> TfidfTransformer:
+    """
+    Builds the fitted transformer a TF-IDF vectorizer keeps its idf weights in, from the weights alone.
+    """
+    # fitting the transformer on a row of ones only marks it fitted, the idf weights are set afterwards
+    transformer = TfidfTransformer(norm=vectorizer.norm, use_idf=vectorizer.use_idf,
+                                   smooth_idf=vectorizer.smooth_idf, sublinear_tf=vectorizer.sublinear_tf)
+    transformer.fit(csr_matrix(np.ones((1, n_features))))
+    if vectorizer.use_idf:
+        transformer.idf_ = idf
+    return transformer
+
+
+def model_params(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]) -> dict:
+    """
+    Returns the config parameters of a vectorizer as JSON values, the value dtype by name.
+    """
+    _, config_class = VECTORIZER_TYPES[_vectorizer_type(vectorizer)]
+    params = vectorizer.get_params()
+    params["dtype"] = np.dtype(params["dtype"]).name
+    params["max_terms_per_document"] = getattr(vectorizer, "max_terms_per_document", None)
+    return {name: params[name] for name in config_class.model_fields}
+
+
+def encode_terms(terms: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Encodes terms as a string table: the `terms` array holds their UTF-8 text separated by newlines, or, when a term
+    contains a newline itself, concatenated with their character offsets in `term_offsets`.
+    """
+    if any(TERM_SEPARATOR in term for term in terms):
+        return {"terms": encode_text("".join(terms)),
+                "term_offsets": np.cumsum([0] + [len(term) for term in terms], dtype=np.int64)}
+    return {"terms": encode_text(TERM_SEPARATOR.join(terms))}
+
+
+def decode_terms(arrays) -> List[str]:
+    """
+    Decodes the string table of `encode_terms` from `arrays`, e.g. an opened `.npz` archive.
+    """
+    text = decode_text(arrays["terms"])
+    if "term_offsets" in arrays:
+        offsets = arrays["term_offsets"].tolist()
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+    return text.split(TERM_SEPARATOR) if text else []
+
+
+def encode_text(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+
+def decode_text(array: np.ndarray) -> str:
+    return array.tobytes().decode("utf-8")
+
+
+def _vectorizer_type(vectorizer) -> str:
+    for vectorizer_type, (vectorizer_class, _) in VECTORIZER_TYPES.items():
+        if type(vectorizer) is vectorizer_class:
+            return vectorizer_type
+    raise ValueError(f"Unsupported vectorizer type: {type(vectorizer).__name__}")
+
@@ -0,0 +1,89 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.profiling import profile_stage, profile_count
+from text_matcher.similarity import prune_rows, compact_indices
+
+if TYPE_CHECKING:
+    from text_matcher.vector_cache import VectorCache
+
+# below this many documents per worker starting the pool costs more than tokenizing on one core
+MIN_SHARD_SIZE = 256
+# shards per worker, so a slow shard does not leave the other workers idle at the end
+SHARDS_PER_JOB = 4
+
+_worker_vectorizer = None
+
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Number of worker processes for `n_jobs`: None means 1, and -1 means one per CPU.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(f"Number of jobs must be at least 1 or -1 for all CPUs, got {n_jobs}.")
+    return n_jobs
+
+
+def parallel_transform(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer], documents: List[str],
+                       n_jobs: Optional[int] = None, shard_size: Optional[int] = None,
+                       vector_cache: Optional["VectorCache"] = None) -> csr_matrix:
+    """
+    Transforms `documents` in a pool of `n_jobs` processes: the documents are split into contiguous shards, every
+    worker transforms whole shards and the shard matrices are stacked back in order, so the result equals
+    `vectorizer.transform(documents)` (pruned, see below).
+
+    The vectorizer is handed to every worker once when the pool starts (inherited without pickling where processes
+    are forked), not with every shard; only the document texts and the shard matrices cross process boundaries.
+    Inputs too small to give every worker `MIN_SHARD_SIZE` documents are transformed in the calling process.
+    Rows are pruned to the `max_terms_per_document` largest weights of the vectorizer, if it sets them, and the
+    indices are stored as int32 whenever they fit.
+
+    Args:
+        vectorizer (Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]): Fitted or hashing vectorizer.
+        documents (List[str]): Texts to transform.
+        n_jobs (Optional[int]): Number of worker processes, -1 for one per CPU, None for no pool.
+        shard_size (Optional[int]): Documents per shard, by default enough for `SHARDS_PER_JOB` shards per worker.
+        vector_cache (Optional[VectorCache]): Cache of vectors; only the documents missing from it are transformed.
+
+    Returns:
+        csr_matrix: Vectors of `documents`, one row per document.
+    """
+    with profile_stage("transform"):
+        if vector_cache is not None:
+            vectors = vector_cache.transform(vectorizer, documents,
+                                             lambda missing: _transform(vectorizer, missing, n_jobs, shard_size))
+        else:
+            vectors = _transform(vectorizer, documents, n_jobs, shard_size)
+    profile_count("transform", documents=len(documents), nnz=vectors.nnz)
+    return vectors
+
+
+def _transform(vectorizer, documents: List[str], n_jobs: Optional[int], shard_size: Optional[int]) -> csr_matrix:
+    n_jobs = min(resolve_n_jobs(n_jobs), math.ceil(len(documents) / MIN_SHARD_SIZE))
+    if n_jobs <= 1:
+        vectors = csr_matrix(vectorizer.transform(documents))
+    else:
+        if shard_size is None:
+            shard_size = math.ceil(len(documents) / (n_jobs * SHARDS_PER_JOB))
+        shards = [documents[start:start + shard_size] for start in range(0, len(documents), shard_size)]
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(vectorizer,)) as pool:
+            vectors = csr_matrix(vstack(list(pool.map(_transform_shard, shards)), format='csr'))
+    return compact_indices(prune_rows(vectors, getattr(vectorizer, "max_terms_per_document", None)))
+
+
+def _init_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def _transform_shard(documents: List[str]) -> csr_matrix:
+    return csr_matrix(_worker_vectorizer.transform(documents))
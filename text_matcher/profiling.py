@@ -0,0 +1,194 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_active_profiler: Optional["Profiler"] = None
+
+
+class StageStats:
+    """
+    Totals of one pipeline stage: the number of calls, the seconds spent in them, the counters recorded for the
+    stage and the peak resident memory of the process when the stage last finished.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_rss_bytes: Optional[int] = None
+        self.counters: Counter = Counter()
+
+    def to_dict(self) -> dict:
+        return {"calls": self.calls, "seconds": self.seconds, "peak_rss_bytes": self.peak_rss_bytes,
+                **self.counters}
+
+
+class Profiler:
+    """
+    Records per-stage timings and counters of the pipeline while it is active, see `profiling`.
+
+    Stages may run in several threads at once (e.g. concurrent downloads), their seconds are then summed over the
+    threads and can exceed the wall time. With `profile_dir` set, every stage is also profiled with cProfile in the
+    thread that created the profiler, only the outermost stage when stages nest, and `dump_profiles` writes one
+    `<stage>.prof` file per stage.
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None):
+        self.profile_dir = profile_dir
+        self.stages: Dict[str, StageStats] = {}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._thread = threading.get_ident()
+        self._profiling = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        profile = self._start_profile(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._profiling.active = False
+            peak = peak_rss_bytes()
+            with self._lock:
+                stats = self._stats(name)
+                stats.calls += 1
+                stats.seconds += seconds
+                stats.peak_rss_bytes = peak
+
+    def count(self, name: str, **counters: int):
+        with self._lock:
+            self._stats(name).counters.update(counters)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def trace(self) -> dict:
+        with self._lock:
+            stages = {name: stats.to_dict() for name, stats in self.stages.items()}
+        return {"wall_seconds": self.wall_seconds, "peak_rss_bytes": peak_rss_bytes(), "stages": stages}
+
+    def summary(self) -> str:
+        """
+        Formats the stages, in the order they first ran, as a table for humans.
+        """
+        trace = self.trace()
+        wall = trace["wall_seconds"]
+        lines = [f"{'stage':<12} {'calls':>7} {'seconds':>9} {'share':>7}  counters"]
+        for name, stats in trace["stages"].items():
+            counters = " ".join(f"{key}={value}" for key, value in stats.items()
+                                if key not in ("calls", "seconds", "peak_rss_bytes"))
+            share = stats["seconds"] / wall if wall else 0.0
+            lines.append(f"{name:<12} {stats['calls']:>7} {stats['seconds']:>9.3f} {share:>7.1%}  {counters}")
+        peak = trace["peak_rss_bytes"]
+        lines.append(f"wall {wall:.3f} s" + (f", peak RSS {peak / 2 ** 20:.1f} MiB" if peak is not None else ""))
+        return "\n".join(lines)
+
+    def save_trace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.trace(), f, indent=2)
+
+    def dump_profiles(self):
+        if self.profile_dir is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+
+    def _stats(self, name: str) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats()
+        return self.stages[name]
+
+    def _start_profile(self, name: str) -> Optional[cProfile.Profile]:
+        if self.profile_dir is None or threading.get_ident() != self._thread:
+            return None
+        if getattr(self._profiling, "active", False):
+            return None
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        self._profiling.active = True
+        profile.enable()
+        return profile
+
+
+def activate_profiler(profiler: Profiler) -> Profiler:
+    """
+    Makes `profiler` record the stages of the pipeline until `deactivate_profiler` is called.
+    """
+    global _active_profiler
+    _active_profiler = profiler
+    return profiler
+
+
+def deactivate_profiler():
+    global _active_profiler
+    if _active_profiler is not None:
+        _active_profiler.finish()
+    _active_profiler = None
+
+
+@contextmanager
+def profiling(profiler: Optional[Profiler] = None) -> Iterator[Profiler]:
+    """
+    Records the stages of the pipeline run inside the block:
+
+        with profiling() as profiler:
+            load_vectorizer_and_pick_best(...)
+        print(profiler.summary())
+    """
+    profiler = activate_profiler(profiler or Profiler())
+    try:
+        yield profiler
+    finally:
+        deactivate_profiler()
+
+
+def is_profiling() -> bool:
+    return _active_profiler is not None
+
+
+def profile_stage(name: str):
+    """
+    Times the block as a call of stage `name` of the active profiler, doing nothing when profiling is off.
+    """
+    profiler = _active_profiler
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def profile_count(name: str, **counters: int):
+    """
+    Adds `counters` to stage `name` of the active profiler, doing nothing when profiling is off.
+    """
+    profiler = _active_profiler
+    if profiler is not None:
+        profiler.count(name, **counters)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Returns the peak resident memory of the process so far, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
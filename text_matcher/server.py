@@ -0,0 +1,312 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.core import load_or_fetch_document_index, pick_top_k_matches
+from text_matcher.document_index import DocumentIndex, IndexMismatch
+from text_matcher.http_client import HttpClient
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import load_vectorizer, get_distance_function
+from text_matcher.wikipedia_connector import get_wikipedia_core_texts_contents
+
+# latencies kept per endpoint for the percentiles reported by /metrics
+LATENCY_WINDOW = 1024
+MAX_QUERIES_PER_REQUEST = 1000
+MAX_REQUEST_BYTES = 16 * 2 ** 20
+
+
+class BadRequest(Exception):
+    """
+    Exception raised for a match request that is malformed or asks for unsupported options.
+    """
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ServedModel(NamedTuple):
+    vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]
+    index: DocumentIndex
+    vectorizer_path: str
+    index_dir: Optional[str]
+    loaded_at: float
+
+
+class RequestMetrics:
+    """
+    Request counts, error counts and latencies of the most recent `LATENCY_WINDOW` requests of every endpoint.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._queries = 0
+        self._latencies: Dict[str, deque] = {}
+
+    def record(self, endpoint: str, seconds: float, error: bool = False, queries: int = 0):
+        with self._lock:
+            self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+            if error:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+            self._queries += queries
+            self._latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for endpoint, count in self._requests.items():
+                latencies_ms = np.array(self._latencies[endpoint]) * 1000
+                p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]).tolist()
+                endpoints[endpoint] = {
+                    "requests": count,
+                    "errors": self._errors.get(endpoint, 0),
+                    "latency_ms": {"mean": latencies_ms.mean().item(), "p50": p50, "p95": p95, "p99": p99,
+                                   "max": latencies_ms.max().item()},
+                }
+            return {"queries": self._queries, "endpoints": endpoints}
+
+
+class MatchService:
+    """
+    Keeps a vectorizer and its document index in memory and answers match requests against them.
+
+    `reload` loads the model again next to the one being served and swaps it in with a single assignment: requests
+    already running finish on the model they started with, and no request ever waits for a reload. The vectorizer and
+    index are always loaded from the paths the service was started with, and pickled models are refused.
+    """
+    def __init__(self, vectorizer_path: str, test_file: str, index_dir: Optional[str] = None,
+                 distance_metric: str = "cosine", cache: Optional[ArticleCache] = None,
+                 client: Optional[HttpClient] = None, batch_size: int = 1,
+                 vector_cache: Optional[VectorCache] = None):
+        get_distance_function(distance_metric)
+        self.test_file = test_file
+        self.distance_metric = distance_metric
+        self.cache = cache
+        self.client = client
+        self.batch_size = batch_size
+        self.vector_cache = vector_cache
+        self.metrics = RequestMetrics()
+        self._reload_lock = threading.Lock()
+        self.model = self._load(vectorizer_path, index_dir)
+
+    def reload(self) -> ServedModel:
+        """
+        Loads the vectorizer and index again from their paths, e.g. after `index --update` saved a new generation of
+        the index, and starts serving them. Raises `IndexMismatch` and keeps the current model if the index was built
+        with another vectorizer.
+        """
+        with self._reload_lock:
+            current = self.model
+            model = self._load(current.vectorizer_path, current.index_dir)
+            self.model = model
+            return model
+
+    def match(self, queries: List[Dict[str, str]], k: int = 1, distance_metric: Optional[str] = None,
+              exact: bool = False) -> List[Dict[str, Any]]:
+        """
+        Matches every query, a `{"url": ...}` article or a `{"text": ...}` raw text, against the served index.
+
+        Returns:
+            List[Dict[str, Any]]: For every query its `query` (URL or text) and its `matches`, closest first, or an
+            `error` if its article was not found.
+        """
+        model = self.model
+        distance_metric = distance_metric or self.distance_metric
+        urls = [query["url"] for query in queries if "url" in query]
+        fetched = get_wikipedia_core_texts_contents(urls, cache=self.cache, client=self.client,
+                                                    batch_size=self.batch_size) if urls else {}
+        texts = [query["text"] if "text" in query else fetched.get(query["url"]) for query in queries]
+        found = [text for text in texts if text is not None]
+        matches = iter(pick_top_k_matches(model.vectorizer, model.index, found, distance_metric, k, exact,
+                                          vector_cache=self.vector_cache) if found else [])
+
+        results = []
+        for query, text in zip(queries, texts):
+            result = {"query": query.get("url", query.get("text"))}
+            if text is None:
+                result["error"] = f"Article not found: {query['url']}"
+            else:
+                result["matches"] = [{"url": url, "score": score} for url, score in next(matches)]
+            results.append(result)
+        return results
+
+    def status(self) -> Dict[str, Any]:
+        model = self.model
+        return {"documents": len(model.index), "vectorizer_path": model.vectorizer_path,
+                "index_dir": model.index_dir, "loaded_at": model.loaded_at}
+
+    def _load(self, vectorizer_path: str, index_dir: Optional[str]) -> ServedModel:
+        vectorizer = load_vectorizer(vectorizer_path)
+        index = load_or_fetch_document_index(vectorizer, self.test_file, index_dir, cache=self.cache,
+                                             client=self.client, batch_size=self.batch_size,
+                                             vector_cache=self.vector_cache)
+        return ServedModel(vectorizer, index, vectorizer_path, index_dir, time.time())
+
+
+def parse_match_request(body: Dict[str, Any]) -> tuple[List[Dict[str, str]], bool, int, Optional[str], bool]:
+    """
+    Validates the JSON body of a match request: a single `{"url": ...}` or `{"text": ...}` query, or a batch of them
+    under `queries`, with optional `k`, `distance_metric` and `exact`.
+
+    Returns:
+        tuple: The queries, whether they were a batch, k, the distance metric and exact.
+    """
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object.")
+    batch = "queries" in body
+    queries = body["queries"] if batch else [{key: body[key] for key in ("url", "text") if key in body}]
+    if not isinstance(queries, list) or not queries:
+        raise BadRequest("queries must be a non-empty list.")
+    if len(queries) > MAX_QUERIES_PER_REQUEST:
+        raise BadRequest(f"At most {MAX_QUERIES_PER_REQUEST} queries are allowed per request.")
+    for query in queries:
+        if (not isinstance(query, dict) or len(query.keys() & {"url", "text"}) != 1
+                or not isinstance(query.get("url", query.get("text")), str)):
+            raise BadRequest('Every query must have either a "url" or a "text" string.')
+    k = body.get("k", 1)
+    if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+        raise BadRequest("k must be an integer of at least 1.")
+    distance_metric = body.get("distance_metric")
+    if distance_metric is not None:
+        try:
+            get_distance_function(distance_metric)
+        except (ValueError, AttributeError):
+            raise BadRequest(f"Unsupported distance metric: {distance_metric}.")
+    exact = body.get("exact", False)
+    if not isinstance(exact, bool):
+        raise BadRequest("exact must be a boolean.")
+    return queries, batch, k, distance_metric, exact
+
+
+class MatchRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of a `MatchService`:
+
+    - `POST /match`: match a single query or a batch of `queries`, see `parse_match_request`.
+    - `POST /reload`: load the model again from the paths the server was started with, the body is empty.
+    - `GET /metrics`: request counts and latency percentiles per endpoint.
+    - `GET /health`: the served model.
+    """
+    service: MatchService
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        match self.path:
+            case "/health":
+                self._respond("health", lambda: (HTTPStatus.OK, self.service.status()))
+            case "/metrics":
+                self._respond("metrics", lambda: (HTTPStatus.OK, self.service.metrics.snapshot()))
+            case _:
+                self._respond("unknown", lambda: (HTTPStatus.NOT_FOUND, {"error": f"Not found: {self.path}"}))
+
+    def do_POST(self):
+        match self.path:
+            case "/match":
+                self._respond("match", self._match)
+            case "/reload":
+                self._respond("reload", self._reload)
+            case _:
+                self._respond("unknown", lambda: (HTTPStatus.NOT_FOUND, {"error": f"Not found: {self.path}"}))
+
+    def _match(self):
+        queries, batch, k, distance_metric, exact = parse_match_request(self._read_json())
+        self._queries = len(queries)
+        results = self.service.match(queries, k, distance_metric, exact)
+        return HTTPStatus.OK, ({"results": results} if batch else results[0])
+
+    def _reload(self):
+        # clients cannot choose what the server loads, so any path in the body is refused
+        body = self._read_json() if self._content_length() else {}
+        if body not in ({}, None):
+            raise BadRequest("Reload takes no parameters, it loads the model and index the server was started with.")
+        try:
+            self.service.reload()
+        except IndexMismatch as e:
+            return HTTPStatus.CONFLICT, {"error": e.message}
+        except (FileNotFoundError, ValueError) as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Cannot load the model: {e}"}
+        return HTTPStatus.OK, self.service.status()
+
+    def _respond(self, endpoint: str, handle):
+        start = time.perf_counter()
+        self._queries = 0
+        try:
+            status, payload = handle()
+        except BadRequest as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": e.message}
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        # recorded before the response is sent, so a client reading /metrics next sees its own request
+        self.service.metrics.record(endpoint, time.perf_counter() - start, error=status >= 400,
+                                    queries=self._queries)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status >= 400:
+            # the request body may not have been read, so the connection cannot be reused
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_length(self) -> int:
+        try:
+            return int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise BadRequest("Invalid Content-Length header.")
+
+    def _read_json(self) -> Any:
+        length = self._content_length()
+        if length > MAX_REQUEST_BYTES:
+            raise BadRequest(f"Request body is larger than {MAX_REQUEST_BYTES} bytes.")
+        try:
+            return json.loads(self.rfile.read(length))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise BadRequest("Request body is not valid JSON.")
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        # requests are counted in /metrics instead of being logged to stderr
+        pass
+
+
+class UnixThreadingHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        # a stale socket of a previous server is replaced, anything else at the path is kept
+        if os.path.lexists(self.server_address):
+            if not stat.S_ISSOCK(os.lstat(self.server_address).st_mode):
+                raise FileExistsError(f"Cannot listen on {self.server_address}: the path exists and is not a socket.")
+            os.remove(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def build_server(service: MatchService, host: str = "127.0.0.1", port: int = 8000,
+                 unix_socket: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    Builds a threaded HTTP server answering the requests of `MatchRequestHandler` on `host`:`port`, or on the
+    `unix_socket` path if given. Call `serve_forever` to start it.
+    """
+    handler = type("BoundMatchRequestHandler", (MatchRequestHandler,), {"service": service})
+    if unix_socket is not None:
+        return UnixThreadingHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,244 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse
+
+# a tile of 1024 x 4096 scores takes 32 MB in float64, the most any scoring thread holds at once; tiles of a few
+# thousand documents also keep the product in cache better than one call over the whole corpus
+QUERY_BLOCK_SIZE = 1024
+DOCUMENT_BLOCK_SIZE = 4096
+
+
+def as_csr(vecs: Union[csr_matrix, np.ndarray]) -> csr_matrix:
+    """
+    Converts a vector or a matrix of vectors to a canonical CSR matrix with a floating point dtype.
+    """
+    if not issparse(vecs):
+        vecs = np.atleast_2d(np.asarray(vecs))
+    vecs = csr_matrix(vecs)
+    if not np.issubdtype(vecs.dtype, np.floating):
+        vecs = vecs.astype(np.float64)
+    vecs.sum_duplicates()
+    return vecs
+
+
+def row_norms(vecs: csr_matrix, ord: int = 2) -> np.ndarray:
+    """
+    Computes the L1 (`ord=1`) or L2 (`ord=2`) norm of every row without densifying the matrix.
+    """
+    vecs = as_csr(vecs)
+    if ord == 1:
+        values = np.abs(vecs.data)
+    elif ord == 2:
+        values = vecs.data ** 2
+    else:
+        raise ValueError(f"Unsupported norm order: {ord}. Choose from 1, 2.")
+    rows = np.repeat(np.arange(vecs.shape[0]), np.diff(vecs.indptr))
+    norms = np.bincount(rows, weights=values, minlength=vecs.shape[0])
+    return np.sqrt(norms) if ord == 2 else norms
+
+
+def prune_rows(vecs: csr_matrix, max_terms: Optional[int]) -> csr_matrix:
+    """
+    Keeps only the `max_terms` entries of every row with the largest absolute values (ties broken by the lower
+    column index), in their original order. The kept values are not rescaled.
+    """
+    vecs = csr_matrix(vecs)
+    lengths = np.diff(vecs.indptr)
+    if max_terms is None or not vecs.nnz or lengths.max() <= max_terms:
+        return vecs
+    rows = np.repeat(np.arange(vecs.shape[0]), lengths)
+    # entries ordered by row, then by decreasing weight, so the rank of an entry is its offset from the row start
+    order = np.lexsort((vecs.indices, -np.abs(vecs.data), rows))
+    ranks = np.arange(vecs.nnz) - vecs.indptr[rows]
+    keep = np.sort(order[ranks < max_terms])
+    indptr = np.zeros_like(vecs.indptr)
+    np.cumsum(np.minimum(lengths, max_terms), out=indptr[1:])
+    return csr_matrix((vecs.data[keep], vecs.indices[keep], indptr), shape=vecs.shape)
+
+
+def compact_indices(vecs: csr_matrix) -> csr_matrix:
+    """
+    Stores the column indices and row pointers of `vecs` as int32 whenever they fit, which halves their memory
+    compared to the int64 arrays large matrices get.
+    """
+    limit = np.iinfo(np.int32).max
+    if vecs.indices.dtype != np.int32 and max(vecs.nnz, vecs.shape[1]) <= limit:
+        vecs = csr_matrix((vecs.data, vecs.indices.astype(np.int32), vecs.indptr.astype(np.int32)),
+                          shape=vecs.shape)
+    return vecs
+
+
+def cosine_similarity(x: csr_matrix, y: csr_matrix, y_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Computes the cosine similarity between every row of `x` and every row of `y` with one sparse product.
+
+    Args:
+        x (csr_matrix): Matrix of query vectors.
+        y (csr_matrix): Matrix of document vectors.
+        y_norms (Optional[np.ndarray]): Precomputed L2 norms of the rows of `y`.
+
+    Returns:
+        np.ndarray: Dense matrix of shape (x rows, y rows). Rows with zero norm have zero similarity.
+    """
+    x, y = as_csr(x), as_csr(y)
+    x_norms = row_norms(x)
+    y_norms = row_norms(y) if y_norms is None else y_norms
+    similarities = (x @ y.T).toarray()
+    similarities /= np.where(x_norms == 0, 1, x_norms)[:, np.newaxis]
+    similarities /= np.where(y_norms == 0, 1, y_norms)[np.newaxis, :]
+    return similarities
+
+
+def euclidean_distances(x: csr_matrix, y: csr_matrix, y_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Computes the euclidean distance between every row of `x` and every row of `y` as
+    sqrt(|x|^2 - 2 x.y + |y|^2) with one sparse product.
+
+    Args:
+        x (csr_matrix): Matrix of query vectors.
+        y (csr_matrix): Matrix of document vectors.
+        y_norms (Optional[np.ndarray]): Precomputed L2 norms of the rows of `y`.
+
+    Returns:
+        np.ndarray: Dense matrix of shape (x rows, y rows).
+    """
+    x, y = as_csr(x), as_csr(y)
+    x_norms = row_norms(x)
+    y_norms = row_norms(y) if y_norms is None else y_norms
+    distances = (x @ y.T).toarray()
+    distances *= -2
+    distances += (x_norms ** 2)[:, np.newaxis]
+    distances += (y_norms ** 2)[np.newaxis, :]
+    np.maximum(distances, 0, out=distances)
+    return np.sqrt(distances, out=distances)
+
+
+def manhattan_distances(x: csr_matrix, y: csr_matrix, y_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Computes the manhattan distance between every row of `x` and every row of `y` as
+    |x|_1 + |y|_1 - sum(|x_i| + |y_i| - |x_i - y_i|) over the terms shared by both rows, so only the
+    columns of `y` where a query row is non-zero are visited.
+
+    Args:
+        x (csr_matrix): Matrix of query vectors.
+        y (csr_matrix): Matrix of document vectors.
+        y_norms (Optional[np.ndarray]): Precomputed L1 norms of the rows of `y`.
+
+    Returns:
+        np.ndarray: Dense matrix of shape (x rows, y rows).
+    """
+    x, y = as_csr(x), as_csr(y)
+    x_norms = row_norms(x, ord=1)
+    y_norms = row_norms(y, ord=1) if y_norms is None else y_norms
+    y_columns = y.tocsc()
+    distances = np.empty((x.shape[0], y.shape[0]), dtype=np.result_type(x.dtype, y.dtype))
+    for row in range(x.shape[0]):
+        start, end = x.indptr[row], x.indptr[row + 1]
+        shared = y_columns[:, x.indices[start:end]]
+        query_values = np.repeat(x.data[start:end], np.diff(shared.indptr))
+        overlap = np.abs(query_values) + np.abs(shared.data) - np.abs(query_values - shared.data)
+        distances[row] = x_norms[row] + y_norms - np.bincount(shared.indices, weights=overlap,
+                                                              minlength=y.shape[0])
+    return distances
+
+
+def top_k(scores: np.ndarray, k: int, largest: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Selects the `k` best scores of every row with `np.argpartition`, which is O(columns) per row, and sorts only
+    the selected ones, best first (ties broken by the lower column index).
+
+    Args:
+        scores (np.ndarray): Matrix of scores, one row per query.
+        k (int): Number of scores to select per row, capped at the number of columns.
+        largest (bool): Select the largest scores (similarities) instead of the smallest ones (distances).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Column indices and scores of the selection, both of shape (rows, k).
+    """
+    scores = np.atleast_2d(scores)
+    k = max(0, min(k, scores.shape[1]))
+    keys = -scores if largest else scores
+    if k == 1:
+        candidates = np.argmin(keys, axis=1)[:, np.newaxis]
+    elif k < scores.shape[1]:
+        candidates = np.argpartition(keys, k - 1, axis=1)[:, :k] if k else np.empty((scores.shape[0], 0), int)
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.lexsort((candidates, np.take_along_axis(keys, candidates, axis=1)))
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+
+def blocked_top_k(distance_func: Callable[..., np.ndarray], x: csr_matrix, y: csr_matrix, k: int, largest: bool,
+                  y_norms: Optional[np.ndarray] = None, n_threads: int = 1,
+                  query_block_size: int = QUERY_BLOCK_SIZE,
+                  document_block_size: int = DOCUMENT_BLOCK_SIZE,
+                  exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Selects the `k` best scores of every row of `x` against `y` without building the whole score matrix: the
+    queries and documents are cut into tiles of `query_block_size` x `document_block_size`, every tile is scored with
+    `distance_func` and reduced to its own top `k` right away, and the tiles of a query block are merged into a
+    running top `k`. Memory holds at most one dense tile per thread, plus `k` candidates per query and document block.
+
+    Tiles are scored by `n_threads` threads; the sparse products and most of the numpy work release the GIL.
+    The selection equals `top_k` over the whole score matrix, apart from the order of scores tied at the k-th place.
+
+    Args:
+        distance_func (Callable[..., np.ndarray]): Scoring function, e.g. `cosine_similarity`.
+        x (csr_matrix): Matrix of query vectors.
+        y (csr_matrix): Matrix of document vectors.
+        k (int): Number of documents to select per query, capped at the number of documents.
+        largest (bool): Select the largest scores (similarities) instead of the smallest ones (distances).
+        y_norms (Optional[np.ndarray]): Precomputed norms of the rows of `y` for `distance_func`.
+        n_threads (int): Number of threads scoring tiles.
+        query_block_size (int): Queries per tile.
+        document_block_size (int): Documents per tile.
+        exclude (Optional[np.ndarray]): Boolean mask of the rows of `y` never to select, e.g. deleted documents.
+            Their scores are set to the worst possible value in every tile before its top `k` is selected.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Document indices and scores of the selection, both of shape (queries, k),
+        with `k` capped at the number of rows of `y` that are not excluded.
+    """
+    x, y = as_csr(x), as_csr(y)
+    excluded = int(np.count_nonzero(exclude)) if exclude is not None else 0
+    k = max(0, min(k, y.shape[0] - excluded))
+    query_blocks = [x[start:start + query_block_size] for start in range(0, x.shape[0], query_block_size)]
+    document_starts = list(range(0, y.shape[0], document_block_size))
+    if not query_blocks or not document_starts or not k:
+        return (np.empty((x.shape[0], k), dtype=np.intp),
+                np.empty((x.shape[0], k), dtype=np.result_type(x.dtype, y.dtype)))
+
+    def score_tile(tile: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        block, start = tile
+        end = start + document_block_size
+        norms = y_norms[start:end] if y_norms is not None else None
+        scores = distance_func(query_blocks[block], y[start:end], y_norms=norms)
+        if excluded:
+            scores[:, exclude[start:end]] = -np.inf if largest else np.inf
+        indices, scores = top_k(scores, k, largest)
+        return indices + start, scores
+
+    tiles = [(block, start) for block in range(len(query_blocks)) for start in document_starts]
+    if n_threads > 1 and len(tiles) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_threads, len(tiles))) as pool:
+            results = list(_merge_tiles(pool.map(score_tile, tiles), len(document_starts), k, largest))
+    else:
+        results = list(_merge_tiles(map(score_tile, tiles), len(document_starts), k, largest))
+    return np.concatenate([indices for indices, _ in results]), np.concatenate([scores for _, scores in results])
+
+
+def _merge_tiles(tiles, tiles_per_block: int, k: int, largest: bool):
+    # tiles arrive in order, every query block covered by `tiles_per_block` consecutive ones
+    best = None
+    for position, (indices, scores) in enumerate(tiles):
+        if best is not None:
+            indices, scores = np.concatenate([best[0], indices], axis=1), np.concatenate([best[1], scores], axis=1)
+            order = np.lexsort((indices, -scores if largest else scores))[:, :k]
+            indices, scores = np.take_along_axis(indices, order, axis=1), np.take_along_axis(scores, order, axis=1)
+        best = indices, scores
+        if (position + 1) % tiles_per_block == 0:
+            yield best
+            best = None
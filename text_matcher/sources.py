@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sys
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+
+# `url` and `urls` are Wikipedia articles fetched over the network, the other sources are read locally
+SOURCE_TYPES = ("url", "urls", "file", "directory", "jsonl", "stdin", "text")
+WIKIPEDIA_SOURCE_TYPES = ("url", "urls")
+STDIN = "-"
+TEXT_FILE_SUFFIXES = (".txt",)
+
+
+def is_valid_url(url) -> bool:
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except ValueError:
+        return False
+
+
+def chunked(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def iter_data(file_path: str) -> Iterator[str]:
+    """
+    Reads the URLs of a data file lazily, one line at a time.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            yield line.strip()
+
+
+def detect_source_type(source: str) -> str:
+    """
+    Guesses the type of a query or document source:
+
+    - `stdin`: `-`, JSONL records read from standard input.
+    - `url`: a single Wikipedia article URL.
+    - `directory`: a directory, every `.txt` file under it is a document.
+    - `jsonl`: a `.jsonl` file of `{"id": ..., "text": ...}` records.
+    - `urls`: a `.csv` file, or a file whose first line is a URL, with one Wikipedia article URL per line.
+    - `file`: any other file, a single text document.
+
+    Raw `text` sources are never guessed, they have to be requested explicitly.
+    """
+    if source == STDIN:
+        return "stdin"
+    if is_valid_url(source):
+        return "url"
+    if os.path.isdir(source):
+        return "directory"
+    if os.path.isfile(source):
+        if source.endswith(".jsonl"):
+            return "jsonl"
+        if source.endswith(".csv") or _starts_with_url(source):
+            return "urls"
+        return "file"
+    raise ValueError(f"Not a valid URL, file or directory: {source}")
+
+
+def check_source_type(source_type: str):
+    if source_type not in SOURCE_TYPES:
+        raise ValueError(f"Unsupported source type: {source_type}. Choose from {', '.join(SOURCE_TYPES)}.")
+
+
+def iter_local_documents(source: str, source_type: str) -> Iterator[Tuple[str, str]]:
+    """
+    Reads the (key, text) documents of a local source lazily, without any network access. Keys are file paths for
+    files and directories, the `id` (or `url`) of JSONL records, and the text itself for raw text.
+    """
+    match source_type:
+        case "file":
+            yield source, _read_text(source)
+        case "directory":
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for file_name in sorted(files):
+                    if file_name.endswith(TEXT_FILE_SUFFIXES):
+                        path = os.path.join(root, file_name)
+                        yield path, _read_text(path)
+        case "jsonl":
+            with open(source, 'r', encoding='utf-8') as file:
+                yield from _iter_jsonl_records(file, source)
+        case "stdin":
+            yield from _iter_jsonl_records(sys.stdin, "<stdin>")
+        case "text":
+            yield source, source
+        case _:
+            check_source_type(source_type)
+            raise ValueError(f"{source_type} sources are not local.")
+
+
+def load_local_documents(source: str, source_type: str) -> Dict[str, str]:
+    return dict(iter_local_documents(source, source_type))
+
+
+def text_version(text: str) -> str:
+    """
+    Returns a version of a local document: the hash of its content, which changes whenever the text does.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def iter_document_chunks(source: str, source_type: Optional[str], chunk_size: int,
+                         fetch_urls: Callable[[List[str]], Dict[str, str]],
+                         skip: int = 0) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Reads any source in chunks of `chunk_size` entries after the first `skip` ones. Wikipedia URLs are fetched with
+    `fetch_urls` a chunk at a time, skipping missing articles.
+
+    Returns:
+        Iterator[Tuple[int, Dict[str, str]]]: For every chunk the number of entries it consumed and its documents.
+    """
+    source_type = source_type or detect_source_type(source)
+    match source_type:
+        case "url" | "urls":
+            urls = iter([source]) if source_type == "url" else iter_data(source)
+            for chunk in chunked(islice(urls, skip, None), chunk_size):
+                yield len(chunk), fetch_urls(chunk)
+        case _:
+            for chunk in chunked(islice(iter_local_documents(source, source_type), skip, None), chunk_size):
+                yield len(chunk), dict(chunk)
+
+
+def checkpoint_path(output_path: str) -> str:
+    """
+    Returns the path of the checkpoint a resumable run over the chunks of a source keeps next to `output_path`.
+    """
+    return f"{output_path}.checkpoint"
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def _iter_jsonl_records(lines: Iterable[str], name: str) -> Iterator[Tuple[str, str]]:
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f"{name}:{line_number}: not a JSON record.")
+        if not isinstance(record, dict) or not isinstance(record.get("text"), str):
+            raise ValueError(f'{name}:{line_number}: JSONL records need a "text" string.')
+        key = record.get("id", record.get("url", f"{name}:{line_number}"))
+        yield str(key), record["text"]
+
+
+def _starts_with_url(path: str) -> bool:
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            if line.strip():
+                return is_valid_url(line.strip())
+    return False
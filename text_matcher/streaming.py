@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+from typing import List, Optional
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.core import load_or_fetch_document_index, pick_top_k_matches
+from text_matcher.http_client import HttpClient
+from text_matcher.match_output import CSV_HEADER, STREAMING_OUTPUT_FORMATS, format_csv_row, format_match_lines
+from text_matcher.sources import checkpoint_path, iter_document_chunks
+from text_matcher.vector_cache import VectorCache
+from text_matcher.vectorizer import load_vectorizer
+from text_matcher.wikipedia_connector import get_wikipedia_core_texts_contents
+
+
+def stream_matches(distance_metric: str, query_file: str, test_file: str, vectorizer_path: str, chunk_size: int,
+                   output_path: Optional[str] = None, k: Optional[int] = None, output_format: str = "text",
+                   resume: bool = False, cache: Optional[ArticleCache] = None, client: Optional[HttpClient] = None,
+                   batch_size: int = 1, index_dir: Optional[str] = None, exact: bool = False,
+                   n_jobs: Optional[int] = None, query_source_type: Optional[str] = None,
+                   vector_cache: Optional[VectorCache] = None) -> int:
+    """
+    Matches a query source of any size in fixed-size chunks: queries are read lazily, and every chunk is fetched (or
+    read from disk), transformed, scored and written before the next one is read, so memory is bounded by
+    `chunk_size`.
+
+    After every chunk written to `output_path` the number of completed queries and the output size are stored in a
+    checkpoint file next to it, so an interrupted run restarted with `resume` continues after the last completed
+    chunk.
+
+    Args:
+        distance_metric (str): The distance metric to use ('cosine', 'euclidean', 'manhattan').
+        query_file (str): Query source, by default a file with one query URL per line.
+        test_file (str): Document source, ignored when `index_dir` is given.
+        vectorizer_path (str): Path to the saved vectorizer model.
+        chunk_size (int): Number of queries processed at once.
+        output_path (Optional[str]): File to write the results to, or None for standard output (not resumable).
+        k (Optional[int]): Number of matches per query, or None for the best match only.
+        output_format (str): One of `STREAMING_OUTPUT_FORMATS`.
+        resume (bool): Continue from the checkpoint of a previous run writing to `output_path`.
+        exact (bool): Score all documents even if the index has an ANN backend.
+        n_jobs (Optional[int]): Number of processes transforming the documents and every chunk of queries.
+        query_source_type (Optional[str]): One of `SOURCE_TYPES`, detected from `query_file` if None.
+        vector_cache (Optional[VectorCache]): Cache of vectors, so documents and queries seen before are not
+            transformed again.
+
+    Returns:
+        int: Number of queries completed in total, including the ones of a resumed run.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1.")
+    if output_format not in STREAMING_OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported streaming output format: {output_format}. "
+                         f"Choose from {', '.join(STREAMING_OUTPUT_FORMATS)}.")
+    if resume and output_path is None:
+        raise ValueError("Resuming requires an output file.")
+
+    vectorizer = load_vectorizer(vectorizer_path)
+    index = load_or_fetch_document_index(vectorizer, test_file, index_dir, cache=cache, client=client,
+                                         batch_size=batch_size, n_jobs=n_jobs, vector_cache=vector_cache)
+
+    def fetch(urls: List[str]):
+        return get_wikipedia_core_texts_contents(urls, cache=cache, client=client, batch_size=batch_size)
+
+    completed, output_bytes = _read_checkpoint(output_path) if resume else (0, 0)
+    output = _open_output(output_path, output_bytes)
+    try:
+        if output_bytes == 0 and output_format == "csv":
+            _write_lines(output, [format_csv_row(CSV_HEADER)])
+        for consumed, query_texts in iter_document_chunks(query_file, query_source_type, chunk_size, fetch,
+                                                          skip=completed):
+            matches = pick_top_k_matches(vectorizer, index, list(query_texts.values()), distance_metric, k or 1,
+                                         exact, n_jobs, vector_cache)
+            _write_lines(output, format_match_lines(dict(zip(query_texts.keys(), matches)), output_format,
+                                                    best_only=k is None))
+            completed += consumed
+            if output_path is not None:
+                _write_checkpoint(output_path, completed, output.tell())
+    finally:
+        if output_path is not None:
+            output.close()
+    return completed
+
+
+def _open_output(output_path: Optional[str], output_bytes: int):
+    if output_path is None:
+        return sys.stdout
+    output = open(output_path, 'a+' if output_bytes else 'w', encoding='utf-8', newline='')
+    if output_bytes:
+        # drop the lines of a chunk that was written but not checkpointed before the run was interrupted
+        output.truncate(output_bytes)
+        output.seek(output_bytes)
+    return output
+
+
+def _write_lines(output, lines: List[str]):
+    output.write("".join(f"{line}\n" for line in lines))
+    output.flush()
+    if output is not sys.stdout:
+        os.fsync(output.fileno())
+
+
+def _read_checkpoint(output_path: str) -> tuple[int, int]:
+    try:
+        with open(checkpoint_path(output_path), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return 0, 0
+    return checkpoint["completed_queries"], checkpoint["output_bytes"]
+
+
+def _write_checkpoint(output_path: str, completed: int, output_bytes: int):
+    path = checkpoint_path(output_path)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({"completed_queries": completed, "output_bytes": output_bytes}, f)
+    os.replace(f"{path}.tmp", path)
@@ -0,0 +1,223 @@
+import json
+import os
+from collections import Counter
+from numbers import Integral
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.article_cache import ArticleCache
+from text_matcher.http_client import HttpClient
+from text_matcher.model_format import build_tfidf_transformer, model_params, encode_terms, decode_terms, \
+    encode_text, decode_text
+from text_matcher.sources import checkpoint_path, iter_document_chunks
+from text_matcher.vectorizer import build_vectorizer, save_vectorizer
+from text_matcher.vectorizer_config import VectorizerConfig
+from text_matcher.wikipedia_connector import get_wikipedia_core_texts_contents
+
+
+class VocabularyCounts:
+    """
+    Document frequencies, and term frequencies if `count_terms` is set, of the terms seen so far.
+
+    With `max_terms` set the table never holds more terms: when it grows past `max_terms`, the terms with the lowest
+    document frequencies are pruned until at most half of `max_terms` remain, so the cost of pruning is spread over
+    many documents. A pruned term that appears again is counted from zero, so the frequencies of a pruned table are
+    lower bounds; without pruning they are exact.
+    """
+    def __init__(self, max_terms: Optional[int] = None, count_terms: bool = False):
+        if max_terms is not None and max_terms < 1:
+            raise ValueError("Maximum number of terms must be at least 1.")
+        self.max_terms = max_terms
+        self.count_terms = count_terms
+        self.n_documents = 0
+        self.document_frequencies: Counter = Counter()
+        self.term_frequencies: Counter = Counter()
+
+    def update(self, analyzer, documents: Iterable[str]):
+        for document in documents:
+            terms = analyzer(document)
+            self.document_frequencies.update(set(terms))
+            if self.count_terms:
+                self.term_frequencies.update(terms)
+            self.n_documents += 1
+            if self.max_terms is not None and len(self.document_frequencies) > self.max_terms:
+                self.prune()
+
+    def prune(self):
+        # drop every term up to the lowest document frequency that leaves at most half of max_terms
+        histogram = Counter(self.document_frequencies.values())
+        remaining = len(self.document_frequencies)
+        threshold = 0
+        while remaining > self.max_terms // 2:
+            threshold += 1
+            remaining -= histogram[threshold]
+        rare_terms = [term for term, frequency in self.document_frequencies.items() if frequency <= threshold]
+        for term in rare_terms:
+            del self.document_frequencies[term]
+            self.term_frequencies.pop(term, None)
+
+
+def train_vectorizer_streaming(vectorizer_config: VectorizerConfig, documents: Iterable[str],
+                               max_terms: Optional[int] = None) -> Union[CountVectorizer, TfidfVectorizer,
+                                                                         HashingVectorizer]:
+    """
+    Trains a vectorizer reading `documents` once, one at a time, so they can come from a generator of any length.
+    Only the vocabulary counts are kept in memory, at most `max_terms` of them if given (see `VocabularyCounts`).
+
+    Without pruning the vocabulary and idf weights equal the ones of `train_vectorizer`, except that terms tied at the
+    `max_features` cut-off are kept in alphabetical order. A hashing vectorizer has nothing to learn and does not
+    read `documents` at all.
+    """
+    vectorizer = build_vectorizer(vectorizer_config)
+    if isinstance(vectorizer, HashingVectorizer):
+        return vectorizer.fit([])
+    counts = new_vocabulary_counts(vectorizer, max_terms)
+    counts.update(vectorizer.build_analyzer(), documents)
+    return fit_vocabulary_counts(vectorizer, counts)
+
+
+def stream_train_and_save_vectorizer(output_model_path: str, train_file: str, vectorizer_config: VectorizerConfig,
+                                     chunk_size: int, max_terms: Optional[int] = None, resume: bool = False,
+                                     cache: Optional[ArticleCache] = None, client: Optional[HttpClient] = None,
+                                     batch_size: int = 1, source_type: Optional[str] = None) -> int:
+    """
+    Trains a vectorizer on a training source of any size: training URLs (or local documents) are read lazily, and
+    every chunk of `chunk_size` articles is fetched and counted before the next one is read, so memory is bounded
+    by `chunk_size` and the vocabulary counts.
+
+    After every chunk the counts are stored in a checkpoint file next to `output_model_path`, so an interrupted run
+    restarted with `resume` continues after the last counted chunk. The checkpoint is removed once the model is saved.
+
+    Args:
+        output_model_path (str): Path to save the model to.
+        train_file (str): Training source, by default a file with one training URL per line.
+        vectorizer_config (VectorizerConfig): Configuration of the vectorizer.
+        chunk_size (int): Number of articles fetched at once.
+        max_terms (Optional[int]): Maximum number of terms counted at once, unlimited if None.
+        resume (bool): Continue from the checkpoint of a previous run saving to `output_model_path`.
+        source_type (Optional[str]): One of `SOURCE_TYPES`, detected from `train_file` if None.
+
+    Returns:
+        int: Number of articles the vectorizer was trained on, including the ones of a resumed run.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be at least 1.")
+    vectorizer = build_vectorizer(vectorizer_config)
+    if isinstance(vectorizer, HashingVectorizer):
+        save_vectorizer(vectorizer.fit([]), output_model_path)
+        return 0
+
+    path = checkpoint_path(output_model_path)
+    # pruning of the vectors does not change the counts, so it may differ between the runs
+    params = {name: value for name, value in model_params(vectorizer).items() if name != "max_terms_per_document"}
+    completed, counts = _read_checkpoint(path, params) if resume else (0, None)
+    if counts is None:
+        counts = new_vocabulary_counts(vectorizer, max_terms)
+    counts.max_terms = max_terms
+    analyzer = vectorizer.build_analyzer()
+
+    def fetch(urls: List[str]):
+        return get_wikipedia_core_texts_contents(urls, cache=cache, client=client, batch_size=batch_size)
+
+    for consumed, documents in iter_document_chunks(train_file, source_type, chunk_size, fetch, skip=completed):
+        counts.update(analyzer, documents.values())
+        completed += consumed
+        _write_checkpoint(path, completed, params, counts)
+    save_vectorizer(fit_vocabulary_counts(vectorizer, counts), output_model_path)
+    if os.path.exists(path):
+        os.remove(path)
+    return counts.n_documents
+
+
+def new_vocabulary_counts(vectorizer: Union[CountVectorizer, TfidfVectorizer],
+                          max_terms: Optional[int] = None) -> VocabularyCounts:
+    # term frequencies only rank the terms for max_features, and equal document frequencies for binary vectorizers
+    count_terms = vectorizer.max_features is not None and not vectorizer.binary
+    return VocabularyCounts(max_terms, count_terms)
+
+
+def fit_vocabulary_counts(vectorizer: Union[CountVectorizer, TfidfVectorizer],
+                          counts: VocabularyCounts) -> Union[CountVectorizer, TfidfVectorizer]:
+    """
+    Sets the vocabulary, and the idf weights of a TF-IDF vectorizer, from `counts`, applying `min_df`, `max_df`
+    and `max_features` the way `fit` does.
+    """
+    terms = sorted(counts.document_frequencies)
+    if not terms:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    document_frequencies = np.fromiter((counts.document_frequencies[term] for term in terms), dtype=np.int64,
+                                       count=len(terms))
+
+    max_df, min_df, max_features = vectorizer.max_df, vectorizer.min_df, vectorizer.max_features
+    max_doc_count = max_df if isinstance(max_df, Integral) else max_df * counts.n_documents
+    min_doc_count = min_df if isinstance(min_df, Integral) else min_df * counts.n_documents
+    if max_doc_count < min_doc_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+    kept = np.flatnonzero((document_frequencies <= max_doc_count) & (document_frequencies >= min_doc_count))
+    if max_features is not None and len(kept) > max_features:
+        if counts.count_terms:
+            term_frequencies = np.fromiter((counts.term_frequencies[terms[i]] for i in kept), dtype=np.int64,
+                                           count=len(kept))
+        else:
+            term_frequencies = document_frequencies[kept]
+        kept = np.sort(kept[np.argsort(-term_frequencies, kind='stable')[:max_features]])
+    if len(kept) == 0:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    vectorizer.vocabulary_ = {terms[i]: column for column, i in enumerate(kept.tolist())}
+    vectorizer.fixed_vocabulary_ = False
+    if isinstance(vectorizer, TfidfVectorizer):
+        vectorizer._tfidf = build_tfidf_transformer(vectorizer, len(kept),
+                                                    _idf(vectorizer, document_frequencies[kept], counts.n_documents))
+    return vectorizer
+
+
+def _idf(vectorizer: TfidfVectorizer, document_frequencies: np.ndarray, n_documents: int) -> np.ndarray:
+    # computed from the counts exactly as TfidfTransformer.fit computes them, in the float dtype of the vectors
+    dtype = vectorizer.dtype if vectorizer.dtype in (np.float64, np.float32) else np.float64
+    df = document_frequencies.astype(dtype) + float(vectorizer.smooth_idf)
+    n_samples = n_documents + int(vectorizer.smooth_idf)
+    return np.log(n_samples / df) + 1.0
+
+
+def _read_checkpoint(path: str, params: dict) -> tuple[int, Optional[VocabularyCounts]]:
+    try:
+        arrays = np.load(path, allow_pickle=False)
+    except FileNotFoundError:
+        return 0, None
+    with arrays:
+        checkpoint = json.loads(decode_text(arrays["checkpoint"]))
+        if checkpoint["params"] != json.loads(json.dumps(params)):
+            raise ValueError(f"Checkpoint {path} was written for different vectorizer parameters.")
+        counts = VocabularyCounts(checkpoint["max_terms"], checkpoint["count_terms"])
+        counts.n_documents = checkpoint["n_documents"]
+        terms = decode_terms(arrays)
+        counts.document_frequencies = Counter(dict(zip(terms, arrays["document_frequencies"].tolist())))
+        if counts.count_terms:
+            counts.term_frequencies = Counter(dict(zip(terms, arrays["term_frequencies"].tolist())))
+    return checkpoint["completed_urls"], counts
+
+
+def _write_checkpoint(path: str, completed: int, params: dict, counts: VocabularyCounts):
+    """
+    Writes the counts as an `.npz` archive of plain arrays, loaded back without pickle: the counted terms as a
+    string table (see `encode_terms`), their document and term frequencies, and the progress, the vectorizer
+    parameters and the settings of the counts as UTF-8 JSON.
+    """
+    terms = list(counts.document_frequencies)
+    checkpoint = {"completed_urls": completed, "params": params, "n_documents": counts.n_documents,
+                  "max_terms": counts.max_terms, "count_terms": counts.count_terms}
+    arrays = {
+        "checkpoint": encode_text(json.dumps(checkpoint, ensure_ascii=False)),
+        **encode_terms(terms),
+        "document_frequencies": np.fromiter(counts.document_frequencies.values(), dtype=np.int64,
+                                            count=len(terms)),
+    }
+    if counts.count_terms:
+        arrays["term_frequencies"] = np.fromiter((counts.term_frequencies[term] for term in terms), dtype=np.int64,
+                                                 count=len(terms))
+    with open(f"{path}.tmp", 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(f"{path}.tmp", path)
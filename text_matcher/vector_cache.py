@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
+
+from text_matcher.profiling import profile_count
+from text_matcher.sources import text_version
+from text_matcher.vectorizer import vectorizer_fingerprint
+
+CACHE_FILE_NAME = "vectors.sqlite3"
+# content hashes looked up with one query, below SQLite's default limit of bound parameters
+LOOKUP_BATCH_SIZE = 500
+INDEX_DTYPE = np.dtype('<i4')
+
+
+class VectorCache:
+    """
+    Persistent on-disk cache of transformed document vectors keyed by the vectorizer fingerprint and the hash of
+    the document text, so a text seen before by the same vectorizer is never tokenized again.
+
+    Every vector is stored as the raw bytes of its column indices (int32) and values, a few bytes per non-zero
+    entry. Once the stored vectors exceed `max_bytes` the least recently used ones are evicted. `hits`, `misses`
+    and `bytes_saved` (the size of the texts served from the cache instead of being tokenized) count the lookups
+    of this instance.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._fingerprints = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(cache_dir, CACHE_FILE_NAME), check_same_thread=False)
+        # every lookup commits its access times; a write-ahead log without a sync per commit keeps that cheaper
+        # than tokenizing, at the risk of losing the last entries on a power failure, which a cache can afford
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "fingerprint TEXT NOT NULL, content_hash TEXT NOT NULL, indices BLOB NOT NULL, data BLOB NOT NULL, "
+            "dtype TEXT NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (fingerprint, content_hash))")
+        self._connection.commit()
+
+    def transform(self, vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer], documents: List[str],
+                  transform: Callable[[List[str]], csr_matrix]) -> csr_matrix:
+        """
+        Returns the vectors of `documents`, serving cached ones and transforming only the others, once per distinct
+        text, with `transform` (e.g. `vectorizer.transform`). The result equals `transform(documents)`.
+        """
+        fingerprint = self.fingerprint(vectorizer)
+        hashes = [text_version(document) for document in documents]
+        rows = self.get_many(fingerprint, hashes)
+        missing = {content_hash: document for content_hash, document in zip(hashes, documents)
+                   if content_hash not in rows}
+        hits = sum(content_hash in rows for content_hash in hashes)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(documents) - hits
+            self.bytes_saved += sum(len(document.encode('utf-8')) for content_hash, document in zip(hashes, documents)
+                                    if content_hash in rows)
+        profile_count("transform", cache_hits=hits)
+
+        if missing:
+            vectors = csr_matrix(transform(list(missing.values())))
+            vectors.sort_indices()
+            new_rows = {content_hash: (vectors.indices[start:end], vectors.data[start:end])
+                        for content_hash, start, end in zip(missing, vectors.indptr[:-1], vectors.indptr[1:])}
+            self.put_many(fingerprint, new_rows)
+            rows.update(new_rows)
+
+        n_features = len(vectorizer.vocabulary_) if hasattr(vectorizer, "vocabulary_") else vectorizer.n_features
+        return _stack_rows([rows[content_hash] for content_hash in hashes], n_features, vectorizer.dtype)
+
+    def fingerprint(self, vectorizer) -> str:
+        """
+        Returns the fingerprint of `vectorizer`, computed once per vectorizer object since it hashes the whole
+        vocabulary.
+        """
+        with self._lock:
+            fingerprint = self._fingerprints.get(vectorizer)
+        if fingerprint is None:
+            fingerprint = vectorizer_fingerprint(vectorizer)
+            with self._lock:
+                self._fingerprints[vectorizer] = fingerprint
+        return fingerprint
+
+    def get_many(self, fingerprint: str, content_hashes: List[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns the cached (indices, data) of every content hash found, refreshing their last access time.
+        """
+        unique_hashes = list(dict.fromkeys(content_hashes))
+        rows = {}
+        with self._lock:
+            for start in range(0, len(unique_hashes), LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                for content_hash, indices, data, dtype in self._connection.execute(
+                        f"SELECT content_hash, indices, data, dtype FROM vectors WHERE fingerprint = ? "
+                        f"AND content_hash IN ({placeholders})", (fingerprint, *batch)):
+                    rows[content_hash] = (np.frombuffer(indices, dtype=INDEX_DTYPE), np.frombuffer(data, dtype=dtype))
+            if rows:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE vectors SET accessed_at = ? WHERE fingerprint = ? AND content_hash = ?",
+                    [(now, fingerprint, content_hash) for content_hash in rows])
+                self._connection.commit()
+        return rows
+
+    def put_many(self, fingerprint: str, rows: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        with self._lock:
+            now = time.time()
+            records = []
+            for content_hash, (indices, data) in rows.items():
+                index_bytes = np.ascontiguousarray(indices, dtype=INDEX_DTYPE).tobytes()
+                data_bytes = np.ascontiguousarray(data).tobytes()
+                records.append((fingerprint, content_hash, index_bytes, data_bytes, data.dtype.str,
+                                len(index_bytes) + len(data_bytes), now))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO vectors (fingerprint, content_hash, indices, data, dtype, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+            self._evict()
+            self._connection.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def size(self) -> int:
+        """
+        Returns the total size in bytes of the cached vectors.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM vectors").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM vectors").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._connection.execute(
+            "SELECT fingerprint, content_hash, size FROM vectors ORDER BY accessed_at ASC").fetchall()
+        for fingerprint, content_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM vectors WHERE fingerprint = ? AND content_hash = ?",
+                                     (fingerprint, content_hash))
+            total -= size
+
+
+def _stack_rows(rows: List[Tuple[np.ndarray, np.ndarray]], n_features: int, dtype) -> csr_matrix:
+    indptr = np.zeros(len(rows) + 1, dtype=INDEX_DTYPE)
+    np.cumsum([len(indices) for indices, _ in rows], out=indptr[1:])
+    indices = np.concatenate([indices for indices, _ in rows]) if rows else np.empty(0, dtype=INDEX_DTYPE)
+    data = np.concatenate([data for _, data in rows]) if rows else np.empty(0, dtype=dtype)
+    return csr_matrix((data, indices, indptr), shape=(len(rows), n_features))
@@ -1,83 +1,199 @@
+import hashlib
 import pickle
-from typing import Union, List
+from typing import TYPE_CHECKING, Union, List, Optional, Tuple
 
 import numpy as np
 from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer
-from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances, manhattan_distances
 
+from text_matcher.model_format import is_compact_model, load_compact_model, save_compact_model
+from text_matcher.parallel import parallel_transform, resolve_n_jobs
+from text_matcher.profiling import profile_stage, profile_count
+from text_matcher.similarity import as_csr, cosine_similarity, euclidean_distances, manhattan_distances, blocked_top_k
 from text_matcher.vectorizer_config import VectorizerConfig, CountVectorizerConfig, TfidfVectorizerConfig, \
     HashingVectorizerConfig
 
+if TYPE_CHECKING:
+    from text_matcher.vector_cache import VectorCache
+
 
 def train_vectorizer(vectorizer_config: VectorizerConfig, documents):
+    vectorizer = build_vectorizer(vectorizer_config)
+    vectorizer.fit(documents)
+    return vectorizer
+
+
+def build_vectorizer(vectorizer_config: VectorizerConfig) -> Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]:
+    """
+    Builds the scikit-learn vectorizer of a config. `max_terms_per_document` is not a scikit-learn parameter, it is
+    kept as an attribute of the vectorizer and applied by `parallel_transform`.
+    """
+    params = dict(vectorizer_config)
+    max_terms_per_document = params.pop("max_terms_per_document")
+    if params["dtype"] is None:
+        del params["dtype"]
+    else:
+        params["dtype"] = np.dtype(params["dtype"]).type
     match vectorizer_config:
         case CountVectorizerConfig():
-            vectorizer = CountVectorizer(**dict(vectorizer_config))
+            vectorizer = CountVectorizer(**params)
         case TfidfVectorizerConfig():
-            vectorizer = TfidfVectorizer(**dict(vectorizer_config))
+            vectorizer = TfidfVectorizer(**params)
         case HashingVectorizerConfig():
-            vectorizer = HashingVectorizer(**dict(vectorizer_config))
+            vectorizer = HashingVectorizer(**params)
         case _:
             raise ValueError("Unsupported vectorizer type.")
-
-    vectorizer.fit(documents)
+    vectorizer.max_terms_per_document = max_terms_per_document
     return vectorizer
 
 
 def transform_and_pick_best_document(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer],
                                      test_documents: List[str],
                                      query_text: str,
-                                     distance_metric: str) -> int:
+                                     distance_metric: str,
+                                     n_jobs: Optional[int] = None,
+                                     vector_cache: Optional["VectorCache"] = None) -> int:
     # todo this is a good place for data preprocess like a stemming, lemmatization, stopwords removal, lowercase, etc.
-    query_vec = vectorizer.transform([query_text]).toarray()[0]
-    test_vecs = vectorizer.transform(test_documents)
-    best_idx = pick_best_document(query_vec, test_vecs, distance_metric)
+    query_vec = parallel_transform(vectorizer, [query_text], vector_cache=vector_cache)
+    test_vecs = parallel_transform(vectorizer, test_documents, n_jobs, vector_cache=vector_cache)
+    best_idx = pick_best_document(query_vec, test_vecs, distance_metric, n_jobs=n_jobs)
     return best_idx
 
 
+def transform_and_pick_best_documents(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer],
+                                      test_documents: List[str],
+                                      query_texts: List[str],
+                                      distance_metric: str,
+                                      n_jobs: Optional[int] = None,
+                                      vector_cache: Optional["VectorCache"] = None) -> List[int]:
+    test_vecs = parallel_transform(vectorizer, test_documents, n_jobs, vector_cache=vector_cache)
+    query_vecs = parallel_transform(vectorizer, query_texts, n_jobs, vector_cache=vector_cache)
+    return pick_best_documents(query_vecs, test_vecs, distance_metric, n_jobs=n_jobs)
+
+
 def save_vectorizer(vectorizer, output_model_file):
-    with open(output_model_file, 'wb') as f:
-        pickle.dump(vectorizer, f)
+    save_compact_model(vectorizer, output_model_file, vectorizer_fingerprint(vectorizer))
+
+
+def load_vectorizer(vectorizer_model_file, allow_pickle: bool = False):
+    """
+    Loads a vectorizer saved with `save_vectorizer`.
 
+    Legacy pickled models are refused unless `allow_pickle` is set: pickle runs code from the file, so they are only
+    loaded to be converted with `convert-model`.
 
-def load_vectorizer(vectorizer_model_file):
-    with open(vectorizer_model_file, 'rb') as f:
-        return pickle.load(f)
+    Raises:
+        ValueError: When the model is pickled and `allow_pickle` is not set.
+    """
+    with profile_stage("load_model"):
+        if is_compact_model(vectorizer_model_file):
+            return load_compact_model(vectorizer_model_file)
+        if not allow_pickle:
+            raise ValueError(f"Model {vectorizer_model_file} is a legacy pickled model, which can run arbitrary code "
+                             f"when loaded. Convert it once with `convert-model {vectorizer_model_file}` and use the "
+                             f"converted model.")
+        with open(vectorizer_model_file, 'rb') as f:
+            return pickle.load(f)
+
+
+def vectorizer_fingerprint(vectorizer: Union[CountVectorizer, TfidfVectorizer, HashingVectorizer]) -> str:
+    """
+    Computes a digest of everything that affects the vectors a vectorizer produces: its type, its parameters (with
+    the pruning of `max_terms_per_document`, when set) and the fitted vocabulary and idf weights.
+
+    Hashing a large vocabulary takes a while, so vectorizers loaded from a compact model return the fingerprint
+    computed when the model was saved instead (see `save_compact_model`).
+    """
+    fingerprint = getattr(vectorizer, "fingerprint_", None)
+    if fingerprint is not None:
+        return fingerprint
+    digest = hashlib.sha256()
+    digest.update(type(vectorizer).__name__.encode())
+    digest.update(repr(sorted(vectorizer.get_params().items())).encode())
+    max_terms_per_document = getattr(vectorizer, "max_terms_per_document", None)
+    if max_terms_per_document is not None:
+        digest.update(f"max_terms_per_document={max_terms_per_document}".encode())
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is not None:
+        # `fit` leaves numpy integer columns when it limits max_features, they hash like the plain ints of other models
+        digest.update(repr(sorted((term, int(column)) for term, column in vocabulary.items())).encode())
+    idf = getattr(vectorizer, "idf_", None) if getattr(vectorizer, "use_idf", False) else None
+    if idf is not None:
+        digest.update(np.ascontiguousarray(idf).tobytes())
+    return digest.hexdigest()
 
 
 def pick_best_document(query_vec: Union[csr_matrix, np.ndarray], test_vecs: Union[csr_matrix, np.ndarray],
-                       distance_metric: str) -> int:
+                       distance_metric: str, test_norms: Optional[np.ndarray] = None,
+                       n_jobs: Optional[int] = None) -> int:
     """
     Finds the document from the test set that is closest to the query vector based on the given distance metric.
+    Sparse inputs are scored without densifying, so memory stays proportional to their non-zero entries.
 
     Args:
         query_vec (Union[np.ndarray, csr_matrix]): Vector representing the query document.
         test_vecs (Union[np.ndarray, csr_matrix]): Matrix of vectors representing the documents to search through.
         distance_metric (str): The distance metric to use ('cosine', 'euclidean', 'manhattan').
+        test_norms (Optional[np.ndarray]): Precomputed row norms of `test_vecs`, L1 for manhattan and L2 otherwise.
+        n_jobs (Optional[int]): Number of threads scoring blocks of documents, -1 for one per CPU.
 
     Returns:
         int: Index of the closest document in `test_vecs`.
     """
-    distance_func = get_distance_function(distance_metric)
+    return pick_best_documents(query_vec, test_vecs, distance_metric, test_norms, n_jobs)[0]
+
 
-    if hasattr(test_vecs, "toarray"):
-        test_vecs = test_vecs.toarray()
+def pick_best_documents(query_vecs: Union[csr_matrix, np.ndarray], test_vecs: Union[csr_matrix, np.ndarray],
+                        distance_metric: str, test_norms: Optional[np.ndarray] = None,
+                        n_jobs: Optional[int] = None) -> List[int]:
+    """
+    Finds the closest document from the test set for every query vector at once.
 
-    if hasattr(query_vec, "toarray"):
-        query_vec = query_vec.toarray()
+    Args:
+        query_vecs (Union[np.ndarray, csr_matrix]): Matrix of vectors representing the query documents.
+        test_vecs (Union[np.ndarray, csr_matrix]): Matrix of vectors representing the documents to search through.
+        distance_metric (str): The distance metric to use ('cosine', 'euclidean', 'manhattan').
+        test_norms (Optional[np.ndarray]): Precomputed row norms of `test_vecs`, L1 for manhattan and L2 otherwise.
+        n_jobs (Optional[int]): Number of threads scoring blocks of queries and documents, -1 for one per CPU.
 
-    if query_vec.ndim == 1:
-        query_vec = query_vec.reshape(1, -1)
+    Returns:
+        List[int]: Index of the closest document in `test_vecs` for every row of `query_vecs`.
+    """
+    best_indices, _ = pick_top_k_documents(query_vecs, test_vecs, distance_metric, 1, test_norms, n_jobs)
+    return best_indices[:, 0].tolist()
 
-    distances = distance_func(test_vecs, query_vec)
 
-    if distance_metric == 'cosine':
-        best_index = np.argmax(distances).item()
-    else:
-        best_index = np.argmin(distances).item()
+def pick_top_k_documents(query_vecs: Union[csr_matrix, np.ndarray], test_vecs: Union[csr_matrix, np.ndarray],
+                         distance_metric: str, k: int, test_norms: Optional[np.ndarray] = None,
+                         n_jobs: Optional[int] = None,
+                         exclude: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the `k` closest documents from the test set for every query vector. The scores are computed in tiles of
+    queries and documents that are reduced to their running top `k` right away (see `blocked_top_k`), so memory
+    stays bounded however many queries and documents are scored.
+
+    Args:
+        query_vecs (Union[np.ndarray, csr_matrix]): Matrix of vectors representing the query documents.
+        test_vecs (Union[np.ndarray, csr_matrix]): Matrix of vectors representing the documents to search through.
+        distance_metric (str): The distance metric to use ('cosine', 'euclidean', 'manhattan').
+        k (int): Number of documents to return per query.
+        test_norms (Optional[np.ndarray]): Precomputed row norms of `test_vecs`, L1 for manhattan and L2 otherwise.
+        n_jobs (Optional[int]): Number of threads scoring tiles, -1 for one per CPU, None for one.
+        exclude (Optional[np.ndarray]): Boolean mask of the rows of `test_vecs` never to return.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Indices in `test_vecs` and their similarities (cosine) or distances,
+        closest first, both of shape (queries, k), with `k` capped at the number of rows not excluded.
+    """
+    distance_func = get_distance_function(distance_metric)
+
+    with profile_stage("score"):
+        query_vecs, test_vecs = as_csr(query_vecs), as_csr(test_vecs)
+        best = blocked_top_k(distance_func, query_vecs, test_vecs, k, largest=distance_metric.lower() == 'cosine',
+                             y_norms=test_norms, n_threads=resolve_n_jobs(n_jobs), exclude=exclude)
+    profile_count("score", queries=query_vecs.shape[0], documents=test_vecs.shape[0])
 
-    return best_index
+    return best
 
 
 def get_distance_function(distance_metric: str):
@@ -1,7 +1,7 @@
 import json
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 
 class VectorizerConfig(BaseModel):
@@ -12,6 +12,10 @@ class VectorizerConfig(BaseModel):
     ngram_range: Optional[tuple[int, int]] = Field((1, 1), description="Range of n-values for n-grams.")
     analyzer: Optional[str] = Field('word', description="Type of analyzer to use. Options are 'word' or 'char'.")
     binary: Optional[bool] = Field(False, description="Whether to return a binary matrix.")
+    dtype: Optional[Literal['float32', 'float64']] = Field(None,
+                                                          description="Type of the vector values, 'float32' halves their memory. By default counts are int64 and weights float64.")
+    max_terms_per_document: Optional[int] = Field(None, ge=1,
+                                                  description="Keep only this many largest weights of every document vector.")
 
     class Config:
         extra = 'forbid'
@@ -30,6 +34,10 @@ class TfidfVectorizerConfig(VectorizerConfig):
                                        description="Whether to add one to document frequencies to smooth idf weights.")
     sublinear_tf: Optional[bool] = Field(False, description="Whether to apply sublinear tf scaling.")
     use_idf: Optional[bool] = Field(True, description="Enable inverse-document-frequency reweighting.")
+    max_df: Optional[float] = Field(1.0, description="Ignore terms with a document frequency higher than this.")
+    min_df: Optional[int] = Field(1, description="Ignore terms with a document frequency lower than this.")
+    max_features: Optional[int] = Field(None,
+                                        description="Use only the top max_features ordered by term frequency across the corpus.")
 
 
 class HashingVectorizerConfig(VectorizerConfig):
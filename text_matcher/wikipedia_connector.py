@@ -1,9 +1,21 @@
 import re
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple
 
 import requests
 
-FILTER = ["== Zobacz też ==", "== Przypisy ==", "== Linki zewnętrzne ==", "== Bibliografia =="]
+from text_matcher.article_cache import ArticleCache
+from text_matcher.http_client import HttpClient
+from text_matcher.profiling import is_profiling, profile_stage, profile_count
+
+API_URL = "https://pl.wikipedia.org/w/api.php"
+MAX_TITLES_PER_QUERY = 50
+SECTION_HEADERS = {
+    "pl": ("== Zobacz też ==", "== Przypisy ==", "== Linki zewnętrzne ==", "== Bibliografia =="),
+    "en": ("== See also ==", "== Notes ==", "== References ==", "== Further reading ==", "== External links =="),
+    "de": ("== Siehe auch ==", "== Literatur ==", "== Weblinks ==", "== Einzelnachweise ==", "== Anmerkungen =="),
+}
+FILTER = list(SECTION_HEADERS["pl"])
 
 
 class ArticleNotFound(Exception):
@@ -15,47 +27,154 @@ class ArticleNotFound(Exception):
         super().__init__(self.message)
 
 
-def get_wikipedia_core_texts_contents(urls: List[str], raise_on_error=False) -> Dict[str, str]:
-    documents = {}
-    for url in urls:
+def get_wikipedia_core_texts_contents(urls: List[str], raise_on_error=False,
+                                      cache: Optional[ArticleCache] = None,
+                                      client: Optional[HttpClient] = None,
+                                      batch_size: int = 1, headers: Sequence[str] = FILTER) -> Dict[str, str]:
+    """
+    Fetches and cleans the articles behind `urls`, skipping missing ones unless `raise_on_error` is set.
+
+    With `batch_size` above 1 up to that many titles (at most `MAX_TITLES_PER_QUERY`) are sent in one API query. The
+    API returns whole-article extracts one per response, so a batch still takes one request per article, made one
+    after another through `continue`: only the default of 1 spreads the requests over the `client` connections.
+    """
+    def fetch(url: str) -> Optional[str]:
         try:
-            text = get_wikipedia_core_text_content(url)
-            cleaned_text = remove_sections_and_clean_text(text, FILTER)
-            documents.update({url: cleaned_text})
+            return get_wikipedia_core_text_content(url, cache=cache, client=client, headers=headers)
         except ArticleNotFound:
+            return None
+
+    if batch_size > 1:
+        extracts = _fetch_wikipedia_articles_cached([get_title_from_url(url) for url in urls], batch_size, cache,
+                                                    client)
+        texts = (remove_sections_and_clean_text(text, headers) if text is not None else None
+                 for text in (extracts[get_title_from_url(url)] for url in urls))
+    else:
+        texts = client.map(fetch, urls) if client is not None else map(fetch, urls)
+
+    documents = {}
+    for url, text in zip(urls, texts):
+        if text is None:
             if raise_on_error:
                 raise ArticleNotFound(f"Article not found: {url}")
+            continue
+        documents.update({url: text})
     return documents
 
 
-def get_wikipedia_core_text_content(url: str) -> str:
-    title = _get_title_from_url(url)
-    text = _fetch_wikipedia_article(title)
-    cleaned_text = remove_sections_and_clean_text(text, FILTER)
+def get_wikipedia_core_text_content(url: str, cache: Optional[ArticleCache] = None,
+                                    client: Optional[HttpClient] = None, headers: Sequence[str] = FILTER) -> str:
+    title = get_title_from_url(url)
+    text = _fetch_wikipedia_article_cached(title, cache, client)
+    cleaned_text = remove_sections_and_clean_text(text, headers)
     return cleaned_text
 
 
-def remove_sections_and_clean_text(text: str, headers: list) -> str:
+def get_wikipedia_revisions(urls: List[str], client: Optional[HttpClient] = None,
+                            batch_size: int = MAX_TITLES_PER_QUERY) -> Dict[str, str]:
+    """
+    Fetches the current revision of the articles behind `urls` without their content, as `<revid>@<touched>`
+    strings that change whenever an article is edited or re-rendered. Missing articles are left out.
+
+    Raises:
+        ArticleNotFound: When an API query fails, so a failed query is never mistaken for removed articles.
+    """
+    titles = [get_title_from_url(url) for url in urls]
+    unique_titles = list(dict.fromkeys(titles))
+    batch_size = min(max(batch_size, 1), MAX_TITLES_PER_QUERY)
+    batches = [unique_titles[i:i + batch_size] for i in range(0, len(unique_titles), batch_size)]
+
+    def fetch(batch: List[str]) -> Dict[str, Optional[str]]:
+        return _fetch_wikipedia_revisions(batch, client)
+
+    revisions = {}
+    for batch_revisions in (client.map(fetch, batches) if client is not None else map(fetch, batches)):
+        revisions.update(batch_revisions)
+    return {url: revisions[title] for url, title in zip(urls, titles) if revisions.get(title) is not None}
+
+
+def invalidate_cached_articles(urls: List[str], cache: ArticleCache):
+    """
+    Drops the cached extracts of the articles behind `urls`, so they are downloaded again.
+    """
+    cache.invalidate(get_title_from_url(url) for url in urls)
+
+
+def remove_sections_and_clean_text(text: str, headers: Sequence[str] = FILTER) -> str:
     """
     Remove sections from the text based on header names and clean up the text.
 
+    The sections, the remaining headers and the whitespace are removed in a single pass of patterns compiled once
+    per header set. A header found in the middle of a line, which the section-by-section passes would join with
+    the following text, is handled by those passes instead, so the output is identical in every case.
+
     Args:
         text (str): The input text from which sections will be removed.
-        headers (list): List of headers to be removed, including their section format.
+        headers (Sequence[str]): Headers to be removed, including their section format, e.g. one of
+            `SECTION_HEADERS`.
 
     Returns:
         str: The cleaned text with specified sections and headers removed.
     """
-    # Remove each specified section including the header
-    for header in headers:
-        pattern = re.compile(rf"{re.escape(header)}.*?(?=^==\s|\Z)", re.DOTALL | re.MULTILINE)
-        text = re.sub(pattern, '', text)
+    with profile_stage("clean"):
+        profile_count("clean", documents=1, chars=len(text))
+        patterns = compile_section_patterns(tuple(headers))
+        if _has_mid_line_header(text, patterns):
+            for section in patterns.sections:
+                text = section.sub('', text)
+            text = HEADER_LINE_PATTERN.sub('', text)
+        else:
+            text = patterns.single_pass.sub('', text)
+        return " ".join(text.split())
 
-    # Remove any remaining headers and extra spaces/newlines
-    text = re.sub(r'^==.*?==\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\s+', ' ', text).strip()
 
-    return text
+class SectionPatterns(NamedTuple):
+    single_pass: re.Pattern
+    sections: Tuple[re.Pattern, ...]
+    any_header: Optional[re.Pattern]
+
+
+HEADER_LINE_PATTERN = re.compile(r"^==.*?==\s*", re.MULTILINE)
+
+
+@lru_cache(maxsize=None)
+def compile_section_patterns(headers: Tuple[str, ...]) -> SectionPatterns:
+    """
+    Compiles the patterns removing every section starting with one of `headers` up to the next top-level header
+    (`== ` at a line start) or the end of the text, and every other header line with the whitespace after it.
+
+    The single-pass pattern only looks for headers at line starts, which lets the regex engine skip the rest of
+    every line; texts with a header elsewhere use the per-header `sections` patterns.
+    """
+    if not headers:
+        return SectionPatterns(HEADER_LINE_PATTERN, (), None)
+    section_end = r"(?s:.*?)(?=^==\s|\Z)"
+    any_header = "|".join(re.escape(header) for header in headers)
+    return SectionPatterns(
+        re.compile(rf"^(?:(?:{any_header}){section_end}|==.*?==\s*)", re.MULTILINE),
+        tuple(re.compile(re.escape(header) + section_end, re.MULTILINE) for header in headers),
+        re.compile(any_header))
+
+
+def _has_mid_line_header(text: str, patterns: SectionPatterns) -> bool:
+    # a literal alternation is scanned much faster than one behind a lookbehind; searching again one character
+    # after every match also finds headers overlapping the previous one
+    match = patterns.any_header.search(text) if patterns.any_header is not None else None
+    while match is not None:
+        if match.start() > 0 and text[match.start() - 1] != "\n":
+            return True
+        match = patterns.any_header.search(text, match.start() + 1)
+    return False
+
+
+def section_headers(language: str) -> Tuple[str, ...]:
+    """
+    Returns the headers of the sections without article content (references, links, ...) of a Wikipedia language.
+    """
+    try:
+        return SECTION_HEADERS[language]
+    except KeyError:
+        raise ValueError(f"Unsupported Wikipedia language: {language}. Choose from {', '.join(SECTION_HEADERS)}.")
 
 
 def validate(pages: dict):
@@ -63,17 +182,198 @@ def validate(pages: dict):
         raise ArticleNotFound("Article not found")
 
 
-def _fetch_wikipedia_article(title: str) -> str:
+def _fetch_wikipedia_article_cached(title: str, cache: Optional[ArticleCache],
+                                    client: Optional[HttpClient] = None) -> str:
+    """
+    Fetches the raw extract of a Wikipedia article, serving it from `cache` when possible.
+
+    Args:
+        title (str): The title of the Wikipedia article.
+        cache (Optional[ArticleCache]): Cache of raw extracts, or None to always download.
+        client (Optional[HttpClient]): Shared HTTP client, or None to use a bare `requests.get`.
+
+    Returns:
+        str: The plain text content of the article.
+    """
+    if cache is None:
+        return _fetch_wikipedia_article(title, client)
+
+    text = cache.get(title)
+    if text is not None:
+        return text
+    if cache.offline:
+        raise ArticleNotFound(f"Article not cached and offline mode is on: {title}")
+
+    text = _fetch_wikipedia_article(title, client)
+    cache.put(title, text)
+    return text
+
+
+def _fetch_wikipedia_articles_cached(titles: List[str], batch_size: int, cache: Optional[ArticleCache],
+                                     client: Optional[HttpClient] = None) -> Dict[str, Optional[str]]:
+    """
+    Fetches the raw extracts of many Wikipedia articles in batched API queries, serving cached ones from `cache`.
+
+    Args:
+        titles (List[str]): Titles of the Wikipedia articles.
+        batch_size (int): Number of titles sent in one API query, capped at `MAX_TITLES_PER_QUERY`.
+        cache (Optional[ArticleCache]): Cache of raw extracts, or None to always download.
+        client (Optional[HttpClient]): Shared HTTP client, or None to use a bare `requests.get`.
+
+    Returns:
+        Dict[str, Optional[str]]: Extract for every title, None for missing articles and failed queries.
+    """
+    batch_size = min(batch_size, MAX_TITLES_PER_QUERY)
+    extracts = {}
+    pending = []
+    for title in dict.fromkeys(titles):
+        text = cache.get(title) if cache is not None else None
+        if text is not None or (cache is not None and cache.offline):
+            extracts[title] = text
+        else:
+            pending.append(title)
+
+    def fetch(batch: List[str]) -> Dict[str, Optional[str]]:
+        try:
+            return _fetch_wikipedia_articles(batch, client)
+        except ArticleNotFound:
+            return dict.fromkeys(batch)
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    for batch_extracts in (client.map(fetch, batches) if client is not None else map(fetch, batches)):
+        extracts.update(batch_extracts)
+        if cache is not None:
+            for title, text in batch_extracts.items():
+                if text is not None:
+                    cache.put(title, text)
+    return extracts
+
+
+def _fetch_wikipedia_articles(titles: List[str], client: Optional[HttpClient] = None) -> Dict[str, Optional[str]]:
+    """
+    Fetches the plain text content of several Wikipedia articles with one multi-title API query.
+
+    The query follows `continue` tokens until every extract is returned, and normalized or redirected titles
+    (`query.normalized`, `query.redirects`) are mapped back to the requested ones.
+
+    Args:
+        titles (List[str]): Titles of the Wikipedia articles, at most `MAX_TITLES_PER_QUERY`.
+        client (Optional[HttpClient]): Shared HTTP client, or None to use a bare `requests.get`.
+
+    Returns:
+        Dict[str, Optional[str]]: The plain text content for every requested title, None for missing articles.
+    """
+    params = extracts_query_params(titles)
+
+    get = client.get if client is not None else requests.get
+    aliases = {}
+    page_extracts = {}
+    continuation = {}
+    while True:
+        response = _profiled_get(get, {**params, **continuation})
+        if response.status_code != 200:
+            raise ArticleNotFound(f"Failed to fetch articles: {response.status_code}")
+        data = response.json()
+        collect_extracts(data, aliases, page_extracts)
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    return resolve_extracts(titles, aliases, page_extracts)
+
+
+def extracts_query_params(titles: List[str]) -> dict:
+    """
+    Returns the parameters of a multi-title `prop=extracts` API query for `titles`. Without a length limit the API
+    returns the extract of only one of them per response, the others follow through `continue`.
+    """
+    return {
+        "action": "query",
+        "prop": "extracts",
+        "format": "json",
+        "explaintext": True,
+        "exlimit": "max",
+        "redirects": True,
+        "titles": "|".join(titles)
+    }
+
+
+def collect_extracts(data: dict, aliases: Dict[str, str], page_extracts: Dict[str, str]):
+    """
+    Adds the title aliases (normalized and redirected titles) and the page extracts of one `prop=extracts` response
+    to `aliases` and `page_extracts`; `resolve_extracts` maps them back to the requested titles once all
+    continuations are read.
+    """
+    query = data.get("query", {})
+    for alias in query.get("normalized", []) + query.get("redirects", []):
+        aliases[alias["from"]] = alias["to"]
+    for page_id, page in query.get("pages", {}).items():
+        if not page_id.startswith("-") and "extract" in page:
+            page_extracts[page["title"]] = page["extract"]
+
+
+def resolve_extracts(titles: List[str], aliases: Dict[str, str],
+                     page_extracts: Dict[str, str]) -> Dict[str, Optional[str]]:
+    return {title: page_extracts.get(_resolve_title(title, aliases)) for title in titles}
+
+
+def _fetch_wikipedia_revisions(titles: List[str], client: Optional[HttpClient] = None) -> Dict[str, Optional[str]]:
+    """
+    Fetches the last revision id and the `touched` timestamp of several Wikipedia articles with one `prop=info`
+    query, mapping normalized or redirected titles back to the requested ones like `_fetch_wikipedia_articles`.
+
+    Returns:
+        Dict[str, Optional[str]]: `<revid>@<touched>` for every requested title, None for missing articles.
+    """
+    params = {
+        "action": "query",
+        "prop": "info",
+        "format": "json",
+        "redirects": True,
+        "titles": "|".join(titles)
+    }
+
+    get = client.get if client is not None else requests.get
+    aliases = {}
+    page_revisions = {}
+    continuation = {}
+    while True:
+        response = _profiled_get(get, {**params, **continuation})
+        if response.status_code != 200:
+            raise ArticleNotFound(f"Failed to fetch article revisions: {response.status_code}")
+        data = response.json()
+        query = data.get("query", {})
+        for alias in query.get("normalized", []) + query.get("redirects", []):
+            aliases[alias["from"]] = alias["to"]
+        for page_id, page in query.get("pages", {}).items():
+            if not page_id.startswith("-") and "lastrevid" in page:
+                page_revisions[page["title"]] = f"{page['lastrevid']}@{page.get('touched', '')}"
+        if "continue" not in data:
+            break
+        continuation = data["continue"]
+
+    return {title: page_revisions.get(_resolve_title(title, aliases)) for title in titles}
+
+
+def _resolve_title(title: str, aliases: Dict[str, str]) -> str:
+    seen = {title}
+    while title in aliases and aliases[title] not in seen:
+        title = aliases[title]
+        seen.add(title)
+    return title
+
+
+def _fetch_wikipedia_article(title: str, client: Optional[HttpClient] = None) -> str:
     """
     Fetches the plain text content of a Wikipedia article using the Wikipedia API.
 
     Args:
         title (str): The title of the Wikipedia article (e.g., "AIML").
+        client (Optional[HttpClient]): Shared HTTP client, or None to use a bare `requests.get`.
 
     Returns:
         str: The plain text content of the article.
     """
-    url = "https://pl.wikipedia.org/w/api.php"
     params = {
         "action": "query",
         "prop": "extracts",
@@ -82,7 +382,8 @@ def _fetch_wikipedia_article(title: str) -> str:
         "titles": title
     }
 
-    response = requests.get(url, params=params)
+    get = client.get if client is not None else requests.get
+    response = _profiled_get(get, params)
     if response.status_code == 200:
         data = response.json()
         pages = data["query"]["pages"]
@@ -93,7 +394,15 @@ def _fetch_wikipedia_article(title: str) -> str:
         raise ArticleNotFound(f"Failed to fetch article: {response.status_code}")
 
 
-def _get_title_from_url(url: str) -> str:
+def _profiled_get(get, params: dict) -> requests.Response:
+    with profile_stage("fetch"):
+        response = get(API_URL, params=params)
+    if is_profiling():
+        profile_count("fetch", requests=1, bytes=len(response.content))
+    return response
+
+
+def get_title_from_url(url: str) -> str:
     """
     Extracts the title of a Wikipedia article from its URL.
 
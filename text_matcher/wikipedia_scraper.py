@@ -1,30 +1,98 @@
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import List, Dict, Optional
 
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, UnicodeDammit
+from bs4.builder import HTMLTreeBuilder
+from bs4.dammit import EntitySubstitution
 
+from text_matcher.http_client import HttpClient
 
-def scrape_wikipedia_core_texts_contents(urls: List[str]) -> Dict[str, str]:
+UNWANTED_TAGS = frozenset(['nav', 'header', 'footer', 'script', 'style', 'aside'])
+UNWANTED_DIV_CLASSES = frozenset(['mw-editsection', 'toc', 'mw-normal-catlinks', 'navbox', 'metadata'])
+# BeautifulSoup gives the text inside these tags its own string types, which get_text leaves out
+STRING_CONTAINER_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+VOID_TAGS = frozenset(HTMLTreeBuilder.empty_element_tags)
+PARSERS = ("streaming", "lxml", "html.parser")
+DEFAULT_PARSER = "streaming"
+
+
+def scrape_wikipedia_core_texts_contents(urls: List[str], client: Optional[HttpClient] = None,
+                                         parser: str = DEFAULT_PARSER,
+                                         processes: Optional[int] = None) -> Dict[str, str]:
+    """
+    Downloads and parses the pages behind `urls`, skipping pages without text.
+
+    Args:
+        urls (List[str]): Page URLs.
+        client (Optional[HttpClient]): Client downloading the pages, concurrently if it allows it.
+        parser (str): One of `PARSERS`.
+        processes (Optional[int]): Parse the pages in a pool of this many processes while they are downloaded.
+
+    Returns:
+        Dict[str, str]: Text of every page, in the order of `urls`.
+    """
+    _check_parser(parser)
+    if processes is not None and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            def download(url: str):
+                return pool.submit(_parse_html_content, _get_html_content(url, client), parser)
+
+            futures = client.map(download, urls) if client is not None else list(map(download, urls))
+            texts = [future.result() for future in futures]
+    else:
+        def scrape(url: str) -> str:
+            return scrape_wikipedia_core_text_content(url, client=client, parser=parser)
+
+        texts = client.map(scrape, urls) if client is not None else map(scrape, urls)
     documents = {}
-    for url in urls:
-        text = scrape_wikipedia_core_text_content(url)
+    for url, text in zip(urls, texts):
         if text:
             documents.update({url: text})
     return documents
 
 
-def scrape_wikipedia_core_text_content(url: str) -> str:
-    content: bytes = _get_html_content(url)
-    text = _parse_html_content(content)
+def scrape_wikipedia_core_text_content(url: str, client: Optional[HttpClient] = None,
+                                       parser: str = DEFAULT_PARSER) -> str:
+    _check_parser(parser)
+    content: bytes = _get_html_content(url, client)
+    text = _parse_html_content(content, parser)
     return text
 
 
-def _get_html_content(url: str) -> bytes:
-    return requests.get(url).content
+def _get_html_content(url: str, client: Optional[HttpClient] = None) -> bytes:
+    get = client.get if client is not None else requests.get
+    return get(url).content
+
+
+def _check_parser(parser: str):
+    if parser not in PARSERS:
+        raise ValueError(f"Unsupported HTML parser: {parser}. Choose from {', '.join(PARSERS)}.")
+
+
+def _parse_html_content(content: bytes, parser: str = DEFAULT_PARSER) -> str:
+    """
+    Extracts the text of the main content of a Wikipedia page, without navigation, edit links, tables of contents,
+    navigation boxes and similar elements, with whitespace collapsed to single spaces.
 
+    `streaming` and `html.parser` give identical output for any markup. `lxml` repairs malformed markup its own way,
+    e.g. it adds a missing <body>, so its output may differ on broken pages.
+    """
+    match parser:
+        case "streaming":
+            return _parse_html_content_streaming(content)
+        case "lxml":
+            return _parse_html_content_lxml(content)
+        case "html.parser":
+            return _parse_html_content_beautifulsoup(content)
+        case _:
+            _check_parser(parser)
 
-def _parse_html_content(content: bytes) -> str:
-    soup = BeautifulSoup(content)
+
+def _parse_html_content_beautifulsoup(content: bytes) -> str:
+    soup = BeautifulSoup(content, "html.parser")
 
     # Try to locate the main content of a Wikipedia article, if present
     main_content = soup.find('div', {'id': 'mw-content-text'})
@@ -37,11 +105,11 @@ def _parse_html_content(content: bytes) -> str:
         return ""  # Return empty if no content is found
 
     # Remove unwanted elements (e.g., navigation, edit links, etc.)
-    for element in main_content.find_all(['nav', 'header', 'footer', 'script', 'style', 'aside']):
+    for element in main_content.find_all(list(UNWANTED_TAGS)):
         element.decompose()
 
     # Remove edit and tool links from Wikipedia-like content
-    for unwanted_class in ['mw-editsection', 'toc', 'mw-normal-catlinks', 'navbox', 'metadata']:
+    for unwanted_class in UNWANTED_DIV_CLASSES:
         for element in main_content.find_all('div', {'class': unwanted_class}):
             element.decompose()
 
@@ -50,3 +118,194 @@ def _parse_html_content(content: bytes) -> str:
     cleaned_text = ' '.join(text.split())
 
     return cleaned_text
+
+
+def _parse_html_content_lxml(content: bytes) -> str:
+    try:
+        document = lxml.html.document_fromstring(UnicodeDammit(content, is_html=True).unicode_markup or "")
+    except lxml.etree.ParserError:
+        return ""  # an empty document
+    main_content = next(iter(document.xpath("//div[@id='mw-content-text']")), None)
+    if main_content is None:
+        main_content = document.find('body')
+    if main_content is None:
+        return ""
+
+    in_container = any(ancestor.tag in STRING_CONTAINER_TAGS for ancestor in main_content.iterancestors())
+    strings = [main_content.text] if main_content.text and not in_container else []
+    # walk the element tree once, skipping unwanted subtrees; every entry is (element, children, in_container)
+    stack = [(main_content, iter(main_content), in_container)]
+    while stack:
+        element, children, in_container = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if stack and element.tail and not stack[-1][2]:
+                strings.append(element.tail)
+            continue
+        if not isinstance(child.tag, str) or _is_unwanted(child.tag, child.get('class')):
+            # comments, processing instructions and unwanted subtrees keep only the text following them
+            if child.tail and not in_container:
+                strings.append(child.tail)
+            continue
+        child_in_container = in_container or child.tag in STRING_CONTAINER_TAGS
+        if child.text and not child_in_container:
+            strings.append(child.text)
+        stack.append((child, iter(child), child_in_container))
+    return ' '.join(' '.join(strings).split())
+
+
+def _parse_html_content_streaming(content: bytes) -> str:
+    dammit = UnicodeDammit(content, is_html=True)
+    extractor = _ContentExtractor(dammit.original_encoding)
+    extractor.feed(dammit.unicode_markup or "")
+    extractor.close()
+    return ' '.join(' '.join(extractor.strings()).split())
+
+
+def _is_unwanted(tag: str, classes: Optional[str]) -> bool:
+    if tag in UNWANTED_TAGS:
+        return True
+    return tag == 'div' and classes is not None and not UNWANTED_DIV_CLASSES.isdisjoint(classes.split())
+
+
+class _Scope:
+    """
+    Text collected under one candidate root element: the first `div#mw-content-text` or the first `body`.
+    """
+    def __init__(self):
+        self.root: Optional[int] = None
+        self.closed = False
+        self.skipped_from: Optional[int] = None
+        self.strings: List[str] = []
+
+    def is_open(self) -> bool:
+        return self.root is not None and not self.closed
+
+
+class _ContentExtractor(HTMLParser):
+    """
+    Single-pass text extractor reproducing the output of the BeautifulSoup `html.parser` backend without building
+    a tree: it keeps only the stack of open tags, opens and closes tags by the same rules as BeautifulSoup, and
+    drops the text of unwanted subtrees as it goes. Entity and character references are converted the way
+    BeautifulSoup converts them.
+    """
+    def __init__(self, original_encoding: Optional[str]):
+        super().__init__(convert_charrefs=False)
+        self.original_encoding = original_encoding
+        self.open_tags: List[str] = []
+        self.open_containers: List[int] = []
+        self.already_closed_void_tags: List[str] = []
+        self.pending_data: List[str] = []
+        self.main_content = _Scope()
+        self.body = _Scope()
+
+    def strings(self) -> List[str]:
+        if self.main_content.root is not None:
+            return self.main_content.strings
+        return self.body.strings
+
+    def handle_starttag(self, tag, attrs, close_void=True):
+        self._end_data()
+        depth = len(self.open_tags)
+        attributes = {}
+        for name, value in attrs:
+            attributes[name] = value if value is not None else ''
+        for scope in (self.main_content, self.body):
+            if scope.is_open() and scope.skipped_from is None and _is_unwanted(tag, attributes.get('class')):
+                scope.skipped_from = depth
+        if tag == 'div' and attributes.get('id') == 'mw-content-text' and self.main_content.root is None:
+            self.main_content.root = depth
+        elif tag == 'body' and self.body.root is None:
+            self.body.root = depth
+        self.open_tags.append(tag)
+        if tag in STRING_CONTAINER_TAGS:
+            self.open_containers.append(depth)
+        if tag in VOID_TAGS and close_void:
+            self._pop_to(tag)
+            self.already_closed_void_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, close_void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.already_closed_void_tags:
+            self.already_closed_void_tags.remove(tag)
+            return
+        self._end_data()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.pending_data.append(data)
+
+    def handle_charref(self, name):
+        number = int(name[1:], 16) if name[:1] in ('x', 'X') else int(name)
+        data = None
+        if number < 256:
+            for encoding in (self.original_encoding, 'windows-1252'):
+                if not encoding:
+                    continue
+                try:
+                    data = bytearray([number]).decode(encoding)
+                except UnicodeDecodeError:
+                    pass
+        if not data:
+            try:
+                data = chr(number)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    # comments, doctypes and processing instructions end the current string but are not text themselves
+    def handle_comment(self, data):
+        self._end_data()
+
+    def handle_decl(self, data):
+        self._end_data()
+
+    def handle_pi(self, data):
+        self._end_data()
+
+    def unknown_decl(self, data):
+        # CDATA sections are text even inside string containers, other declarations are not
+        is_cdata = data.upper().startswith('CDATA[')
+        self._end_data()
+        self.pending_data.append(data[len('CDATA['):] if is_cdata else data)
+        self._end_data(text=is_cdata, cdata=is_cdata)
+
+    def close(self):
+        super().close()
+        self._end_data()
+
+    def _end_data(self, text: bool = True, cdata: bool = False):
+        # like BeautifulSoup, data between two tags is a single string
+        if not self.pending_data:
+            return
+        string = ''.join(self.pending_data)
+        self.pending_data = []
+        if not text or (self.open_containers and not cdata):
+            return
+        for scope in (self.main_content, self.body):
+            if scope.is_open() and scope.skipped_from is None:
+                scope.strings.append(string)
+
+    def _pop_to(self, tag: str):
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            depth = len(self.open_tags) - 1
+            popped = self.open_tags.pop()
+            if self.open_containers and self.open_containers[-1] == depth:
+                self.open_containers.pop()
+            for scope in (self.main_content, self.body):
+                if scope.skipped_from == depth:
+                    scope.skipped_from = None
+                if scope.root == depth and not scope.closed:
+                    scope.closed = True
+            if popped == tag:
+                return